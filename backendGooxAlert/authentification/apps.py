@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AuthentificationConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "authentification"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from backendGooxAlert import checks  # noqa: F401
@@ -0,0 +1,140 @@
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from backendGooxAlert.cache import is_shared_cache
+
+from .models import User
+
+
+def user_version_key(user_id):
+    return f'auth:user-version:{user_id}'
+
+
+def get_user_version(user_id):
+    # Version aléatoire : en changer rend inaccessibles toutes les entrées précédentes
+    key = user_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}:{get_user_version(user_id)}'
+
+
+def invalidate_cached_user(user_id):
+    cache.set(user_version_key(user_id), uuid.uuid4().hex, None)
+
+
+def cached_user_entry(user):
+    """
+    Champs de l'utilisateur mis en cache : tous sauf le hash du mot de passe,
+    remplacé par son empreinte si la révocation des jetons est activée.
+    """
+    fields = {
+        field.attname: getattr(user, field.attname)
+        for field in User._meta.concrete_fields if field.attname != 'password'
+    }
+    password_md5 = get_md5_hash_password(user.password) if api_settings.CHECK_REVOKE_TOKEN else None
+    return {'fields': fields, 'password_md5': password_md5}
+
+
+def user_from_entry(entry):
+    # Instance sans le mot de passe (champ différé, relu en base si on y accède)
+    fields = entry['fields']
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in fields]
+    return User.from_db('default', names, [fields[name] for name in names])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication dont l'utilisateur est lu dans le cache plutôt qu'en base.
+
+    L'entrée est indexée par l'identifiant de l'utilisateur et une version,
+    changée à chaque enregistrement de l'utilisateur (rôle, is_active, mot de
+    passe...) : voir ``authentification.signals``. Le cache n'est utilisé que
+    s'il est partagé entre les workers, pour que l'invalidation les atteigne tous.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None or not settings.AUTH_USER_CACHE_TIMEOUT or not is_shared_cache():
+            return super().get_user(validated_token)
+
+        key = user_cache_key(user_id)
+        entry = cache.get(key)
+        if entry is None:
+            user = super().get_user(validated_token)
+            cache.set(key, cached_user_entry(user), settings.AUTH_USER_CACHE_TIMEOUT)
+            return user
+
+        # Mêmes contrôles que JWTAuthentication.get_user
+        user = user_from_entry(entry)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != entry['password_md5']:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+
+class StreamToken(AccessToken):
+    """
+    Jeton de courte durée réservé au flux d'événements, seul jeton accepté
+    dans ?token= (EventSource ne permet pas d'en-têtes) : un jeton d'accès
+    n'apparaît ainsi jamais dans une URL ni dans les journaux des proxys.
+    Refusé dans l'en-tête Authorization (type « stream »).
+    """
+    token_type = 'stream'
+    lifetime = settings.SIGNALEMENT_EVENTS_TOKEN_LIFETIME
+
+
+async def aauthenticate_jwt(request, query_token_class=None):
+    """
+    Utilisateur du jeton JWT de la requête pour les vues asynchrones (hors
+    DRF), ou None. Avec ``query_token_class``, un jeton de cette classe est
+    aussi accepté dans ?token=. Comme avec DRF, l'utilisateur et le jeton
+    validé sont posés sur ``request.user`` et ``request.auth``.
+    """
+    authentication = CachedJWTAuthentication()
+    try:
+        # get_raw_token lève AuthenticationFailed pour un en-tête mal formé (« Bearer a b »)
+        header = authentication.get_header(request)
+        if header:
+            raw_token = authentication.get_raw_token(header)
+            if not raw_token:
+                return None
+            validated_token = authentication.get_validated_token(raw_token)
+        elif query_token_class is not None and request.GET.get('token'):
+            validated_token = query_token_class(request.GET['token'])
+        else:
+            return None
+        request.user = await sync_to_async(authentication.get_user)(validated_token)
+    except (AuthenticationFailed, TokenError):
+        return None
+    request.auth = validated_token
+    return request.user
+
+
+async def arecheck_user(validated_token):
+    """
+    Relit l'utilisateur d'un jeton déjà validé (connexion longue) : None s'il a
+    été supprimé, désactivé ou a changé de mot de passe depuis.
+    """
+    try:
+        return await sync_to_async(CachedJWTAuthentication().get_user)(validated_token)
+    except AuthenticationFailed:
+        return None
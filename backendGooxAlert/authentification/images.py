@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import io
+import os
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import ImageAsset
+from .services import get_image_host
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def hash_image(image_file):
+    # SHA-256 calculé par morceaux, sans charger le fichier en mémoire
+    digest = hashlib.sha256()
+    image_file.seek(0)
+    for chunk in iter(lambda: image_file.read(64 * 1024), b''):
+        digest.update(chunk)
+    image_file.seek(0)
+    return digest.hexdigest()
+
+
+def process_image(image_file):
+    """
+    Crée (ou retrouve) l'ImageAsset d'un fichier : image principale sans EXIF,
+    déclinaisons « medium » et « thumbnail » en WebP avec repli JPEG.
+
+    Le fichier est identifié par le hash de son contenu : une même photo n'est
+    jamais décodée ni envoyée deux fois à l'hébergeur.
+    """
+    content_hash = hash_image(image_file)
+    asset = ImageAsset.objects.filter(content_hash=content_hash).first()
+    if asset is not None:
+        return asset
+
+    host = get_image_host()
+    large, renditions = render_renditions(image_file, content_hash)
+    urls = {name: host.upload_image(output) for name, output in renditions.items()}
+    return save_asset(content_hash, large, urls)
+
+
+async def aprocess_image(image_file):
+    """
+    Variante asynchrone de process_image (vues servies par asgi.py) : le
+    travail Pillow passe dans un thread, et les cinq déclinaisons sont
+    envoyées à l'hébergeur en parallèle plutôt que l'une après l'autre.
+    """
+    content_hash = await sync_to_async(hash_image, thread_sensitive=False)(image_file)
+    asset = await ImageAsset.objects.filter(content_hash=content_hash).afirst()
+    if asset is not None:
+        return asset
+
+    host = get_image_host()
+    large, renditions = await sync_to_async(render_renditions, thread_sensitive=False)(image_file, content_hash)
+    urls = await asyncio.gather(*(host.aupload_image(output) for output in renditions.values()))
+    return await sync_to_async(save_asset)(content_hash, large, dict(zip(renditions, urls)))
+
+
+def render_renditions(image_file, content_hash):
+    # Image principale et fichiers encodés de chaque déclinaison, par champ d'ImageAsset
+    image = open_image(image_file)
+    large = resize(image, settings.IMAGE_LARGE_SIZE)
+    medium = resize(image, settings.IMAGE_MEDIUM_SIZE)
+    thumbnail = ImageOps.fit(image, (settings.IMAGE_THUMBNAIL_SIZE, settings.IMAGE_THUMBNAIL_SIZE), Image.LANCZOS)
+
+    return large, {
+        'url': encode(large, 'JPEG', content_hash),
+        'medium_url': encode(medium, 'WEBP', f'{content_hash}-medium'),
+        'medium_fallback_url': encode(medium, 'JPEG', f'{content_hash}-medium'),
+        'thumbnail_url': encode(thumbnail, 'WEBP', f'{content_hash}-thumbnail'),
+        'thumbnail_fallback_url': encode(thumbnail, 'JPEG', f'{content_hash}-thumbnail'),
+    }
+
+
+def save_asset(content_hash, large, urls):
+    try:
+        with transaction.atomic():
+            return ImageAsset.objects.create(content_hash=content_hash, width=large.width, height=large.height, **urls)
+    except IntegrityError:
+        # Le même fichier a été traité en parallèle par une autre requête
+        return ImageAsset.objects.get(content_hash=content_hash)
+
+
+def open_image(image_file):
+    try:
+        image = Image.open(image_file)
+    except UnidentifiedImageError:
+        raise InvalidImage("Le fichier n'est pas une image valide")
+    except Image.DecompressionBombError:
+        raise InvalidImage("L'image est trop grande")
+    # Refus avant décodage : les dimensions sont lues dans l'en-tête
+    if image.width * image.height > settings.IMAGE_MAX_PIXELS:
+        raise InvalidImage("L'image est trop grande")
+
+    try:
+        # JPEG : décodage directement à une échelle réduite (1/2, 1/4, 1/8)
+        image.draft('RGB', (settings.IMAGE_LARGE_SIZE, settings.IMAGE_LARGE_SIZE))
+        image = ImageOps.exif_transpose(image)
+        # La conversion produit une nouvelle image, sans les métadonnées EXIF
+        return image.convert('RGB')
+    except (OSError, SyntaxError, ValueError):
+        # Fichier tronqué ou corrompu : Pillow ne s'en aperçoit qu'au décodage
+        raise InvalidImage("L'image est corrompue ou incomplète")
+
+
+def resize(image, size):
+    resized = image.copy()
+    resized.thumbnail((size, size), Image.LANCZOS)
+    return resized
+
+
+def encode(image, image_format, name):
+    extension = {'JPEG': '.jpg', 'WEBP': '.webp'}[image_format]
+    output = io.BytesIO()
+    image.save(output, image_format, quality=settings.IMAGE_QUALITY)
+    output.seek(0)
+    output.name = os.path.basename(name) + extension
+    return output
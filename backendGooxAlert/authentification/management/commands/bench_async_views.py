@@ -0,0 +1,109 @@
+import asyncio
+import io
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from PIL import Image
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentification.models import ImageAsset, User
+from authentification.testing import StubImageHostServer
+
+TELEPHONE = '00221700000001'
+STUB_URL_PREFIX = 'https://i.ibb.co/stub/'
+
+
+def make_image(number):
+    # Une couleur par image : pas de déduplication par hash entre les uploads
+    output = io.BytesIO()
+    Image.new('RGB', (1600, 1200), (number % 256, number // 256 % 256, 128)).save(output, 'JPEG')
+    return SimpleUploadedFile(f'photo-{number}.jpg', output.getvalue(), content_type='image/jpeg')
+
+
+class Command(BaseCommand):
+    help = 'Compare le débit de l\'upload de photo de profil (vue synchrone / vue asynchrone) face à un hébergeur lent'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=40, help='Nombre d\'uploads par vue')
+        parser.add_argument('--workers', type=int, default=4, help='Threads servant la vue synchrone (workers WSGI)')
+        parser.add_argument('--delay', type=float, default=0.3, help='Latence simulée de l\'hébergeur, en secondes')
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        User.objects.filter(username=TELEPHONE).delete()
+        user = User(username=TELEPHONE, telephone=TELEPHONE, full_name='Bench', commune='Dakar')
+        user.set_unusable_password()
+        user.save()
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+        images = [make_image(number) for number in range(2 * count)]
+
+        try:
+            with StubImageHostServer(delay=options['delay']) as stub, override_settings(
+                IMAGE_HOST_BACKEND='authentification.services.ImgBBService',
+                IMGBB_API_URL=stub.url,
+                IMGBB_API_KEY='bench',
+                THROTTLE_RATES={},
+            ):
+                results = {
+                    'synchrone': self.run_sync(headers, images[:count], options['workers']),
+                    'asynchrone': asyncio.run(self.run_async(headers, images[count:])),
+                }
+        finally:
+            # Les images du serveur local ne doivent pas rester en base
+            user.delete()
+            ImageAsset.objects.filter(url__startswith=STUB_URL_PREFIX).delete()
+
+        self.stdout.write(
+            f"Hébergeur à {options['delay'] * 1000:.0f} ms par upload, {count} uploads par vue, "
+            f"{options['workers']} threads pour la vue synchrone, une boucle d'événements pour l'asynchrone"
+        )
+        self.stdout.write(f"{'vue':>10} {'durée (s)':>10} {'débit (req/s)':>14} {'médiane (ms)':>13} {'p95 (ms)':>9}")
+        for name, (duration, latencies) in results.items():
+            p95 = statistics.quantiles(latencies, n=20)[18] if len(latencies) > 1 else latencies[0]
+            self.stdout.write(
+                f'{name:>10} {duration:>10.2f} {len(latencies) / duration:>14.1f} '
+                f'{statistics.median(latencies):>13.0f} {p95:>9.0f}'
+            )
+
+    def run_sync(self, headers, images, workers):
+        def upload(image):
+            try:
+                start = time.perf_counter()
+                response = Client().put(
+                    '/auth/api/profile/', encode_multipart(BOUNDARY, {'profile_picture': image}),
+                    content_type=MULTIPART_CONTENT, headers=headers,
+                )
+                return self.latency(response, start)
+            finally:
+                connections.close_all()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            latencies = list(executor.map(upload, images))
+        return time.perf_counter() - start, latencies
+
+    async def run_async(self, headers, images):
+        client = AsyncClient()
+
+        async def upload(image):
+            start = time.perf_counter()
+            response = await client.put(
+                '/auth/api/async/profile/', encode_multipart(BOUNDARY, {'profile_picture': image}),
+                content_type=MULTIPART_CONTENT, headers=headers,
+            )
+            return self.latency(response, start)
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(upload(image) for image in images))
+        return time.perf_counter() - start, latencies
+
+    def latency(self, response, start):
+        if response.status_code != 200:
+            raise CommandError(f'Upload en échec ({response.status_code}) : {response.content[:200]!r}')
+        return (time.perf_counter() - start) * 1000
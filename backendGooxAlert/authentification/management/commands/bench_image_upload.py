@@ -0,0 +1,59 @@
+import base64
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import requests
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from authentification.services import ImgBBService
+from authentification.testing import StubImageHostServer
+
+
+def legacy_upload(api_url, image_file):
+    # Ancienne implémentation : fichier lu en entier, encodé en base64, nouvelle connexion à chaque appel
+    encoded_image = base64.b64encode(image_file.read()).decode('utf-8')
+    response = requests.post(api_url, data={'key': 'bench', 'image': encoded_image})
+    response.raise_for_status()
+    return response.json()['data']['url']
+
+
+class Command(BaseCommand):
+    help = 'Compare mémoire et latence des uploads d\'images (ancien client / client streaming) contre un serveur local'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=8, help='Taille de l\'image en Mo')
+        parser.add_argument('--repeat', type=int, default=10, help='Nombre d\'uploads par client')
+
+    def handle(self, *args, **options):
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image, StubImageHostServer() as stub:
+            image.write(os.urandom(options['size'] * 1024 * 1024))
+            image.flush()
+
+            with override_settings(IMGBB_API_URL=stub.url, IMGBB_API_KEY='bench'):
+                service = ImgBBService()
+                results = {
+                    'ancien': self.measure(lambda f: legacy_upload(stub.url, f), image.name, options['repeat']),
+                    'streaming': self.measure(service.upload_image, image.name, options['repeat']),
+                }
+
+        self.stdout.write(f"Image de {options['size']} Mo, {options['repeat']} uploads")
+        self.stdout.write(f"{'client':>10} {'médiane (ms)':>13} {'pic mémoire (Mo)':>17}")
+        for name, (median, peak) in results.items():
+            self.stdout.write(f'{name:>10} {median:>13.1f} {peak:>17.1f}')
+
+    def measure(self, upload, path, repeat):
+        timings = []
+        peak = 0
+        for _ in range(repeat):
+            with open(path, 'rb') as image_file:
+                tracemalloc.start()
+                start = time.perf_counter()
+                upload(image_file)
+                timings.append((time.perf_counter() - start) * 1000)
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+        return statistics.median(timings), peak / (1024 * 1024)
@@ -0,0 +1,74 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+
+from authentification.models import User
+from signalement.models import Signalement
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Mesure la latence du login en fonction de la taille de l\'historique de signalements'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=str, default='0,100,1000,5000', help='Tailles d\'historique à tester, séparées par des virgules')
+        parser.add_argument('--repeat', type=int, default=5, help='Nombre de logins mesurés par taille')
+        parser.add_argument('--limit', type=int, default=20, help='Taille de la première page embarquée (?limit=)')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        telephone = '00221700000000'
+        password = 'bench-password'
+
+        self.stdout.write(f"{'historique':>10} {'défaut (ms)':>12} {'include (ms)':>13} {'octets':>8}")
+        try:
+            # Tout est annulé à la fin : la base n'est pas modifiée
+            with transaction.atomic():
+                user = User(username=telephone, telephone=telephone, full_name='Bench', commune='Dakar')
+                user.set_password(password)
+                user.save()
+
+                client = Client()
+                created = 0
+                for size in sizes:
+                    Signalement.objects.bulk_create([
+                        Signalement(
+                            user=user,
+                            title=f'Signalement {i}',
+                            description='Description de test ' * 10,
+                            location='Dakar',
+                            category='voirie',
+                        )
+                        for i in range(created, size)
+                    ])
+                    created = max(created, size)
+
+                    default = self.measure(client, '/auth/api/login/', telephone, password, options['repeat'])
+                    included, length = self.measure(
+                        client,
+                        f"/auth/api/login/?include=signalements&limit={options['limit']}",
+                        telephone, password, options['repeat'], with_length=True,
+                    )
+                    self.stdout.write(f'{created:>10} {default:>12.1f} {included:>13.1f} {length:>8}')
+                raise Rollback
+        except Rollback:
+            pass
+
+    def measure(self, client, url, telephone, password, repeat, with_length=False):
+        timings = []
+        length = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.post(url, {'telephone': telephone, 'password': password}, content_type='application/json')
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f'Login en échec ({response.status_code})')
+            length = len(response.content)
+        median = statistics.median(timings)
+        return (median, length) if with_length else median
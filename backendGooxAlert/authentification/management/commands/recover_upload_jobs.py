@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from authentification.tasks import recover_stale_jobs
+
+
+class Command(BaseCommand):
+    help = 'Relance ou passe en échec les uploads en arrière-plan perdus (redémarrage, worker arrêté)'
+
+    def handle(self, *args, **options):
+        retried, expired = recover_stale_jobs()
+        self.stdout.write(self.style.SUCCESS(f'{retried} upload(s) relancé(s), {expired} passé(s) en échec.'))
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:12
+
+from django.db import migrations
+
+TRIGRAM_INDEXES = (
+    ("user_full_name_trgm_idx", "full_name"),
+    ("user_commune_trgm_idx", "commune"),
+)
+
+
+def create_upper_trigram_indexes(apps, schema_editor):
+    # Sous PostgreSQL, __icontains compile en UPPER("col"::text) LIKE UPPER(%s) :
+    # l'index doit porter sur cette expression pour être utilisé.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    table = apps.get_model("authentification", "User")._meta.db_table
+    for name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" '
+            f'USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+        )
+
+
+def create_column_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    table = apps.get_model("authentification", "User")._meta.db_table
+    for name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" USING gin ("{column}" gin_trgm_ops)'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentification", "0004_user_directory_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_upper_trigram_indexes, create_column_trigram_indexes),
+    ]
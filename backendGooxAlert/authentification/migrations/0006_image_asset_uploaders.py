@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_uploaders(apps, schema_editor):
+    # Images déjà utilisées : attribuées aux auteurs des signalements qui les portent
+    ImageAsset = apps.get_model("authentification", "ImageAsset")
+    Signalement = apps.get_model("signalement", "Signalement")
+    Uploader = ImageAsset.uploaders.through
+    pairs = (
+        Signalement.objects.exclude(image_asset=None)
+        .values_list("image_asset_id", "user_id")
+        .distinct()
+    )
+    Uploader.objects.bulk_create(
+        [Uploader(imageasset_id=asset_id, user_id=user_id) for asset_id, user_id in pairs],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentification", "0005_user_directory_upper_trigram_indexes"),
+        ("signalement", "0005_image_asset"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="imageasset",
+            name="uploaders",
+            field=models.ManyToManyField(
+                blank=True, related_name="uploaded_images", to=settings.AUTH_USER_MODEL
+            ),
+        ),
+        migrations.RunPython(backfill_uploaders, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.db import models
 from django.db.models.signals import post_save
@@ -29,11 +31,67 @@ class User(AbstractUser):
     image_url = models.CharField(max_length=500, default="https://dummyimage.com/900x400/dee2e6/6c757d.jpg")
     role = models.CharField(max_length=50, default="user")
     terms = models.BooleanField(default=True)
+    image_asset = models.ForeignKey('ImageAsset', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     
    
     USERNAME_FIELD = 'telephone'
     REQUIRED_FIELDS = ['full_name']
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Pagination keyset de l'annuaire d'administration
+            models.Index(fields=['date_joined', 'id'], name='user_date_joined_idx'),
+            # Recherche par préfixe de téléphone (LIKE '00221 77%')
+            models.Index(fields=['telephone'], name='user_telephone_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
     def __str__(self):
         return self.telephone
 
+
+
+class ImageAsset(models.Model):
+    """
+    Image traitée côté serveur (sans EXIF) et ses déclinaisons redimensionnées.
+    Identifiée par le hash de son contenu d'origine pour ne jamais traiter deux
+    fois la même photo.
+    """
+    content_hash = models.CharField(max_length=64, unique=True)
+    url = models.CharField(max_length=500)
+    medium_url = models.CharField(max_length=500)
+    medium_fallback_url = models.CharField(max_length=500)
+    thumbnail_url = models.CharField(max_length=500)
+    thumbnail_fallback_url = models.CharField(max_length=500)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Utilisateurs ayant envoyé cette image : seuls eux peuvent l'attacher à un signalement
+    uploaders = models.ManyToManyField(User, related_name='uploaded_images', blank=True)
+
+    def __str__(self):
+        return self.content_hash
+
+
+UPLOAD_STATUS_CHOICES = [
+    ('en_attente', 'En attente'),
+    ('en_cours', 'En cours'),
+    ('termine', 'Terminé'),
+    ('echec', 'Échec'),
+]
+
+class ImageUploadJob(models.Model):
+    """
+    Upload d'image de profil traité en arrière-plan : le fichier est d'abord
+    stocké localement, puis envoyé à l'hébergeur d'images par un worker.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='image_upload_jobs')
+    status = models.CharField(max_length=20, choices=UPLOAD_STATUS_CHOICES, default='en_attente')
+    staged_path = models.CharField(max_length=500)
+    image_url = models.CharField(max_length=500, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user} - {self.status}"
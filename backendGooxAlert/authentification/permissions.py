@@ -5,4 +5,12 @@ class IsAdminUser(permissions.BasePermission):
     Permission personnalisée pour n'autoriser que les utilisateurs avec le rôle 'admin'.
     """
     def has_permission(self, request, view):
-        return request.user and request.user.role == 'admin' 
\ No newline at end of file
+        return request.user and request.user.role == 'admin' 
+
+
+class IsModerator(permissions.BasePermission):
+    """
+    Autorise les modérateurs et les administrateurs (file de modération, recherche).
+    """
+    def has_permission(self, request, view):
+        return request.user and request.user.is_authenticated and request.user.role in ('moderator', 'admin')
@@ -1,7 +1,25 @@
 from rest_framework import serializers
-from .models import User
+from backendGooxAlert.serializers import DynamicFieldsMixin
+from .models import User, ImageUploadJob, ImageAsset
 import re
 
+class ImageAssetSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImageAsset
+        fields = ['id', 'url', 'medium_url', 'medium_fallback_url', 'thumbnail_url', 'thumbnail_fallback_url', 'width', 'height']
+        read_only_fields = fields
+
+
+def normalize_telephone(value):
+    # Même normalisation que les numéros enregistrés (00221...)
+    value = value.replace(' ', '')
+    if value.startswith("7"):
+        value = "00221" + value
+    if value.startswith("+"):
+        value = value.replace("+", "00")
+    return value
+
+
 class LoginSerializer(serializers.Serializer):
     telephone = serializers.CharField(max_length=20, required=True)
     password = serializers.CharField(write_only=True, required=True)
@@ -19,13 +37,14 @@ class LoginSerializer(serializers.Serializer):
         return value
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=6)
     telephone = serializers.CharField(max_length=20)
+    image_variants = ImageAssetSerializer(source='image_asset', read_only=True)
 
     class Meta:
         model = User
-        fields = ['id', 'full_name', 'telephone', 'commune', 'password', 'image_url', 'role', 'terms']
+        fields = ['id', 'full_name', 'telephone', 'commune', 'password', 'image_url', 'image_variants', 'role', 'terms']
         extra_kwargs = {
             'role': {'read_only': True},  # on ne laisse pas l'utilisateur définir son rôle
         }
@@ -137,10 +156,14 @@ class ResetPasswordSerializer(serializers.Serializer):
             raise serializers.ValidationError("Le numéro doit être un numéro sénégalais valide.")
         return cleaned_phone
 
-class AdminUserSerializer(serializers.ModelSerializer):
+class AdminUserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    image_variants = ImageAssetSerializer(source='image_asset', read_only=True)
+    # Présent uniquement quand la requête l'a annoté (liste d'administration)
+    signalements_count = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = User
-        fields = ['id', 'full_name', 'telephone', 'commune', 'image_url', 'role', 'is_active', 'date_joined']
+        fields = ['id', 'full_name', 'telephone', 'commune', 'image_url', 'image_variants', 'role', 'is_active', 'date_joined', 'signalements_count']
         read_only_fields = ['id', 'date_joined']
 
 class UpdateUserRoleSerializer(serializers.ModelSerializer):
@@ -153,3 +176,9 @@ class UpdateUserRoleSerializer(serializers.ModelSerializer):
         if value not in valid_roles:
             raise serializers.ValidationError(f"Le rôle doit être l'un des suivants : {', '.join(valid_roles)}")
         return value
+
+class ImageUploadJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImageUploadJob
+        fields = ['id', 'status', 'image_url', 'error', 'created_at', 'updated_at']
+        read_only_fields = fields
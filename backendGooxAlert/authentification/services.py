@@ -1,36 +1,261 @@
+import asyncio
 import requests
-import base64
+import mimetypes
+import os
+import time
+import uuid
+import weakref
+from threading import Lock
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from backendGooxAlert.timing import timed
+
+try:
+    import httpx
+except ImportError:  # dépendance optionnelle : uploads asynchrones délégués à un thread
+    httpx = None
+
+
+def get_image_host():
+    """
+    Service d'hébergement d'images configuré par IMAGE_HOST_BACKEND
+    (ImgBB en production, stockage local pour le développement et les tests).
+    """
+    return import_string(settings.IMAGE_HOST_BACKEND)()
+
+
+_http_session = None
+_http_session_lock = Lock()
+
+
+def get_http_session():
+    """
+    Session HTTP partagée par tout le processus : les connexions keep-alive vers
+    l'hébergeur d'images sont réutilisées d'un upload à l'autre.
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            # Les nouvelles tentatives sont gérées par ImgBBService (le corps doit être rejoué)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.IMAGE_HOST_POOL_SIZE, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _http_session = session
+        return _http_session
+
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client():
+    """
+    Client httpx partagé par boucle d'événements (un client asynchrone est lié
+    à la boucle qui l'a créé) : même pool keep-alive que get_http_session.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        timeout = settings.IMAGE_HOST_TIMEOUT
+        connect, read = timeout if isinstance(timeout, (tuple, list)) else (timeout, timeout)
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read, connect=connect),
+            limits=httpx.Limits(max_connections=settings.IMAGE_HOST_ASYNC_POOL_SIZE),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def quote_filename(filename):
+    # Nom fourni par le client : sans CR/LF (injection d'en-têtes), guillemets et barres obliques inverses échappés
+    filename = filename.replace('\r', '').replace('\n', '')
+    return filename.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def is_connect_error(exc):
+    """
+    Vrai si la connexion à l'hébergeur n'a pas pu être établie : la requête
+    n'a pas été envoyée, la rejouer ne peut pas créer de doublon. Un délai de
+    lecture dépassé ou une connexion coupée en cours d'envoi ne sont pas rejoués.
+    """
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    if isinstance(exc, requests.ConnectionError) and not isinstance(exc, requests.Timeout):
+        reason = getattr(exc.args[0], 'reason', None) if exc.args else None
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+class MultipartFileStream:
+    """
+    Corps multipart/form-data produit à la demande : le fichier est lu par
+    morceaux pendant l'envoi au lieu d'être chargé (et encodé) en mémoire.
+    """
+    chunk_size = 64 * 1024
+
+    def __init__(self, fields, file_field, image_file, filename):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+        self.image_file = image_file
+
+        preamble = []
+        for name, value in fields.items():
+            preamble.append(
+                f'--{self.boundary}\r\n'
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f'{value}\r\n'
+            )
+        file_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        preamble.append(
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{file_field}"; filename="{quote_filename(filename)}"\r\n'
+            f'Content-Type: {file_type}\r\n\r\n'
+        )
+        self.preamble = ''.join(preamble).encode('utf-8')
+        self.epilogue = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+
+        # Taille connue à l'avance : envoi avec Content-Length plutôt qu'en chunked
+        self.start = image_file.tell()
+        image_file.seek(0, os.SEEK_END)
+        self.file_size = image_file.tell() - self.start
+        image_file.seek(self.start)
+
+    def __len__(self):
+        return len(self.preamble) + self.file_size + len(self.epilogue)
+
+    def __iter__(self):
+        self.image_file.seek(self.start)
+        yield self.preamble
+        while True:
+            chunk = self.image_file.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        yield self.epilogue
+
+    async def aiter_chunks(self):
+        # Même corps pour httpx.AsyncClient (lectures locales, par morceaux)
+        for chunk in self:
+            yield chunk
+
 
 class ImgBBService:
+    # Statuts pour lesquels une nouvelle tentative a un sens : hébergeur ou passerelle
+    # momentanément indisponible. Ni 429 (la limite ne se lève pas en quelques
+    # secondes) ni 500 (l'image a pu être enregistrée : doublon si l'on rejoue).
+    retry_statuses = {502, 503, 504}
+
     def __init__(self):
         self.api_key = settings.IMGBB_API_KEY
-        self.api_url = "https://api.imgbb.com/1/upload"
+        self.api_url = settings.IMGBB_API_URL
+        self.timeout = settings.IMAGE_HOST_TIMEOUT
+        self.max_retries = settings.IMAGE_HOST_MAX_RETRIES
+        self.backoff = settings.IMAGE_HOST_RETRY_BACKOFF
+        self.session = get_http_session()
 
     def upload_image(self, image_file):
         try:
-            # Lire le fichier image
-            image_data = image_file.read()
-            
-            # Encoder l'image en base64
-            encoded_image = base64.b64encode(image_data).decode('utf-8')
-            
-            # Préparer les données pour l'API
-            payload = {
-                "key": self.api_key,
-                "image": encoded_image
-            }
-            
-            # Faire la requête à l'API ImgBB
-            response = requests.post(self.api_url, data=payload)
+            filename = os.path.basename(getattr(image_file, 'name', '') or 'image.jpg')
+            with timed('imagehost'):
+                response = self.post_with_retries(image_file, filename)
             response.raise_for_status()  # Lève une exception si la requête échoue
-            
+
             # Extraire l'URL de l'image
             result = response.json()
             if result.get("success"):
                 return result["data"]["url"]
             else:
                 raise Exception("Échec de l'upload vers ImgBB")
-                
+
+        except Exception as e:
+            raise Exception(f"Erreur lors de l'upload vers ImgBB: {str(e)}")
+
+    def post_with_retries(self, image_file, filename):
+        attempt = 0
+        start = image_file.tell()
+        while True:
+            # Le corps est reconstruit à chaque tentative pour relire le fichier depuis le début
+            image_file.seek(start)
+            body = MultipartFileStream({'key': self.api_key}, 'image', image_file, filename)
+            try:
+                response = self.session.post(
+                    self.api_url,
+                    data=body,
+                    headers={'Content-Type': body.content_type},
+                    timeout=self.timeout,
+                )
+                if response.status_code not in self.retry_statuses or attempt >= self.max_retries:
+                    return response
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                if not is_connect_error(exc) or attempt >= self.max_retries:
+                    raise
+
+            # Attente exponentielle : backoff, 2 x backoff, 4 x backoff...
+            time.sleep(self.backoff * (2 ** attempt))
+            attempt += 1
+
+    async def aupload_image(self, image_file):
+        """
+        Variante asynchrone d'upload_image (vues servies par asgi.py) : l'attente
+        de l'hébergeur n'occupe aucun thread.
+        """
+        if httpx is None:
+            return await sync_to_async(self.upload_image, thread_sensitive=False)(image_file)
+        try:
+            filename = os.path.basename(getattr(image_file, 'name', '') or 'image.jpg')
+            with timed('imagehost'):
+                response = await self.apost_with_retries(image_file, filename)
+            response.raise_for_status()
+
+            result = response.json()
+            if result.get("success"):
+                return result["data"]["url"]
+            else:
+                raise Exception("Échec de l'upload vers ImgBB")
+
         except Exception as e:
-            raise Exception(f"Erreur lors de l'upload vers ImgBB: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"Erreur lors de l'upload vers ImgBB: {str(e)}")
+
+    async def apost_with_retries(self, image_file, filename):
+        client = get_async_http_client()
+        attempt = 0
+        start = image_file.tell()
+        while True:
+            image_file.seek(start)
+            body = MultipartFileStream({'key': self.api_key}, 'image', image_file, filename)
+            try:
+                response = await client.post(
+                    self.api_url,
+                    content=body.aiter_chunks(),
+                    headers={'Content-Type': body.content_type, 'Content-Length': str(len(body))},
+                )
+                if response.status_code not in self.retry_statuses or attempt >= self.max_retries:
+                    return response
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if attempt >= self.max_retries:
+                    raise
+
+            await asyncio.sleep(self.backoff * (2 ** attempt))
+            attempt += 1
+
+
+class LocalImageHostService:
+    """
+    Faux hébergeur d'images : enregistre le fichier dans le stockage local
+    (MEDIA_ROOT) au lieu de l'envoyer à ImgBB. Même interface qu'ImgBBService.
+    """
+    def __init__(self):
+        self.location = settings.LOCAL_IMAGE_HOST_DIR
+
+    def upload_image(self, image_file):
+        extension = os.path.splitext(getattr(image_file, 'name', '') or '')[1].lower() or '.jpg'
+        name = default_storage.save(f"{self.location}/{uuid.uuid4().hex}{extension}", image_file)
+        return default_storage.url(name)
+
+    async def aupload_image(self, image_file):
+        return await sync_to_async(self.upload_image)(image_file)
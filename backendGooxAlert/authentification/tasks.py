@@ -0,0 +1,114 @@
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from threading import Lock
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .images import process_image
+from .models import ImageUploadJob
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_UPLOAD_WORKERS,
+                thread_name_prefix='image-upload',
+            )
+        return _executor
+
+
+def stage_upload(image_file):
+    """
+    Copie le fichier reçu (par morceaux) dans le répertoire de transit et
+    retourne son chemin, pour libérer la requête avant l'upload distant.
+    """
+    os.makedirs(settings.IMAGE_UPLOAD_STAGING_DIR, exist_ok=True)
+    extension = os.path.splitext(image_file.name or '')[1].lower()
+    path = os.path.join(settings.IMAGE_UPLOAD_STAGING_DIR, f"{uuid.uuid4().hex}{extension}")
+    with open(path, 'wb') as destination:
+        for chunk in image_file.chunks():
+            destination.write(chunk)
+    return path
+
+
+def submit_upload_job(job_id):
+    # IMAGE_UPLOAD_WORKERS = 0 : exécution immédiate dans le thread courant
+    if settings.IMAGE_UPLOAD_WORKERS <= 0:
+        run_upload_job(job_id)
+        return None
+    return get_executor().submit(run_upload_job, job_id)
+
+
+def run_upload_job(job_id):
+    # Exécuté dans un thread du pool : il gère ses propres connexions à la base
+    close_old_connections()
+    try:
+        _process_upload_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def _process_upload_job(job_id):
+    # Prise en charge atomique : un job relancé par recover_stale_jobs n'est traité qu'une fois
+    claimed = ImageUploadJob.objects.filter(pk=job_id, status='en_attente').update(
+        status='en_cours', updated_at=timezone.now()
+    )
+    if not claimed:
+        return
+    job = ImageUploadJob.objects.select_related('user').get(pk=job_id)
+
+    try:
+        with open(job.staged_path, 'rb') as staged:
+            asset = process_image(staged)
+    except Exception as e:
+        logger.warning("Échec de l'upload %s : %s", job_id, e)
+        job.status = 'echec'
+        job.error = str(e)
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        return
+    finally:
+        if os.path.exists(job.staged_path):
+            os.remove(job.staged_path)
+
+    user = job.user
+    user.image_url = asset.url
+    user.image_asset = asset
+    user.save(update_fields=['image_url', 'image_asset'])
+
+    job.status = 'termine'
+    job.image_url = asset.url
+    job.save(update_fields=['status', 'image_url', 'updated_at'])
+
+
+def recover_stale_jobs():
+    """
+    Reprend les jobs perdus (redémarrage du processus, worker arrêté) :
+    en attente ou en cours depuis plus de IMAGE_UPLOAD_JOB_TIMEOUT. Ils sont
+    relancés si le fichier en transit existe encore sur cette machine, sinon
+    passés en échec. Retourne (relancés, expirés).
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.IMAGE_UPLOAD_JOB_TIMEOUT)
+    stale = ImageUploadJob.objects.filter(status__in=['en_attente', 'en_cours'], updated_at__lt=cutoff)
+    retried = expired = 0
+    for job in stale.only('id', 'staged_path'):
+        # Conditionnel : un worker encore actif entre-temps garde son job
+        still_stale = stale.filter(pk=job.pk)
+        if os.path.exists(job.staged_path):
+            if still_stale.update(status='en_attente', updated_at=timezone.now()):
+                submit_upload_job(job.id)
+                retried += 1
+        elif still_stale.update(status='echec', error="L'upload a été interrompu", updated_at=timezone.now()):
+            expired += 1
+    return retried, expired
@@ -0,0 +1,87 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Cache partagé entre processus pour les tests (le cache mémoire est propre au processus)
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'gooxalert-test-cache'),
+    }
+}
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    # File d'attente assez longue pour les benchmarks à forte concurrence
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class StubImageHostServer:
+    """
+    Faux serveur ImgBB local (tests, benchmarks) : lit le corps de la requête
+    et répond comme l'API d'upload. ``delay`` simule un hébergeur lent et
+    ``failures`` le nombre de premières requêtes qui répondent ``failure_status``.
+    """
+    def __init__(self, delay=0, failures=0, failure_status=503):
+        self.delay = delay
+        self.failures = failures
+        self.failure_status = failure_status
+        self.requests = []
+        self.lock = threading.Lock()
+        self.server = StubHTTPServer(('127.0.0.1', 0), self.make_handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f'http://{host}:{port}/1/upload'
+
+    def make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with stub.lock:
+                    stub.requests.append({'headers': dict(self.headers), 'body': body})
+                    failing = stub.failures > 0
+                    stub.failures -= 1 if failing else 0
+
+                if stub.delay:
+                    time.sleep(stub.delay)
+
+                if failing:
+                    self.respond(stub.failure_status, {'success': False})
+                else:
+                    number = len(stub.requests)
+                    self.respond(200, {'success': True, 'data': {'url': f'https://i.ibb.co/stub/{number}.jpg'}})
+
+            def respond(self, status, payload):
+                content = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                try:
+                    self.wfile.write(content)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client parti après un délai d'attente dépassé
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
@@ -1,3 +1,588 @@
-from django.test import TestCase
+import io
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.client import MULTIPART_CONTENT, encode_multipart, BOUNDARY
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from signalement.models import Signalement
+from PIL import Image
+
+from backendGooxAlert.idempotency import CacheIdempotencyStore, get_idempotency_store
+from .images import InvalidImage, process_image
+from .models import User, ImageUploadJob, ImageAsset
+from .services import ImgBBService, MultipartFileStream
+from .throttling import CacheTokenBucketStore, consume, get_throttle_store
+from .authentication import user_cache_key
+from .testing import SHARED_CACHES, StubImageHostServer
+
+
+def make_jpeg(size=(1200, 900), color='red'):
+    exif = Image.Exif()
+    exif[0x010F] = 'Appareil photo'  # Make
+    output = io.BytesIO()
+    Image.new('RGB', size, color).save(output, 'JPEG', exif=exif)
+    return SimpleUploadedFile('photo.jpg', output.getvalue(), content_type='image/jpeg')
+
+
+def create_user(telephone='00221771234567', password='secret123', **extra):
+    fields = {'full_name': 'Awa Diop', 'commune': 'Dakar', **extra}
+    user = User(username=telephone, telephone=telephone, **fields)
+    user.set_password(password)
+    user.save()
+    return user
+
+
+class LoginTests(TestCase):
+    url = '/auth/api/login/'
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        Signalement.objects.bulk_create([
+            Signalement(user=self.user, title=f'Signalement {i}', description='...', location='Dakar', category='voirie')
+            for i in range(5)
+        ])
+
+    def login(self, query=''):
+        return self.client.post(self.url + query, {'telephone': '771234567', 'password': 'secret123'}, format='json')
+
+    def test_history_is_not_loaded_by_default(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data['tokens'])
+        self.assertNotIn('signalements', response.data)
+
+    def test_included_history_is_bounded(self):
+        response = self.login('?include=signalements&limit=2')
+        self.assertEqual(len(response.data['signalements']), 2)
+        self.assertIn('/signalement/api/signalement/', response.data['signalements_next'])
+
+        next_page = self.client.get(response.data['signalements_next'], HTTP_AUTHORIZATION=f"Bearer {response.data['tokens']['access']}")
+        self.assertEqual(len(next_page.data['results']), 2)
+        self.assertFalse({s['id'] for s in next_page.data['results']} & {s['id'] for s in response.data['signalements']})
+
+
+@override_settings(ADMIN_USER_PAGE_SIZE=3)
+class AdminUserListTests(TestCase):
+    url = '/auth/api/admin/users/'
+
+    def setUp(self):
+        self.admin = create_user('00221770000000', role='admin', full_name='Admin', commune='Thiès')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def create_users(self, count, start=0):
+        for i in range(start, start + count):
+            user = create_user(f'0022177100{i:04d}', full_name=f'Citoyen {i}', commune='Pikine' if i % 2 else 'Rufisque')
+            Signalement.objects.create(user=user, title='Route', description='...', location='Dakar', category='voirie')
+
+    def test_query_count_is_constant_per_page(self):
+        self.create_users(3)
+        with self.assertNumQueries(1):
+            first = self.client.get(self.url)
+        self.create_users(10, start=3)
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+        self.assertEqual(len(first.data['users']), 3)
+        self.assertEqual(first.data['users'][0]['signalements_count'], 1)
+
+    def test_pages_cover_all_users(self):
+        self.create_users(7)
+        seen = []
+        url = self.url
+        while url:
+            response = self.client.get(url)
+            seen += [user['id'] for user in response.data['users']]
+            url = response.data['next']
+        self.assertEqual(sorted(seen), sorted(User.objects.values_list('id', flat=True)))
+
+    def test_search_and_filters(self):
+        self.create_users(4)
+        response = self.client.get(self.url, {'telephone': '7710000', 'page_size': 10})
+        self.assertEqual(len(response.data['users']), 4)
+        response = self.client.get(self.url, {'search': 'pik', 'page_size': 10})
+        self.assertEqual({user['commune'] for user in response.data['users']}, {'Pikine'})
+        response = self.client.get(self.url, {'role': 'admin'})
+        self.assertEqual([user['id'] for user in response.data['users']], [self.admin.id])
+        User.objects.filter(full_name='Citoyen 0').update(is_active=False)
+        response = self.client.get(self.url, {'is_active': 'false'})
+        self.assertEqual([user['full_name'] for user in response.data['users']], ['Citoyen 0'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'zzz'})
+        self.assertEqual(response.status_code, 404)
+
+    @skipUnless(connection.vendor == 'postgresql', 'index pg_trgm propre à PostgreSQL')
+    def test_search_uses_trigram_index(self):
+        self.create_users(4)
+        users = User.objects.filter(full_name__icontains='toyen 1')
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = users.explain()
+        self.assertIn('user_full_name_trgm_idx', plan)
+
+
+@override_settings(
+    THROTTLE_STORE='authentification.throttling.LocalTokenBucketStore',
+    THROTTLE_RATES={'login.phone': '2/min', 'login.ip': '4/min', 'profile_upload.user': '1/hour'},
+)
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        get_throttle_store().clear()
+        self.client = APIClient()
+
+    def login(self, telephone, ip='10.0.0.1'):
+        return self.client.post('/auth/api/login/', {'telephone': telephone, 'password': 'faux'}, format='json', REMOTE_ADDR=ip)
+
+    def test_login_is_limited_per_phone_then_per_ip(self):
+        self.assertEqual(self.login('771234567').status_code, 401)
+        self.assertEqual(self.login('00221771234567').status_code, 401)
+        response = self.login('771234567')
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(0 < int(response['Retry-After']) <= 30)
+
+        self.assertEqual(self.login('779999999').status_code, 401)
+        self.assertEqual(self.login('778888888').status_code, 429)
+        self.assertEqual(self.login('778888888', ip='10.0.0.2').status_code, 401)
+
+    def test_token_endpoint_shares_the_login_limit(self):
+        self.assertEqual(self.login('771234567').status_code, 401)
+        response = self.client.post('/auth/api/token/', {'telephone': '00221771234567', 'password': 'faux'}, format='json', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post('/auth/api/token/', {'telephone': '771234567', 'password': 'faux'}, format='json', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 429)
+
+    def test_forwarded_for_header_does_not_bypass_ip_limit(self):
+        for i in range(4):
+            response = self.client.post('/auth/api/login/', {'telephone': f'77000000{i}', 'password': 'faux'}, format='json',
+                                        REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=f'203.0.113.{i}')
+            self.assertEqual(response.status_code, 401)
+        response = self.client.post('/auth/api/login/', {'telephone': '770000009', 'password': 'faux'}, format='json',
+                                    REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.99')
+        self.assertEqual(response.status_code, 429)
+
+    def test_cache_store_requires_shared_cache(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}), \
+                self.assertRaises(ImproperlyConfigured):
+            CacheTokenBucketStore()
+
+    def test_cache_store_is_not_overdrawn_by_concurrent_takes(self):
+        def slow_consume(*args):
+            time.sleep(0.01)  # élargit la fenêtre entre lecture et écriture du seau
+            return consume(*args)
+
+        # LocMemCache.add() est atomique entre threads, comme SET NX sur Redis
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}), \
+                mock.patch('authentification.throttling.is_shared_cache', return_value=True), \
+                mock.patch('authentification.throttling.consume', side_effect=slow_consume):
+            store = CacheTokenBucketStore()
+            store.lock_wait = 5
+            barrier = threading.Barrier(20)
+            waits = []
+
+            def take():
+                barrier.wait()
+                waits.append(store.take('throttle:login:phone:771234567', 5, 5 / 60, time.time()))
+
+            threads = [threading.Thread(target=take) for _ in range(20)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(waits.count(None), 5)
+
+    def test_bucket_refills_over_time(self):
+        store = get_throttle_store()
+        self.assertIsNone(store.take('cle', 1, 1 / 60, now=0))
+        self.assertEqual(store.take('cle', 1, 1 / 60, now=15), 45)
+        self.assertIsNone(store.take('cle', 1, 1 / 60, now=75))
+
+    def test_only_profile_upload_is_limited(self):
+        self.client.force_authenticate(create_user())
+        self.assertEqual(self.client.put('/auth/api/profile/').status_code, 400)
+        self.assertEqual(self.client.put('/auth/api/profile/').status_code, 429)
+        self.assertEqual(self.client.get('/auth/api/profile/').status_code, 200)
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class CachedJWTAuthenticationTests(TestCase):
+    profile_url = '/auth/api/profile/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.admin = create_user('00221770000000', role='admin')
+        self.client = APIClient()
+        access = str(RefreshToken.for_user(self.user).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_user_is_served_from_cache(self):
+        with self.assertNumQueries(1):
+            self.client.get(self.profile_url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.profile_url)
+        self.assertEqual(response.data['profile']['telephone'], self.user.telephone)
+
+    def test_password_hash_is_not_cached(self):
+        self.client.get(self.profile_url)
+        entry = cache.get(user_cache_key(self.user.id))
+        self.assertNotIn('password', entry['fields'])
+        self.assertNotIn(self.user.password, str(entry))
+
+        # Le mot de passe, différé, est relu en base quand une vue en a besoin
+        response = self.client.post('/auth/api/modifier-mot-de-passe/', {
+            'old_password': 'secret123', 'new_password': 'nouveau123',
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('nouveau123'))
+        self.assertEqual(self.user.full_name, 'Awa Diop')
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_is_not_used(self):
+        self.client.get(self.profile_url)
+        with self.assertNumQueries(1):
+            self.client.get(self.profile_url)
+
+    def test_profile_supports_conditional_requests(self):
+        etag = self.client.get(self.profile_url)['ETag']
+        self.assertEqual(self.client.get(self.profile_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        me_etag = self.client.get('/auth/api/me/')['ETag']
+        self.assertEqual(self.client.get('/auth/api/me/', HTTP_IF_NONE_MATCH=me_etag).status_code, 304)
+
+        self.client.put('/auth/api/update-personal-info/', {'full_name': 'Awa Ndiaye'}, format='json')
+        self.assertEqual(self.client.get(self.profile_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_role_and_activation_changes_invalidate_cache(self):
+        self.client.get(self.profile_url)
+        admin_client = APIClient()
+        admin_client.force_authenticate(self.admin)
+        admin_client.put(f'/auth/api/admin/users/{self.user.id}/role/', {'role': 'moderator'}, format='json')
+        self.assertEqual(self.client.get(self.profile_url).data['profile']['role'], 'moderator')
+
+        self.user.refresh_from_db()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.profile_url).status_code, 401)
+
+
+class LocalImageHostMixin:
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        overrides = override_settings(
+            MEDIA_ROOT=self.media_root,
+            IMAGE_UPLOAD_STAGING_DIR=f'{self.media_root}/staging',
+            IMAGE_HOST_BACKEND='authentification.services.LocalImageHostService',
+            IMAGE_UPLOAD_WORKERS=0,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        cache.clear()  # seaux de limitation des uploads de profil
+        super().setUp()
+
+
+class BackgroundProfileUploadTests(LocalImageHostMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_upload_is_accepted_then_completed(self):
+        image = make_jpeg()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put('/auth/api/profile/?mode=background', {'profile_picture': image}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+
+        status_response = self.client.get(response.data['status_url'])
+        self.assertEqual(status_response.data['job']['status'], 'termine')
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.image_url.startswith('/media/images/'))
+        self.assertEqual(self.user.image_url, status_response.data['user']['image_url'])
+        self.assertFalse(ImageUploadJob.objects.filter(status='en_attente').exists())
+
+    def test_staged_file_is_removed_when_job_creation_fails(self):
+        with mock.patch.object(ImageUploadJob.objects, 'create', side_effect=RuntimeError('base indisponible')):
+            response = self.client.put('/auth/api/profile/?mode=background', {'profile_picture': make_jpeg()}, format='multipart')
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(os.listdir(f'{self.media_root}/staging'), [])
+
+    def test_stale_jobs_are_retried_or_expired(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.client.put('/auth/api/profile/?mode=background', {'profile_picture': make_jpeg()}, format='multipart')
+        lost = ImageUploadJob.objects.get(pk=response.data['job']['id'])
+        missing = ImageUploadJob.objects.create(user=self.user, status='en_cours', staged_path=f'{self.media_root}/absent.jpg')
+        recent = ImageUploadJob.objects.create(user=self.user, staged_path=f'{self.media_root}/absent.jpg')
+        stale = timezone.now() - timedelta(seconds=settings.IMAGE_UPLOAD_JOB_TIMEOUT + 1)
+        ImageUploadJob.objects.filter(pk__in=[lost.pk, missing.pk]).update(updated_at=stale)
+
+        call_command('recover_upload_jobs', stdout=io.StringIO())
+
+        statuses = dict(ImageUploadJob.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {lost.pk: 'termine', missing.pk: 'echec', recent.pk: 'en_attente'})
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.image_url.startswith('/media/images/'))
+
+
+@override_settings(IDEMPOTENCY_STORE='backendGooxAlert.idempotency.LocalIdempotencyStore')
+class IdempotentProfileUploadTests(LocalImageHostMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        get_idempotency_store().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(create_user())
+
+    def test_retried_upload_is_replayed_without_new_upload(self):
+        first = self.client.put('/auth/api/profile/', {'profile_picture': make_jpeg()}, format='multipart', HTTP_IDEMPOTENCY_KEY='photo-1')
+        self.assertEqual(first.status_code, 200)
+        stored = len(os.listdir(f'{self.media_root}/images'))
+
+        with self.assertNumQueries(0):
+            retry = self.client.put('/auth/api/profile/', {'profile_picture': make_jpeg()}, format='multipart', HTTP_IDEMPOTENCY_KEY='photo-1')
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(len(os.listdir(f'{self.media_root}/images')), stored)
+
+    def test_key_reused_with_other_image_is_rejected(self):
+        first = self.client.put('/auth/api/profile/', {'profile_picture': make_jpeg()}, format='multipart', HTTP_IDEMPOTENCY_KEY='photo-1')
+        self.assertEqual(first.status_code, 200)
+        other = self.client.put('/auth/api/profile/', {'profile_picture': make_jpeg(color='blue')}, format='multipart', HTTP_IDEMPOTENCY_KEY='photo-1')
+        self.assertEqual(other.status_code, 422)
+
+    def test_cache_store_requires_shared_cache(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}), \
+                self.assertRaises(ImproperlyConfigured):
+            CacheIdempotencyStore()
+        with override_settings(CACHES=SHARED_CACHES):
+            CacheIdempotencyStore()
+
+
+class ImageProcessingTests(LocalImageHostMixin, TestCase):
+    def open_stored(self, url):
+        return Image.open(default_storage.open(url.replace('/media/', '', 1)))
+
+    def test_renditions_are_resized_and_stripped(self):
+        asset = process_image(make_jpeg(size=(3000, 2000)))
+
+        self.assertEqual((asset.width, asset.height), (2048, 1365))
+        thumbnail = self.open_stored(asset.thumbnail_url)
+        self.assertEqual((thumbnail.format, thumbnail.size), ('WEBP', (200, 200)))
+        medium = self.open_stored(asset.medium_fallback_url)
+        self.assertEqual((medium.format, max(medium.size)), ('JPEG', 800))
+        self.assertEqual(len(self.open_stored(asset.url).getexif()), 0)
+
+    def test_identical_uploads_are_deduplicated(self):
+        first = process_image(make_jpeg())
+        second = process_image(make_jpeg())
+        process_image(make_jpeg(color='blue'))
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(ImageAsset.objects.count(), 2)
+
+    def test_truncated_image_is_invalid(self):
+        content = make_jpeg().read()
+        truncated = SimpleUploadedFile('photo.jpg', content[:len(content) // 2], content_type='image/jpeg')
+        with self.assertRaises(InvalidImage):
+            process_image(truncated)
+
+    def test_rejects_non_images(self):
+        user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        response = self.client.put('/auth/api/profile/', {
+            'profile_picture': SimpleUploadedFile('photo.jpg', b'pas une image'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 400)
+
+
+class ImgBBServiceTests(TestCase):
+    def test_streams_multipart_and_retries_unavailable_host(self):
+        image = SimpleUploadedFile('photo.jpg', b'\xff\xd8' + b'x' * 200000, content_type='image/jpeg')
+        with StubImageHostServer(failures=1) as stub, override_settings(IMGBB_API_URL=stub.url, IMAGE_HOST_RETRY_BACKOFF=0):
+            url = ImgBBService().upload_image(image)
+
+        self.assertTrue(url.startswith('https://i.ibb.co/stub/'))
+        self.assertEqual(len(stub.requests), 2)
+        request = stub.requests[-1]
+        self.assertTrue(request['headers']['Content-Type'].startswith('multipart/form-data'))
+        # Le fichier est envoyé brut, pas en base64, et complet à la seconde tentative
+        self.assertIn(b'\xff\xd8' + b'x' * 200000 + b'\r\n--', request['body'])
+
+    def test_gives_up_after_max_retries(self):
+        image = SimpleUploadedFile('photo.jpg', b'data', content_type='image/jpeg')
+        with StubImageHostServer(failures=10) as stub, override_settings(
+            IMGBB_API_URL=stub.url, IMAGE_HOST_RETRY_BACKOFF=0, IMAGE_HOST_MAX_RETRIES=2
+        ):
+            with self.assertRaises(Exception):
+                ImgBBService().upload_image(image)
+        self.assertEqual(len(stub.requests), 3)
+
+    def test_does_not_retry_rate_limit_server_error_or_read_timeout(self):
+        image = SimpleUploadedFile('photo.jpg', b'data', content_type='image/jpeg')
+        for status_code in (429, 500):
+            with StubImageHostServer(failures=1, failure_status=status_code) as stub, override_settings(
+                IMGBB_API_URL=stub.url, IMAGE_HOST_RETRY_BACKOFF=0
+            ):
+                with self.assertRaises(Exception):
+                    ImgBBService().upload_image(image)
+            self.assertEqual(len(stub.requests), 1)
+
+        with StubImageHostServer(delay=0.5) as stub, override_settings(
+            IMGBB_API_URL=stub.url, IMAGE_HOST_RETRY_BACKOFF=0, IMAGE_HOST_TIMEOUT=(1, 0.1)
+        ):
+            with self.assertRaises(Exception):
+                ImgBBService().upload_image(image)
+        self.assertEqual(len(stub.requests), 1)
+
+    def test_retries_connection_refused(self):
+        image = SimpleUploadedFile('photo.jpg', b'data', content_type='image/jpeg')
+        with StubImageHostServer() as stub:
+            url = stub.url
+        with override_settings(IMGBB_API_URL=url, IMAGE_HOST_RETRY_BACKOFF=0, IMAGE_HOST_MAX_RETRIES=2):
+            service = ImgBBService()
+            with mock.patch.object(service.session, 'post', wraps=service.session.post) as post:
+                with self.assertRaises(Exception):
+                    service.upload_image(image)
+        self.assertEqual(post.call_count, 3)
+
+    def test_filename_cannot_inject_headers(self):
+        body = MultipartFileStream({}, 'image', io.BytesIO(b'data'), 'a"b\r\nX-Injecte: 1\\.jpg')
+        self.assertIn(b'filename="a\\"bX-Injecte: 1\\\\.jpg"\r\n', body.preamble)
+        self.assertEqual(body.preamble.count(b'\r\n'), 4)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        Signalement.objects.bulk_create([
+            Signalement(user=self.user, title=f'Signalement {i}', description='...', location='Dakar', category='voirie')
+            for i in range(3)
+        ])
+        self.headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+    async def login(self, password='secret123', query=''):
+        return await self.async_client.post(
+            '/auth/api/async/login/' + query, {'telephone': '771234567', 'password': password}, content_type='application/json'
+        )
+
+    async def test_login(self):
+        response = await self.login(query='?include=signalements&limit=2')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['user']['id'], self.user.id)
+        self.assertIn('access', data['tokens'])
+        self.assertEqual(len(data['signalements']), 2)
+        self.assertIn('/signalement/api/signalement/', data['signalements_next'])
+
+        self.assertEqual((await self.login(password='faux')).status_code, 401)
+        self.assertEqual((await self.async_client.get('/auth/api/async/login/')).status_code, 405)
+
+    @override_settings(
+        THROTTLE_STORE='authentification.throttling.LocalTokenBucketStore',
+        THROTTLE_RATES={'login.phone': '1/min'},
+    )
+    async def test_login_shares_sync_limits(self):
+        await sync_to_async(get_throttle_store().clear)()
+        self.assertEqual((await self.login(password='faux')).status_code, 401)
+        response = await self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(0 < int(response['Retry-After']) <= 60)
+
+    async def upload(self, image, headers=None):
+        return await self.async_client.put(
+            '/auth/api/async/profile/', encode_multipart(BOUNDARY, {'profile_picture': image}),
+            content_type=MULTIPART_CONTENT, headers=self.headers if headers is None else headers,
+        )
+
+    async def test_profile_upload_sends_renditions_concurrently(self):
+        with StubImageHostServer(delay=0.3) as stub, override_settings(
+            IMAGE_HOST_BACKEND='authentification.services.ImgBBService', IMGBB_API_URL=stub.url,
+        ):
+            start = time.perf_counter()
+            response = await self.upload(make_jpeg())
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(stub.requests), 5)
+        # Envoyées une par une, les cinq déclinaisons prendraient au moins 1,5 s
+        self.assertLess(elapsed, 1.2)
+        await self.user.arefresh_from_db()
+        self.assertEqual(response.json()['user']['image_url'], self.user.image_url)
+        self.assertTrue(self.user.image_url.startswith('https://i.ibb.co/stub/'))
+
+    async def test_profile_upload_errors(self):
+        self.assertEqual((await self.upload(make_jpeg(), headers={})).status_code, 401)
+        response = await self.upload(SimpleUploadedFile('photo.jpg', b'pas une image'))
+        self.assertEqual(response.status_code, 400)
+        response = await self.async_client.put('/auth/api/async/profile/', headers=self.headers)
+        self.assertEqual(response.json()['message'], 'Aucune image n\'a été fournie')
+
+
+@override_settings(SERVER_TIMING=True, SERVER_TIMING_STAFF_ONLY=False)
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()  # seaux de limitation du login
+        user = create_user()
+        Signalement.objects.create(user=user, title='Signalement', description='...', location='Dakar', category='voirie')
+        self.client = APIClient()
+
+    def login(self, query=''):
+        return self.client.post('/auth/api/login/' + query, {'telephone': '771234567', 'password': 'secret123'}, format='json')
+
+    def test_login_breakdown(self):
+        response = self.login('?include=signalements')
+        metrics = dict(part.split(';', 1)[0:2] for part in response['Server-Timing'].split(', '))
+        self.assertTrue({'sql', 'password', 'jwt', 'serialize', 'render', 'total'} <= set(metrics))
+        self.assertRegex(response['Server-Timing'], r'sql;dur=[\d.]+;desc="\d+ queries"')
+        response['Server-Timing'].encode('ascii')
+
+    @override_settings(SERVER_TIMING_STAFF_ONLY=True)
+    def test_staff_only(self):
+        self.assertNotIn('Server-Timing', self.login())
+        self.client.force_authenticate(create_user('00221770000000', role='admin'))
+        self.assertIn('Server-Timing', self.client.get('/auth/api/profile/'))
+        self.client.force_authenticate(create_user('00221770000001'))
+        self.assertNotIn('Server-Timing', self.client.get('/auth/api/profile/'))
+
+    @override_settings(SERVER_TIMING=False)
+    def test_disabled_by_setting(self):
+        self.assertNotIn('Server-Timing', self.login())
+
+    @override_settings(QUERY_BUDGET=1)
+    def test_query_budget_warning(self):
+        with self.assertLogs('backendGooxAlert.middleware', 'WARNING') as logs:
+            self.login('?include=signalements')
+        self.assertIn('/auth/api/login/', logs.output[0])
+        self.assertIn('budget 1', logs.output[0])
+
+    def test_profiling_is_opt_in(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(PROFILING_DIR=directory, PROFILING_SAMPLE_RATE=1.0):
+            self.login()
+            self.assertEqual(os.listdir(directory), [])
+            with override_settings(PROFILING_ENABLED=True):
+                self.login()
+        files = os.listdir(directory)
+        self.assertEqual(len(files), 1)
+        self.assertIn('POST-auth_api_login', files[0])
+        self.assertTrue(pstats.Stats(os.path.join(directory, files[0])).total_calls > 0)
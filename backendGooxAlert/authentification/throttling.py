@@ -0,0 +1,181 @@
+import math
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+from backendGooxAlert.cache import is_shared_cache
+from backendGooxAlert.renderers import json_response
+
+from .serializers import normalize_telephone
+
+_stores = {}
+
+
+def get_throttle_store():
+    # Une instance par classe configurée (les tests peuvent changer THROTTLE_STORE)
+    if settings.THROTTLE_STORE not in _stores:
+        _stores[settings.THROTTLE_STORE] = import_string(settings.THROTTLE_STORE)()
+    return _stores[settings.THROTTLE_STORE]
+
+
+def parse_rate(rate):
+    """
+    « 5/min » -> (capacité, jetons rechargés par seconde) : le seau se remplit
+    de ``capacité`` jetons sur la période, et autorise une rafale de cette taille.
+    """
+    count, period = rate.split('/')
+    duration = {'s': 1, 'sec': 1, 'min': 60, 'm': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}[period]
+    return int(count), int(count) / duration
+
+
+class CacheTokenBucketStore:
+    """
+    Seaux partagés entre les workers via le cache Django (Redis, Memcached...).
+    La lecture-écriture d'un seau se fait sous un verrou pris avec cache.add(),
+    atomique sur les caches partagés : des tentatives simultanées ne peuvent
+    pas dépasser la capacité. Si le verrou reste pris plus de lock_wait
+    secondes (rafale sur le même seau), la requête est refusée.
+
+    Un cache propre au processus est refusé : chaque worker aurait ses
+    propres seaux et la limite serait multipliée par leur nombre.
+    """
+    lock_timeout = 1
+    lock_wait = 0.1
+
+    def __init__(self):
+        if not is_shared_cache():
+            raise ImproperlyConfigured(
+                'CacheTokenBucketStore exige un cache partagé entre les workers (REDIS_URL) ; '
+                'LocalTokenBucketStore ne convient qu\'à un seul processus.'
+            )
+
+    def take(self, key, capacity, refill_rate, now):
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_wait
+        while not cache.add(f'{key}:lock', token, self.lock_timeout):
+            if time.monotonic() >= deadline:
+                return 1 / refill_rate
+            time.sleep(0.005)
+        try:
+            tokens, updated_at = cache.get(key, (capacity, now))
+            tokens, wait = consume(tokens, updated_at, capacity, refill_rate, now)
+            cache.set(key, (tokens, now), int(capacity / refill_rate) + 1)
+            return wait
+        finally:
+            if cache.get(f'{key}:lock') == token:
+                cache.delete(f'{key}:lock')
+
+    def clear(self):
+        pass
+
+
+class LocalTokenBucketStore:
+    # Seaux en mémoire du processus (tests, serveur de développement)
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, refill_rate, now):
+        with self.lock:
+            tokens, updated_at = self.buckets.get(key, (capacity, now))
+            tokens, wait = consume(tokens, updated_at, capacity, refill_rate, now)
+            self.buckets[key] = (tokens, now)
+            return wait
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+def consume(tokens, updated_at, capacity, refill_rate, now):
+    # Retourne (jetons restants, attente en secondes avant le prochain jeton ou None)
+    tokens = min(capacity, tokens + (now - updated_at) * refill_rate)
+    if tokens >= 1:
+        return tokens - 1, None
+    return tokens, (1 - tokens) / refill_rate
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Limitation par seau à jetons. Le débit est lu dans THROTTLE_RATES sous la
+    clé « <throttle_scope de la vue>.<kind> » ; sans débit configuré, pas de limite.
+    Une requête refusée reçoit une réponse 429 avec l'en-tête Retry-After.
+    """
+    kind = None
+
+    def get_ident_key(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.wait_time = None
+        scope = getattr(view, 'throttle_scope', None)
+        rate = settings.THROTTLE_RATES.get(f'{scope}.{self.kind}') if scope else None
+        if not rate:
+            return True
+        ident = self.get_ident_key(request, view)
+        if ident is None:
+            return True
+
+        capacity, refill_rate = parse_rate(rate)
+        key = f'throttle:{scope}:{self.kind}:{ident}'
+        self.wait_time = get_throttle_store().take(key, capacity, refill_rate, time.time())
+        return self.wait_time is None
+
+    def wait(self):
+        return self.wait_time
+
+
+def check_throttles(request, view, throttle_classes):
+    """
+    Applique ``throttle_classes`` hors DRF (vues asynchrones), avec les mêmes
+    seaux que la vue synchrone ``view``. ``request`` fournit META et headers,
+    et selon les classes ``data`` et ``user``. Retourne l'attente en secondes,
+    ou None.
+    """
+    waits = []
+    for throttle_class in throttle_classes:
+        throttle = throttle_class()
+        if not throttle.allow_request(request, view):
+            waits.append(throttle.wait())
+    return max(waits) if waits else None
+
+
+def throttled_response(wait):
+    # Même réponse que l'exception Throttled de DRF : 429 et Retry-After
+    exc = Throttled(wait)
+    return json_response({'detail': exc.detail}, status=429, headers={'Retry-After': str(math.ceil(wait))})
+
+
+class PhoneRateThrottle(TokenBucketThrottle):
+    kind = 'phone'
+
+    def get_ident_key(self, request, view):
+        telephone = request.data.get('telephone') if hasattr(request.data, 'get') else None
+        if not telephone or not isinstance(telephone, str):
+            return None
+        return normalize_telephone(telephone)
+
+
+class IPRateThrottle(TokenBucketThrottle):
+    # Adresse vue par le dernier des NUM_PROXIES proxys de confiance (REMOTE_ADDR
+    # sans proxy) : un X-Forwarded-For fourni par le client n'ouvre pas de nouveau seau
+    kind = 'ip'
+
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+
+class UserRateThrottle(TokenBucketThrottle):
+    kind = 'user'
+
+    def get_ident_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
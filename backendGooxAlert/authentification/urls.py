@@ -1,17 +1,20 @@
 from django.urls import path
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
 import authentification.views as views
 
 urlpatterns = [
     path('api/register/', views.RegisterUserAPIView.as_view(), name='register'),
     path('api/login/', views.LoginAPIView.as_view(), name='login'),
+    path('api/async/login/', views.async_login, name='async-login'),
     path('api/update-personal-info/', views.UpdatePersonalInfoAPIView.as_view(), name='update_personal_info'),
     path('api/modifier-mot-de-passe/', views.ChangePasswordAPIView.as_view(), name='modifier-mot-de-passe'),
     path('api/demande-reinitialisation/', views.RequestPasswordResetAPIView.as_view(), name='demande-reinitialisation'),
     path('api/reinitialiser-mot-de-passe/', views.ResetPasswordAPIView.as_view(), name='reinitialiser-mot-de-passe'),
     path('api/profile/', views.ProfileAPIView.as_view(), name='profile'),
+    path('api/async/profile/', views.async_profile_upload, name='async-profile-upload'),
+    path('api/profile/upload-jobs/<uuid:job_id>/', views.ImageUploadJobStatusAPIView.as_view(), name='profile-upload-job'),
     path('api/me/', views.CurrentUserAPIView.as_view(), name='me'),
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/', views.TokenObtainPairAPIView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     
     # Routes d'administration
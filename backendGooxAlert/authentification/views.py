@@ -1,23 +1,47 @@
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_http_methods, require_POST
 from rest_framework import generics, status
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from django.contrib.auth import authenticate
+from django.contrib.auth import aauthenticate, authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework.utils.urls import replace_query_param
 from signalement.serializers import SignalementSerializer
 from signalement.models import Signalement
+from backendGooxAlert.idempotency import idempotent
+from backendGooxAlert.renderers import json_response, parse_request_data
+from backendGooxAlert.routers import ReplicaReadsMixin
+from backendGooxAlert.timing import timed
+from signalement.conditional import make_etag
+from signalement.pagination import KeysetPagination
 
 from .serializers import (
     UserSerializer, LoginSerializer, UpdatePersonalInfoSerializer, 
     ChangePasswordSerializer, RequestPasswordResetSerializer, 
-    ResetPasswordSerializer, AdminUserSerializer, UpdateUserRoleSerializer
+    ResetPasswordSerializer, AdminUserSerializer, UpdateUserRoleSerializer,
+    ImageUploadJobSerializer, normalize_telephone
 )
-from .models import User
+from .models import User, ImageUploadJob
+from .authentication import aauthenticate_jwt
 from .permissions import IsAdminUser
+from .throttling import IPRateThrottle, PhoneRateThrottle, UserRateThrottle, check_throttles, throttled_response
 
 from django.utils import timezone
 from datetime import timedelta
+import os
 import random
 from .twilio_client import send_sms
 
@@ -33,15 +57,66 @@ def get_user_data(user):
         'role': user.role,
     }
 
-from .services import ImgBBService
+
+def get_requested_includes(request):
+    # ?include=signalements,... : données optionnelles à embarquer dans la réponse
+    include = request.query_params.get('include', '')
+    return {part.strip() for part in include.split(',') if part.strip()}
+
+
+def get_signalements_first_page(request, user):
+    """
+    Première page (bornée par ?limit=) des signalements de l'utilisateur et
+    lien vers la suite sur l'endpoint de liste paginé.
+    """
+    paginator = KeysetPagination()
+    paginator.page_size_query_param = 'limit'
+    page = paginator.paginate_queryset(Signalement.objects.filter(user=user).select_related('image_asset'), request)
+    return serialize_first_page(request, paginator, page)
+
+
+async def aget_signalements_first_page(request, user):
+    # Variante pour les vues asynchrones (ORM asynchrone)
+    paginator = KeysetPagination()
+    paginator.page_size_query_param = 'limit'
+    page = await paginator.apaginate_queryset(Signalement.objects.filter(user=user).select_related('image_asset'), request)
+    return serialize_first_page(request, paginator, page)
+
+
+def serialize_first_page(request, paginator, page):
+    next_link = None
+    if paginator.next_cursor is not None:
+        next_link = request.build_absolute_uri(reverse('signalement-list-create'))
+        next_link = replace_query_param(next_link, 'page_size', paginator.page_size)
+        next_link = replace_query_param(next_link, paginator.cursor_query_param, paginator.next_cursor)
+
+    return SignalementSerializer(page, many=True).data, next_link
+
+
+def user_etag(request, *args, **kwargs):
+    # Empreinte des champs du profil (et de l'URL : ?fields=), calculée sans requête
+    user = request.user
+    return make_etag(
+        request.get_full_path(), user.pk, user.full_name, user.telephone, user.commune, user.image_url,
+        user.image_asset_id, user.role, user.terms,
+    )
+
+
+from .images import InvalidImage, aprocess_image, process_image
+from .tasks import stage_upload, submit_upload_job
 
 
 class RegisterUserAPIView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    throttle_classes = [PhoneRateThrottle, IPRateThrottle]
+    throttle_scope = 'register'
 
 
 class LoginAPIView(APIView):
+    throttle_classes = [PhoneRateThrottle, IPRateThrottle]
+    throttle_scope = 'login'
+
     def post(self, request):
         try:
             serializer = LoginSerializer(data=request.data)
@@ -49,26 +124,29 @@ class LoginAPIView(APIView):
                 telephone = serializer.validated_data['telephone']
                 password = serializer.validated_data['password']
 
-                print(f"telephone: {telephone}, password: {password}")
-                
-                user = authenticate(request, username=telephone, password=password)
+                with timed('password'):
+                    user = authenticate(request, username=telephone, password=password)
 
                 if user:
-                    refresh = RefreshToken.for_user(user)
-                    
-                    # Récupérer les signalements de l'utilisateur
-                    signalements = Signalement.objects.filter(user=user).order_by('-created_at')
-                    signalements_serializer = SignalementSerializer(signalements, many=True)
-                    
-                    return Response({
-                        'status': 'success',
-                        'user': get_user_data(user),
-                        'signalements': signalements_serializer.data,
-                        'tokens': {
+                    with timed('jwt'):
+                        refresh = RefreshToken.for_user(user)
+                        tokens = {
                             'refresh': str(refresh),
                             'access': str(refresh.access_token),
                         }
-                    })
+
+                    data = {
+                        'status': 'success',
+                        'user': get_user_data(user),
+                        'tokens': tokens,
+                    }
+
+                    # L'historique n'est chargé que sur demande (?include=signalements&limit=N),
+                    # et seulement sa première page : la suite passe par la liste paginée
+                    if 'signalements' in get_requested_includes(request):
+                        data['signalements'], data['signalements_next'] = get_signalements_first_page(request, user)
+
+                    return Response(data)
                 else:
                     return Response({
                         'status': 'error',
@@ -89,16 +167,95 @@ class LoginAPIView(APIView):
 
 
 
+@csrf_exempt
+@require_POST
+async def async_login(request):
+    """
+    Variante asynchrone de LoginAPIView (servie par asgi.py) : mêmes données,
+    mêmes réponses et mêmes limites de débit. Seuls le hachage du mot de passe
+    et les accès au cache passent dans un thread.
+    """
+    try:
+        payload = parse_request_data(request)
+    except ParseError as e:
+        return json_response({'detail': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+    wait = await sync_to_async(check_throttles)(
+        SimpleNamespace(META=request.META, headers=request.headers, data=payload), LoginAPIView, LoginAPIView.throttle_classes
+    )
+    if wait is not None:
+        return throttled_response(wait)
+
+    try:
+        serializer = LoginSerializer(data=payload)
+        if not serializer.is_valid():
+            return json_response({
+                'status': 'error',
+                'message': 'Données invalides',
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        telephone = serializer.validated_data['telephone']
+        password = serializer.validated_data['password']
+        with timed('password'):
+            user = await aauthenticate(request, username=telephone, password=password)
+        if not user:
+            return json_response({
+                'status': 'error',
+                'message': 'Numéro de téléphone ou mot de passe incorrect'
+            }, status=status.HTTP_401_UNAUTHORIZED)
+
+        with timed('jwt'):
+            refresh = RefreshToken.for_user(user)
+            tokens = {
+                'refresh': str(refresh),
+                'access': str(refresh.access_token),
+            }
+        data = {
+            'status': 'success',
+            'user': get_user_data(user),
+            'tokens': tokens,
+        }
+
+        # Request de DRF pour query_params (?include=, ?limit=)
+        api_request = Request(request)
+        if 'signalements' in get_requested_includes(api_request):
+            data['signalements'], data['signalements_next'] = await aget_signalements_first_page(api_request, user)
+
+        return json_response(data)
+
+    except Exception as e:
+        return json_response({
+            'status': 'error',
+            'message': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class TokenObtainPairAPIView(TokenObtainPairView):
+    # Obtention des jetons par /api/token/ : mêmes seaux que la connexion
+    throttle_classes = LoginAPIView.throttle_classes
+    throttle_scope = LoginAPIView.throttle_scope
+
+
+@method_decorator(condition(etag_func=user_etag), name='get')
 class ProfileAPIView(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'profile_upload'
+
+    def get_throttles(self):
+        # Seul l'upload de la photo (PUT) est limité
+        if self.request.method == 'PUT':
+            return [UserRateThrottle(), IPRateThrottle()]
+        return []
 
     def get(self, request):
-        serializer = UserSerializer(request.user)
+        serializer = UserSerializer(request.user, context={'request': request})
         return Response({
             'status': 'success',
             'profile': serializer.data
         })
 
+    @idempotent
     def put(self, request):
         if 'profile_picture' not in request.FILES:
             return Response({
@@ -106,14 +263,16 @@ class ProfileAPIView(APIView):
                 'message': 'Aucune image n\'a été fournie'
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        if request.query_params.get('mode') == 'background':
+            return self.put_background(request)
+
         try:
-            imgbb_service = ImgBBService()
-            image_url = imgbb_service.upload_image(request.FILES['profile_picture'])
+            asset = process_image(request.FILES['profile_picture'])
 
             user = request.user
-            serializer = UserSerializer(user, data={'image_url': image_url}, partial=True)
+            serializer = UserSerializer(user, data={'image_url': asset.url}, partial=True)
             if serializer.is_valid():
-                serializer.save()
+                serializer.save(image_asset=asset)
 
                 user_data = get_user_data(user)
 
@@ -128,19 +287,124 @@ class ProfileAPIView(APIView):
                 'errors': serializer.errors
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        except InvalidImage as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
         except Exception as e:
             return Response({
                 'status': 'error',
                 'message': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def put_background(self, request):
+        # Le fichier est mis en transit localement, l'upload distant se fait dans le pool de workers
+        staged_path = None
+        try:
+            staged_path = stage_upload(request.FILES['profile_picture'])
+            with transaction.atomic():
+                job = ImageUploadJob.objects.create(user=request.user, staged_path=staged_path)
+                # robust : un échec de soumission est journalisé, le job reste à reprendre par recover_upload_jobs
+                transaction.on_commit(lambda: submit_upload_job(job.id), robust=True)
 
+            return Response({
+                'status': 'success',
+                'job': ImageUploadJobSerializer(job).data,
+                'status_url': request.build_absolute_uri(reverse('profile-upload-job', args=[job.id])),
+            }, status=status.HTTP_202_ACCEPTED)
 
-class CurrentUserAPIView(APIView):
+        except Exception as e:
+            # Aucun job ne référence le fichier : personne d'autre ne le supprimerait
+            if staged_path and os.path.exists(staged_path):
+                os.remove(staged_path)
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@csrf_exempt
+@require_http_methods(['PUT'])
+async def async_profile_upload(request):
+    """
+    Variante asynchrone de l'upload de la photo de profil (PUT de
+    ProfileAPIView, servie par asgi.py) : les déclinaisons sont envoyées en
+    parallèle, et le worker sert d'autres requêtes pendant que l'hébergeur répond.
+    """
+    user = await aauthenticate_jwt(request)
+    if user is None:
+        return json_response({
+            'status': 'error',
+            'message': 'Jeton d\'authentification manquant ou invalide'
+        }, status=status.HTTP_401_UNAUTHORIZED)
+
+    wait = await sync_to_async(check_throttles)(
+        SimpleNamespace(META=request.META, headers=request.headers, user=user), ProfileAPIView, [UserRateThrottle, IPRateThrottle]
+    )
+    if wait is not None:
+        return throttled_response(wait)
+
+    try:
+        files = {}
+        if request.content_type == 'multipart/form-data':
+            # Django n'analyse le multipart que pour POST (request.FILES reste vide pour PUT)
+            _, files = await sync_to_async(request.parse_file_upload)(request.META, request)
+        if 'profile_picture' not in files:
+            return json_response({
+                'status': 'error',
+                'message': 'Aucune image n\'a été fournie'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        asset = await aprocess_image(files['profile_picture'])
+        user.image_url = asset.url
+        user.image_asset = asset
+        await user.asave(update_fields=['image_url', 'image_asset'])
+
+        return json_response({
+            'status': 'success',
+            'user': get_user_data(user)
+        })
+
+    except InvalidImage as e:
+        return json_response({
+            'status': 'error',
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    except Exception as e:
+        return json_response({
+            'status': 'error',
+            'message': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ImageUploadJobStatusAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        try:
+            job = ImageUploadJob.objects.get(id=job_id, user=request.user)
+        except ImageUploadJob.DoesNotExist:
+            return Response({
+                'status': 'error',
+                'message': 'Upload non trouvé'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'status': 'success',
+            'job': ImageUploadJobSerializer(job).data,
+            'user': get_user_data(job.user) if job.status == 'termine' else None,
+        })
+
+
+@method_decorator(condition(etag_func=user_etag), name='get')
+class CurrentUserAPIView(ReplicaReadsMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        serializer = UserSerializer(request.user)
+        serializer = UserSerializer(request.user, context={'request': request})
         return Response({
             'status': 'success',
             'user': serializer.data
@@ -216,6 +480,9 @@ class ChangePasswordAPIView(APIView):
 
 
 class RequestPasswordResetAPIView(APIView):
+    throttle_classes = [PhoneRateThrottle, IPRateThrottle]
+    throttle_scope = 'password_reset'
+
     def post(self, request):
         try:
             serializer = RequestPasswordResetSerializer(data=request.data)
@@ -294,18 +561,54 @@ class ResetPasswordAPIView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class AdminUserListView(APIView):
+class AdminUserPagination(KeysetPagination):
+    ordering = ('-date_joined', '-id')
+    page_size_setting = 'ADMIN_USER_PAGE_SIZE'
+    max_page_size_setting = 'ADMIN_USER_MAX_PAGE_SIZE'
+
+
+class AdminUserListView(ReplicaReadsMixin, APIView):
+    """
+    Annuaire paginé des utilisateurs : ?telephone= (préfixe), ?search= (nom ou
+    commune), ?role=, ?is_active=, avec le nombre de signalements de chacun.
+    """
     permission_classes = [IsAuthenticated, IsAdminUser]
 
+    def get_queryset(self, request):
+        params = request.query_params
+        # Nombre de signalements calculé dans la même requête (sous-requête indexée par user)
+        signalements_count = (
+            Signalement.objects.filter(user=OuterRef('pk'))
+            .order_by().values('user').annotate(count=Count('id')).values('count')
+        )
+        users = User.objects.select_related('image_asset').annotate(
+            signalements_count=Coalesce(Subquery(signalements_count), 0)
+        )
+
+        if params.get('telephone'):
+            users = users.filter(telephone__startswith=normalize_telephone(params['telephone']))
+        if params.get('search'):
+            users = users.filter(Q(full_name__icontains=params['search']) | Q(commune__icontains=params['search']))
+        if params.get('role'):
+            users = users.filter(role=params['role'])
+        if params.get('is_active') in ('true', 'false'):
+            users = users.filter(is_active=params['is_active'] == 'true')
+        return users
+
     def get(self, request):
         try:
-            users = User.objects.all().order_by('-date_joined')
-            serializer = AdminUserSerializer(users, many=True)
+            paginator = AdminUserPagination()
+            users = paginator.paginate_queryset(self.get_queryset(request), request, view=self)
+            serializer = AdminUserSerializer(users, many=True, context={'request': request})
             
             return Response({
                 'status': 'success',
-                'users': serializer.data
+                'users': serializer.data,
+                'next': paginator.get_next_link(),
             })
+        except NotFound:
+            # Curseur invalide : 404 via le gestionnaire d'exceptions de DRF
+            raise
         except Exception as e:
             return Response({
                 'status': 'error',
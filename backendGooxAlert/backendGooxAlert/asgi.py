@@ -5,6 +5,12 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
+
+Les vues asynchrones (flux /signalement/api/signalement/events/, variantes
+/auth/api/async/login/, /auth/api/async/profile/ et
+/signalement/api/async/signalement/) n'occupent aucun worker pendant leurs
+attentes réseau lorsqu'elles sont servies par ce point d'entrée, par exemple :
+    uvicorn backendGooxAlert.asgi:application --workers 4
 """
 
 import os
@@ -12,5 +18,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backendGooxAlert.settings")
+# Lu par settings.py : pas de connexions persistantes sous ASGI (voir DB_CONN_MAX_AGE)
+os.environ.setdefault("DJANGO_ASGI", "1")
 
 application = get_asgi_application()
@@ -0,0 +1,16 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+# Backends dont le contenu n'est visible que du processus qui l'a écrit
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared_cache(alias='default'):
+    """
+    Vrai si le cache ``alias`` est commun à tous les workers (Redis, Memcached,
+    fichiers, base). Les fonctions dont la cohérence en dépend (cache des
+    utilisateurs authentifiés, versions du cache de réponses, lecture de ses
+    propres écritures) sont désactivées sur un cache propre au processus.
+    """
+    return not isinstance(caches[alias], PROCESS_LOCAL_BACKENDS)
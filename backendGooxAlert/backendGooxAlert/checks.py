@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+from .cache import is_shared_cache
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    # manage.py check --deploy : les limites, verrous et invalidations doivent valoir pour tous les workers
+    errors = []
+    if not is_shared_cache():
+        errors.append(Error(
+            'Le cache par défaut est propre à chaque processus.',
+            hint='Configurez REDIS_URL : limitation de débit, clés d\'idempotence, cache des utilisateurs '
+                 'et invalidations ne sont sinon pas partagés entre les workers.',
+            id='backendGooxAlert.E001',
+        ))
+        if settings.DATABASE_REPLICA in settings.DATABASES:
+            errors.append(Error(
+                'DB_REPLICA_HOST est configuré mais le cache par défaut n\'est pas partagé.',
+                hint='Les lectures restent sur la base principale tant que REDIS_URL ne désigne pas '
+                     'un cache commun : la lecture de ses propres écritures en dépend.',
+                id='backendGooxAlert.E002',
+            ))
+    if settings.SIGNALEMENT_RESPONSE_CACHE != 'default' and not is_shared_cache(settings.SIGNALEMENT_RESPONSE_CACHE):
+        errors.append(Error(
+            f'Le cache « {settings.SIGNALEMENT_RESPONSE_CACHE} » (SIGNALEMENT_RESPONSE_CACHE) est propre à chaque processus.',
+            hint='Le cache de réponses des signalements reste désactivé tant qu\'il ne désigne pas un cache partagé.',
+            id='backendGooxAlert.E003',
+        ))
+    return errors
+
+
+@register(deploy=True)
+def check_events_backend(app_configs, **kwargs):
+    # Les changements de statut publiés par un worker WSGI n'atteignent pas le processus ASGI du flux
+    if settings.SIGNALEMENT_EVENTS_BACKEND == 'signalement.events.InMemoryBroadcaster':
+        return [Warning(
+            'Le flux des changements de statut (SIGNALEMENT_EVENTS_BACKEND) est diffusé en mémoire du processus.',
+            hint='Configurez REDIS_URL (RedisBroadcaster) : les transitions faites par un autre processus '
+                 'ne sont sinon jamais envoyées aux abonnés.',
+            id='backendGooxAlert.W001',
+        )]
+    return []
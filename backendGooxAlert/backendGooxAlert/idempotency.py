@@ -0,0 +1,196 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache import is_shared_cache
+
+_stores = {}
+
+
+def get_idempotency_store():
+    if settings.IDEMPOTENCY_STORE not in _stores:
+        _stores[settings.IDEMPOTENCY_STORE] = import_string(settings.IDEMPOTENCY_STORE)()
+    return _stores[settings.IDEMPOTENCY_STORE]
+
+
+class CacheIdempotencyStore:
+    """
+    Réponses enregistrées dans le cache Django : durée de vie IDEMPOTENCY_TTL,
+    éviction assurée par le cache (MAX_ENTRIES, LRU de Redis...). Le verrou
+    repose sur cache.add(), atomique sur les caches partagés.
+
+    Un cache propre au processus est refusé : deux workers prendraient chacun
+    le verrou et exécuteraient la même requête.
+    """
+
+    def __init__(self):
+        if not is_shared_cache():
+            raise ImproperlyConfigured(
+                'CacheIdempotencyStore exige un cache partagé entre les workers (REDIS_URL) ; '
+                'LocalIdempotencyStore ne convient qu\'à un seul processus.'
+            )
+
+    def get(self, key):
+        return cache.get(key)
+
+    def set(self, key, value, timeout):
+        cache.set(key, value, timeout)
+
+    def acquire(self, key, timeout):
+        token = uuid.uuid4().hex
+        return token if cache.add(f'{key}:lock', token, timeout) else None
+
+    def release(self, key, token):
+        if cache.get(f'{key}:lock') == token:
+            cache.delete(f'{key}:lock')
+
+    def clear(self):
+        pass
+
+
+class LocalIdempotencyStore:
+    # Stockage en mémoire du processus (tests, un seul worker), borné à IDEMPOTENCY_MAX_ENTRIES (LRU)
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.IDEMPOTENCY_MAX_ENTRIES:
+                self.entries.popitem(last=False)
+
+    def acquire(self, key, timeout):
+        with self.lock:
+            token, expires_at = self.locks.get(key, (None, 0))
+            if token is not None and expires_at > time.monotonic():
+                return None
+            token = uuid.uuid4().hex
+            self.locks[key] = (token, time.monotonic() + timeout)
+            return token
+
+    def release(self, key, token):
+        with self.lock:
+            if self.locks.get(key, (None, 0))[0] == token:
+                del self.locks[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.locks.clear()
+
+
+def request_fingerprint(request):
+    """
+    Empreinte du corps de la requête. Un envoi multipart n'est pas relu
+    depuis request.body (fichiers sur disque) : ses champs et le contenu de
+    ses fichiers sont hachés par blocs.
+    """
+    if not request.content_type.startswith('multipart/'):
+        return hashlib.sha256(request.body).hexdigest()
+    digest = hashlib.sha256()
+    for name, values in sorted(request.POST.lists()):
+        digest.update(repr((name, values)).encode())
+    for name, files in sorted(request.FILES.lists()):
+        for uploaded in files:
+            digest.update(repr((name, uploaded.name, uploaded.size)).encode())
+            for chunk in uploaded.chunks():
+                digest.update(chunk)
+            uploaded.seek(0)
+    return digest.hexdigest()
+
+
+def replay(stored, fingerprint):
+    # Réponse enregistrée pour cette clé, ou 422 si elle a servi à une autre requête
+    if stored['fingerprint'] != fingerprint:
+        return Response({
+            'status': 'error',
+            'message': 'Idempotency-Key déjà utilisé pour une autre requête'
+        }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    response = Response(stored['data'], status=stored['status'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(method):
+    """
+    Rend une méthode de vue (POST, PUT) rejouable avec l'en-tête Idempotency-Key :
+    la première réponse (hors erreurs 5xx) est enregistrée et renvoyée telle
+    quelle aux tentatives suivantes, sans nouvelle écriture en base ni nouvel
+    upload. Une requête identique reçue pendant le traitement attend la
+    première (au plus IDEMPOTENCY_WAIT_TIMEOUT, le worker restant occupé)
+    puis reçoit un 409 au lieu de s'exécuter en parallèle.
+    """
+
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get('HTTP_IDEMPOTENCY_KEY')
+        if not key or not request.user.is_authenticated:
+            return method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({
+                'status': 'error',
+                'message': 'Idempotency-Key trop long (255 caractères maximum)'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        store = get_idempotency_store()
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        store_key = f'idempotency:{request.user.pk}:{request.method}:{request.path}:{digest}'
+        fingerprint = request_fingerprint(request)
+
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        while True:
+            stored = store.get(store_key)
+            if stored is not None:
+                return replay(stored, fingerprint)
+            token = store.acquire(store_key, settings.IDEMPOTENCY_LOCK_TIMEOUT)
+            if token is not None:
+                break
+            if time.monotonic() >= deadline:
+                return Response({
+                    'status': 'error',
+                    'message': 'Une requête avec ce Idempotency-Key est en cours de traitement'
+                }, status=status.HTTP_409_CONFLICT)
+            time.sleep(0.05)
+
+        try:
+            # Réponse enregistrée entre notre lecture et la prise du verrou
+            stored = store.get(store_key)
+            if stored is not None:
+                return replay(stored, fingerprint)
+            response = method(self, request, *args, **kwargs)
+            if response.status_code < 500:
+                store.set(store_key, {
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'data': response.data,
+                }, settings.IDEMPOTENCY_TTL)
+            return response
+        finally:
+            store.release(store_key, token)
+
+    return wrapper
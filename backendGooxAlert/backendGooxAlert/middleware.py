@@ -0,0 +1,233 @@
+import cProfile
+import gzip
+import logging
+import random
+import re
+import time
+import uuid
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import SimpleLazyObject
+
+from .routers import amark_write, mark_write, replica_configured
+from .timing import end_request, install_sql_timers, start_request
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # dépendance optionnelle : gzip uniquement
+    brotli = None
+
+COMPRESSIBLE_TYPES = re.compile(r'^(application/(json|javascript|xml)|text/)')
+ACCEPT_ENCODING = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def accepted_encodings(header):
+    # Encodages acceptés par le client (q > 0) : {'br', 'gzip', ...}
+    encodings = set()
+    for part in header.split(','):
+        match = ACCEPT_ENCODING.match(part)
+        if match and float(match.group(2) or 1) > 0:
+            encodings.add(match.group(1).lower())
+    return encodings
+
+
+class CompressionMiddleware:
+    """
+    Compresse les réponses volumineuses (listes de signalements, annuaire...)
+    en Brotli si le client l'accepte et que le module est installé, sinon en
+    gzip. Les petites réponses, les flux (StreamingHttpResponse) et les
+    contenus déjà compressés (images) sont laissés tels quels, ainsi que les
+    réponses des vues de COMPRESSION_EXCLUDED_VIEWS : elles contiennent des
+    jetons, qu'une attaque BREACH pourrait retrouver à partir de la taille
+    compressée (aucun bourrage aléatoire n'est ajouté ici).
+
+    Compatible synchrone et asynchrone : sous asgi.py, la chaîne de
+    middlewares reste asynchrone jusqu'aux vues async, sans passage par un thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        return self.compress(request, response)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return self.compress(request, response)
+
+    def compress(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.view_name in settings.COMPRESSION_EXCLUDED_VIEWS:
+            return response
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        if not COMPRESSIBLE_TYPES.match(response.get('Content-Type', '')):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encodings = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in encodings:
+            encoding = 'br'
+            content = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        elif 'gzip' in encodings:
+            encoding = 'gzip'
+            content = gzip.compress(response.content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+        else:
+            return response
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        # Le corps transmis diffère selon l'encodage : l'ETag devient faible (comme GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+
+class ReadYourWritesMiddleware:
+    """
+    Note la dernière écriture réussie (POST, PUT, PATCH, DELETE) de
+    l'utilisateur authentifié (JWT compris : DRF pose l'utilisateur sur la
+    requête Django) : ses lectures restent un moment sur la base principale,
+    voir ``backendGooxAlert.routers``.
+    """
+    sync_capable = True
+    async_capable = True
+    safe_methods = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self.is_write(request, response):
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                mark_write(user.pk)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self.is_write(request, response):
+            user = getattr(request, 'user', None)
+            if isinstance(user, SimpleLazyObject) and hasattr(request, 'auser'):
+                # Utilisateur de session pas encore chargé : lecture asynchrone
+                user = await request.auser()
+            if user is not None and user.is_authenticated:
+                await amark_write(user.pk)
+        return response
+
+    def is_write(self, request, response):
+        return request.method not in self.safe_methods and response.status_code < 400 and replica_configured()
+
+
+class ServerTimingMiddleware:
+    """
+    Mesure chaque requête : en-tête Server-Timing si SERVER_TIMING (SQL : nombre et durée,
+    sérialisation, rendu JSON, hébergeur d'images..., total) et avertissement
+    au-delà de QUERY_BUDGET requêtes SQL, avec la requête la plus répétée
+    (N+1 probable).
+
+    Avec PROFILING_ENABLED, une fraction PROFILING_SAMPLE_RATE des requêtes
+    (limitée aux préfixes PROFILING_PATHS) est profilée par cProfile ; le
+    fichier .prof écrit dans PROFILING_DIR se lit avec pstats, snakeviz ou
+    flameprof (flame graph).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token = start_request()
+        install_sql_timers()
+        profiler = self.start_profiler(request)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            end_request(token)
+        total = (time.perf_counter() - start) * 1000
+        if profiler is not None:
+            self.dump_profile(profiler, request, total)
+        return self.finish(request, response, timings, total)
+
+    async def __acall__(self, request):
+        # Pas de profilage ici : cProfile mesurerait toutes les coroutines de la boucle
+        timings, token = start_request()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        return self.finish(request, response, timings, (time.perf_counter() - start) * 1000)
+
+    def finish(self, request, response, timings, total):
+        if self.show_server_timing(request):
+            response['Server-Timing'] = timings.server_timing(total)
+
+        count = timings.counts['sql']
+        if settings.QUERY_BUDGET is not None and count > settings.QUERY_BUDGET:
+            sql, repeated = timings.queries.most_common(1)[0]
+            logger.warning(
+                "%s %s : %d requêtes SQL (budget %d), la plus répétée (%d fois) : %s",
+                request.method, request.path, count, settings.QUERY_BUDGET, repeated, sql[:300],
+            )
+        return response
+
+    def show_server_timing(self, request):
+        if not settings.SERVER_TIMING:
+            return False
+        if not settings.SERVER_TIMING_STAFF_ONLY:
+            return True
+        # Utilisateur posé par DRF (ou aauthenticate_jwt) pendant la vue
+        user = getattr(request, 'user', None)
+        return bool(user and user.is_authenticated and (user.is_staff or getattr(user, 'role', None) == 'admin'))
+
+    def start_profiler(self, request):
+        if not settings.PROFILING_ENABLED or random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return None
+        if settings.PROFILING_PATHS and not request.path.startswith(tuple(settings.PROFILING_PATHS)):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # un autre profileur est déjà actif
+            return None
+        return profiler
+
+    def dump_profile(self, profiler, request, total):
+        directory = Path(settings.PROFILING_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r'[^\w-]+', '_', request.path).strip('_') or 'racine'
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{slug}-{total:.0f}ms-{uuid.uuid4().hex[:6]}.prof"
+        profiler.dump_stats(directory / name)
+        logger.info('Profil de %s %s (%.0f ms) : %s', request.method, request.path, total, directory / name)
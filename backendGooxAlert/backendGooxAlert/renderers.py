@@ -0,0 +1,79 @@
+import io
+
+from django.http import HttpResponse
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .timing import timed
+
+try:
+    import orjson
+except ImportError:  # dépendance optionnelle : repli sur le module json de DRF
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer utilisant orjson s'il est installé.
+
+    Hors flottants non finis, la sortie décode vers les mêmes valeurs que celle
+    de DRF : mêmes séparateurs compacts, UTF-8 non échappé, \\u2028/\\u2029 échappés ; elle est identique
+    octet pour octet pour les chaînes, entiers, booléens, listes, dictionnaires
+    et la plupart des flottants. Différences :
+
+    - exposants des flottants : orjson écrit 1e16 et 1e-7, DRF 1e+16 et 1e-07 ;
+    - NaN et ±Infinity : orjson écrit null, DRF (STRICT_JSON) lève ValueError.
+
+    Les dates passent par l'encodeur de DRF, et tout ce qu'orjson refuse
+    (entiers > 64 bits, indentation demandée...) est rendu par DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return self.encode(data, accepted_media_type, renderer_context)
+
+    def encode(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=JSONEncoder().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Comme DRF : JSON strictement compatible JavaScript
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    # JSONParser utilisant orjson s'il est installé (NaN et Infinity sont refusés, comme en mode strict)
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+def json_response(data, status=200, headers=None):
+    # Réponse JSON des vues asynchrones (hors DRF), rendue comme celles de l'API
+    return HttpResponse(FastJSONRenderer().render(data), status=status, headers=headers, content_type='application/json')
+
+
+def parse_request_data(request):
+    """
+    Données d'une requête JSON ou formulaire pour les vues asynchrones (hors
+    DRF). Lève ParseError si le JSON est invalide.
+    """
+    if request.content_type == 'application/json':
+        return FastJSONParser().parse(io.BytesIO(request.body)) if request.body else {}
+    return request.POST
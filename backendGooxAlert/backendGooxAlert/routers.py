@@ -0,0 +1,100 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import is_shared_cache
+
+# Alias des lectures de la requête en cours (None : base principale). Un
+# ContextVar suit la requête dans son thread comme dans ses tâches asynchrones.
+_read_database = ContextVar('read_database', default=None)
+
+
+def replica_configured():
+    # Sans cache partagé, un worker ignorerait les écritures marquées par les autres :
+    # les lectures restent alors sur la base principale
+    return settings.DATABASE_REPLICA in settings.DATABASES and is_shared_cache()
+
+
+def last_write_key(user_id):
+    return f'db:last-write:{user_id}'
+
+
+def mark_write(user_id):
+    # Les lectures de cet utilisateur restent sur la base principale le temps que le réplica rattrape
+    cache.set(last_write_key(user_id), time.time(), settings.DATABASE_REPLICA_STICKY_SECONDS)
+
+
+async def amark_write(user_id):
+    await cache.aset(last_write_key(user_id), time.time(), settings.DATABASE_REPLICA_STICKY_SECONDS)
+
+
+def recently_wrote(user_id):
+    return cache.get(last_write_key(user_id)) is not None
+
+
+@contextmanager
+def replica_reads(user=None):
+    """
+    Envoie au réplica les lectures faites dans le bloc, sauf si ``user`` a
+    écrit depuis moins de DATABASE_REPLICA_STICKY_SECONDS : il relit alors
+    ses propres écritures sur la base principale.
+    """
+    alias = None
+    if replica_configured():
+        user_id = getattr(user, 'pk', None)
+        if user_id is None or not recently_wrote(user_id):
+            alias = settings.DATABASE_REPLICA
+    token = _read_database.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_database.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Lectures vers le réplica seulement dans replica_reads() (vues de lecture
+    qui l'acceptent) ; écritures, migrations et tout le reste sur la base
+    principale.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Le réplica contient les mêmes lignes que la base principale
+        databases = {'default', settings.DATABASE_REPLICA}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == settings.DATABASE_REPLICA:
+            return False
+        return None
+
+
+class ReplicaReadsMixin:
+    """
+    Vue DRF dont les GET/HEAD lisent sur le réplica (voir replica_reads),
+    y compris les validateurs ETag / Last-Modified et le cache de réponses.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in ('GET', 'HEAD'):
+            self._replica_reads = replica_reads(request.user)
+            self._replica_reads.__enter__()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        replica = getattr(self, '_replica_reads', None)
+        if replica is not None:
+            self._replica_reads = None
+            replica.__exit__(None, None, None)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,40 @@
+from .timing import timed
+
+
+def requested_fields(request):
+    """
+    Champs demandés par ?fields=a,b et retirés par ?exclude=c (lectures
+    uniquement) : (ensemble ou None, ensemble).
+    """
+    if request is None or request.method != 'GET':
+        return None, set()
+    params = request.query_params
+    fields = {name.strip() for name in params.get('fields', '').split(',') if name.strip()} or None
+    exclude = {name.strip() for name in params.get('exclude', '').split(',') if name.strip()}
+    return fields, exclude
+
+
+class DynamicFieldsMixin:
+    """
+    Réduit les champs sérialisés selon ?fields= / ?exclude= de la requête du
+    contexte, ou les arguments ``fields`` / ``exclude`` du constructeur.
+    Les noms inconnus sont ignorés.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        exclude = kwargs.pop('exclude', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is None and exclude is None:
+            fields, exclude = requested_fields(self.context.get('request'))
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in exclude or ():
+            self.fields.pop(name, None)
+
+    def to_representation(self, instance):
+        # Temps de sérialisation cumulé de la requête (en-tête Server-Timing)
+        with timed('serialize'):
+            return super().to_representation(instance)
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -81,19 +82,31 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',  # Rejeu des créations et uploads (backendGooxAlert.idempotency)
+    'if-modified-since',  # GET conditionnels (validateurs ETag / Last-Modified)
+    'if-none-match',
     'origin',
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
 ]
 
+# Validateurs lisibles par le client web (réponses cross-origin)
+CORS_EXPOSE_HEADERS = [
+    'etag',
+    'last-modified',
+]
+
 MIDDLEWARE = [
+    "backendGooxAlert.middleware.ServerTimingMiddleware",  # En premier : mesure toute la chaîne
     "django.middleware.security.SecurityMiddleware",
+    "backendGooxAlert.middleware.CompressionMiddleware",  # Compresse la réponse finale
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",  # Doit être placé avant CommonMiddleware
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "backendGooxAlert.middleware.ReadYourWritesMiddleware",  # Après l'authentification
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -122,17 +135,79 @@ WSGI_APPLICATION = "backendGooxAlert.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# Connexions réutilisées d'une requête à l'autre : persistantes pendant
+# DB_CONN_MAX_AGE secondes, ou pool psycopg 3 avec DB_POOL=1 (Django >= 5.1,
+# psycopg[pool]). CONN_HEALTH_CHECKS vérifie une connexion persistante avant
+# de la réutiliser (redémarrage de PostgreSQL, coupure réseau...).
+# Sous ASGI (DJANGO_ASGI=1, posé par asgi.py), les connexions persistantes ne
+# sont jamais fermées par les threads de sync_to_async : CONN_MAX_AGE vaut 0
+# par défaut et le pool (DB_POOL=1) est la façon de réutiliser les connexions.
+DJANGO_ASGI = os.getenv('DJANGO_ASGI', '0') == '1'
+DB_POOL = os.getenv('DB_POOL', '0') == '1'
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', 0 if DJANGO_ASGI else 60))
+
+
+def database(host, port):
+    config = {
         'ENGINE': 'django.db.backends.postgresql',
         'NAME': 'gooxalert',
         'USER': 'codiallo',
         'PASSWORD': '0101',
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'HOST': host,
+        'PORT': port,
+        'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
     }
+    if DB_POOL:
+        config['OPTIONS'] = {'pool': {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            'timeout': 10,
+        }}
+    return config
+
+
+DATABASES = {
+    'default': database(os.getenv('DB_HOST', 'localhost'), os.getenv('DB_PORT', '5432')),
 }
 
+# Réplica en lecture (DB_REPLICA_HOST) : utilisé par les vues de lecture (liste et
+# détail des signalements, /me, annuaire), sauf pendant DATABASE_REPLICA_STICKY_SECONDS
+# après une écriture de l'utilisateur, qui relit ainsi ses propres écritures.
+# Le marqueur d'écriture vit dans le cache : il doit être partagé entre les workers.
+DATABASE_REPLICA = 'replica'
+DATABASE_REPLICA_STICKY_SECONDS = 10
+if os.getenv('DB_REPLICA_HOST'):
+    DATABASES[DATABASE_REPLICA] = database(os.getenv('DB_REPLICA_HOST'), os.getenv('DB_REPLICA_PORT', '5432'))
+    DATABASES[DATABASE_REPLICA]['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['backendGooxAlert.routers.ReplicaRouter']
+
+
+# Cache partagé par tous les workers (Redis) : cache des utilisateurs authentifiés,
+# limitation de débit, clés d'idempotence, versions du cache de réponses et
+# marqueur de lecture de ses propres écritures en dépendent
+# (vérifié par manage.py check --deploy). Sans REDIS_URL, cache en mémoire du
+# processus : serveur de développement uniquement
+REDIS_URL = os.getenv('REDIS_URL')
+TESTING = sys.argv[1:2] == ['test']
+if TESTING:
+    # Tests hors ligne : cache sur fichiers, partagé entre processus comme Redis
+    from authentification.testing import SHARED_CACHES as CACHES
+elif REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+SHARED_CACHE = TESTING or bool(REDIS_URL)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -185,10 +260,146 @@ AUTH_USER_MODEL = 'authentification.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentification.authentication.CachedJWTAuthentication',
+    ),
+    # orjson s'il est installé (écarts de format avec le JSONRenderer de DRF : voir FastJSONRenderer)
+    'DEFAULT_RENDERER_CLASSES': (
+        'backendGooxAlert.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
+    'DEFAULT_PARSER_CLASSES': (
+        'backendGooxAlert.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # Nombre de proxys de confiance devant l'application (nginx : 1). L'IP des
+    # limitations de débit est lue à cette position de X-Forwarded-For ; à 0,
+    # l'en-tête, falsifiable par le client, est ignoré au profit de REMOTE_ADDR.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 0)),
 }
 
+# Instrumentation des requêtes (backendGooxAlert.middleware.ServerTimingMiddleware) :
+# en-tête Server-Timing opt-in, réservé par défaut au personnel (is_staff ou rôle
+# admin) car il révèle le coût interne des requêtes, avertissement au-delà de
+# QUERY_BUDGET requêtes SQL (None : jamais), et profilage cProfile opt-in d'un
+# échantillon des requêtes (PROFILING_PATHS vide : tous les chemins), écrit dans PROFILING_DIR
+SERVER_TIMING = os.getenv('SERVER_TIMING', '0') == '1'
+SERVER_TIMING_STAFF_ONLY = os.getenv('SERVER_TIMING_STAFF_ONLY', '1') == '1'
+QUERY_BUDGET = 30
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', '0') == '1'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0.01))
+PROFILING_PATHS = []
+PROFILING_DIR = BASE_DIR / 'profiles'
+
+# Compression des réponses (Brotli si le module est installé, sinon gzip)
+# au-delà de COMPRESSION_MIN_SIZE octets
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+# Vues (noms d'URL) dont les réponses contiennent des jetons : jamais compressées (BREACH)
+COMPRESSION_EXCLUDED_VIEWS = {
+    'login', 'async-login', 'token_obtain_pair', 'token_refresh', 'update_personal_info',
+    'modifier-mot-de-passe', 'reinitialiser-mot-de-passe', 'signalement-events-token',
+}
+
+# En-tête Idempotency-Key (création de signalements, photo de profil) : réponses
+# conservées IDEMPOTENCY_TTL secondes ; une requête en double attend au plus
+# IDEMPOTENCY_WAIT_TIMEOUT secondes la fin de la première (elle occupe un worker
+# pendant ce temps), puis reçoit un 409 à retenter plus tard
+IDEMPOTENCY_STORE = (
+    'backendGooxAlert.idempotency.CacheIdempotencyStore' if SHARED_CACHE
+    else 'backendGooxAlert.idempotency.LocalIdempotencyStore'
+)
+IDEMPOTENCY_TTL = 24 * 3600
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+IDEMPOTENCY_WAIT_TIMEOUT = 0.3
+IDEMPOTENCY_MAX_ENTRIES = 10000
+
+# Limitation de débit (seaux à jetons) des endpoints coûteux, par numéro, IP et utilisateur.
+# Les compteurs vivent dans THROTTLE_STORE : cache partagé (obligatoire pour
+# CacheTokenBucketStore), LocalTokenBucketStore pour un seul processus (défaut sans REDIS_URL)
+THROTTLE_STORE = (
+    'authentification.throttling.CacheTokenBucketStore' if SHARED_CACHE
+    else 'authentification.throttling.LocalTokenBucketStore'
+)
+THROTTLE_RATES = {
+    'login.phone': '5/min',
+    'login.ip': '30/min',
+    'register.phone': '3/hour',
+    'register.ip': '20/hour',
+    'password_reset.phone': '3/hour',
+    'password_reset.ip': '20/hour',
+    'profile_upload.user': '10/hour',
+    'profile_upload.ip': '60/hour',
+}
+
+# Durée (s) pendant laquelle l'utilisateur d'un jeton JWT est servi depuis le cache
+# (seulement si ce cache est partagé entre les workers : voir backendGooxAlert.cache)
+AUTH_USER_CACHE_TIMEOUT = 300
+
+# Pagination keyset des signalements (taille par défaut et plafond de ?page_size=)
+SIGNALEMENT_PAGE_SIZE = int(os.getenv('SIGNALEMENT_PAGE_SIZE', 20))
+SIGNALEMENT_MAX_PAGE_SIZE = int(os.getenv('SIGNALEMENT_MAX_PAGE_SIZE', 100))
+
+# Liste compacte (?compact=1) : longueur maximale de la description renvoyée
+SIGNALEMENT_COMPACT_DESCRIPTION_LENGTH = 120
+
+# Pagination de l'annuaire des utilisateurs (administration)
+ADMIN_USER_PAGE_SIZE = 50
+ADMIN_USER_MAX_PAGE_SIZE = 200
+
+# Cache des réponses de lecture des signalements (liste, détail) : alias de CACHES,
+# désactivé si ce cache n'est pas partagé entre les workers (mémoire locale...)
+SIGNALEMENT_RESPONSE_CACHE = 'default'
+SIGNALEMENT_RESPONSE_CACHE_TIMEOUT = 300
+
+# Nombre maximum de modifications renvoyées par appel de synchronisation
+SIGNALEMENT_SYNC_BATCH_SIZE = int(os.getenv('SIGNALEMENT_SYNC_BATCH_SIZE', 500))
+# Recouvrement des lectures de synchronisation : une écriture dont la transaction
+# dure plus longtemps peut être publiée derrière la position d'un client et manquée
+SIGNALEMENT_SYNC_OVERLAP = timedelta(seconds=int(os.getenv('SIGNALEMENT_SYNC_OVERLAP_SECONDS', 120)))
+
+# Recherches géographiques : nombre maximum de résultats et rayon maximum (m)
+SIGNALEMENT_GEO_MAX_RESULTS = 500
+SIGNALEMENT_NEARBY_MAX_RADIUS = 50000
+
+# Regroupements par tuile de carte : zoom maximum et durée de vie du cache (s),
+# les tuiles touchées par une création ou un changement de statut étant invalidées
+SIGNALEMENT_CLUSTER_MAX_ZOOM = 18
+SIGNALEMENT_CLUSTER_CACHE_TIMEOUT = 3600
+
+# Nombre maximum de signalements par envoi groupé (file hors connexion de l'application)
+SIGNALEMENT_BATCH_MAX_ITEMS = 50
+
+# Nombre maximum de signalements par changement de statut groupé (modération)
+SIGNALEMENT_BULK_MAX_IDS = 1000
+
+# Détection des doublons à la création : similarité minimale (Jaccard des
+# 4-grammes du titre et de la description), rayon (m) et fenêtre (jours)
+# de recherche, nombre maximum de candidats comparés par insertion
+SIGNALEMENT_DUPLICATE_THRESHOLD = 0.5
+SIGNALEMENT_DUPLICATE_RADIUS = 300
+SIGNALEMENT_DUPLICATE_WINDOW_DAYS = 30
+SIGNALEMENT_DUPLICATE_MAX_CANDIDATES = 20
+
+# Flux temps réel (Server-Sent Events) des changements de statut : diffusion par
+# Redis entre les processus (les transitions de modération sont faites par les
+# workers WSGI, le flux est servi par ASGI), en mémoire sans REDIS_URL (un seul processus)
+SIGNALEMENT_EVENTS_BACKEND = (
+    'signalement.events.RedisBroadcaster' if REDIS_URL and not TESTING
+    else 'signalement.events.InMemoryBroadcaster'
+)
+SIGNALEMENT_EVENTS_REDIS_URL = REDIS_URL
+SIGNALEMENT_EVENTS_KEEPALIVE = 15
+# Durée de vie du jeton de flux (?token=) ; le flux est fermé à l'expiration du jeton
+# qui l'a ouvert et l'utilisateur est revérifié à chaque keepalive
+SIGNALEMENT_EVENTS_TOKEN_LIFETIME = timedelta(minutes=5)
+SIGNALEMENT_EVENTS_RETRY_MS = 5000
+SIGNALEMENT_EVENTS_QUEUE_SIZE = 100
+
+# Recherche plein texte : nombre maximum de résultats par requête
+SIGNALEMENT_SEARCH_MAX_RESULTS = 50
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -218,3 +429,33 @@ X_FRAME_OPTIONS = 'DENY'
 
 # ImgBB Configuration
 IMGBB_API_KEY = os.getenv('IMGBB_API_KEY', '49a117f96f4b6126c8c616a07f23eb06')
+IMGBB_API_URL = os.getenv('IMGBB_API_URL', 'https://api.imgbb.com/1/upload')
+
+# Client HTTP de l'hébergeur d'images : pool keep-alive, délais (connexion, lecture)
+# en secondes et nouvelles tentatives avec attente exponentielle
+IMAGE_HOST_POOL_SIZE = 10
+# Connexions simultanées du client asynchrone (vues servies par asgi.py)
+IMAGE_HOST_ASYNC_POOL_SIZE = 100
+IMAGE_HOST_TIMEOUT = (5, 30)
+IMAGE_HOST_MAX_RETRIES = 3
+IMAGE_HOST_RETRY_BACKOFF = 0.5
+
+# Hébergeur d'images : ImgBB, ou 'authentification.services.LocalImageHostService'
+# pour tout garder dans MEDIA_ROOT (développement, tests hors ligne)
+IMAGE_HOST_BACKEND = os.getenv('IMAGE_HOST_BACKEND', 'authentification.services.ImgBBService')
+LOCAL_IMAGE_HOST_DIR = 'images'
+
+# Traitement des images : tailles maximales (px) des déclinaisons, qualité
+# d'encodage et nombre de pixels au-delà duquel une image est refusée
+IMAGE_LARGE_SIZE = 2048
+IMAGE_MEDIUM_SIZE = 800
+IMAGE_THUMBNAIL_SIZE = 200
+IMAGE_QUALITY = 82
+IMAGE_MAX_PIXELS = 40_000_000
+
+# Uploads en arrière-plan (PUT /auth/api/profile/?mode=background)
+IMAGE_UPLOAD_STAGING_DIR = os.path.join(BASE_DIR, 'staging')
+IMAGE_UPLOAD_WORKERS = int(os.getenv('IMAGE_UPLOAD_WORKERS', 4))  # 0 : exécution immédiate
+# Durée (s) au-delà de laquelle un job en attente ou en cours est considéré comme perdu
+# et repris par la commande recover_upload_jobs (à lancer au démarrage et périodiquement)
+IMAGE_UPLOAD_JOB_TIMEOUT = int(os.getenv('IMAGE_UPLOAD_JOB_TIMEOUT', 600))
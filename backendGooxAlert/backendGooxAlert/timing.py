@@ -0,0 +1,94 @@
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Mesures de la requête HTTP en cours (None hors requête). Le ContextVar suit
+# la requête dans les threads de sync_to_async et les tâches asynchrones.
+_timings = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """
+    Durées cumulées (ms) par métrique de la requête en cours : « sql »,
+    « serialize », « render », « imagehost »... et nombre d'exécutions de
+    chaque requête SQL (texte paramétré), pour repérer les N+1.
+    """
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.counts = Counter()
+        self.queries = Counter()
+
+    def add(self, name, duration):
+        self.durations[name] += duration
+        self.counts[name] += 1
+
+    def server_timing(self, total):
+        # Valeur de l'en-tête Server-Timing (durées en ms, total en dernier) ; ASCII
+        # uniquement, les valeurs d'en-tête HTTP étant encodées en latin-1
+        parts = []
+        for name, duration in self.durations.items():
+            part = f'{name};dur={duration:.1f}'
+            if name == 'sql':
+                part += f';desc="{self.counts[name]} queries"'
+            parts.append(part)
+        parts.append(f'total;dur={total:.1f}')
+        return ', '.join(parts)
+
+
+def start_request():
+    # Retourne (mesures, jeton à passer à end_request)
+    timings = RequestTimings()
+    return timings, _timings.set(timings)
+
+
+def end_request(token):
+    _timings.reset(token)
+
+
+@contextmanager
+def timed(name):
+    """
+    Ajoute la durée du bloc à la métrique ``name`` de la requête en cours.
+    Des blocs concurrents (uploads en parallèle) s'additionnent.
+    """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - start) * 1000)
+
+
+def sql_timer(execute, sql, params, many, context):
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('sql', (time.perf_counter() - start) * 1000)
+        timings.queries[sql] += 1
+
+
+def install_sql_timer(sender=None, connection=None, **kwargs):
+    # En tête de liste : connection.execute_wrapper() retire le dernier wrapper ajouté
+    if sql_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, sql_timer)
+
+
+def install_sql_timers():
+    # Connexions déjà ouvertes du thread courant ; les suivantes via connection_created
+    for connection in connections.all(initialized_only=True):
+        install_sql_timer(connection=connection)
+
+
+connection_created.connect(install_sql_timer)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SignalementConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "signalement"
+
+    def ready(self):
+        from . import signals  # noqa: F401
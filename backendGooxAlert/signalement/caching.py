@@ -0,0 +1,109 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from backendGooxAlert.cache import is_shared_cache
+
+HIT_COUNTER_KEY = 'signalement:response-cache:hits'
+MISS_COUNTER_KEY = 'signalement:response-cache:misses'
+
+
+def get_response_cache():
+    # Alias de CACHES désigné par SIGNALEMENT_RESPONSE_CACHE (Redis en production)
+    return caches[settings.SIGNALEMENT_RESPONSE_CACHE]
+
+
+def response_cache_enabled():
+    # Sur un cache propre au processus, une écriture ne changerait la version que
+    # dans un worker : les autres serviraient des réponses périmées
+    return is_shared_cache(settings.SIGNALEMENT_RESPONSE_CACHE)
+
+
+def user_version_key(user_id):
+    return f'signalement:version:{user_id}'
+
+
+def get_user_version(user_id):
+    cache = get_response_cache()
+    key = user_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Valeur initiale horodatée : une version évincée du cache ne peut pas
+        # retomber sur une ancienne réponse encore présente
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_user_versions(user_ids):
+    """
+    Invalide en O(1) toutes les réponses en cache des utilisateurs : les
+    anciennes entrées ne sont plus jamais lues et expirent d'elles-mêmes.
+    La version est aussi changée au commit, une lecture concurrente ayant pu
+    mettre en cache l'état précédent entre-temps.
+    """
+    if not response_cache_enabled():
+        return
+    user_ids = set(user_ids)
+    increment_versions(user_ids)
+    transaction.on_commit(lambda: increment_versions(user_ids))
+
+
+def increment_versions(user_ids):
+    cache = get_response_cache()
+    for user_id in user_ids:
+        try:
+            cache.incr(user_version_key(user_id))
+        except ValueError:
+            cache.set(user_version_key(user_id), time.time_ns(), None)
+
+
+def response_cache_key(user_id, path):
+    digest = hashlib.md5(path.encode()).hexdigest()
+    return f'signalement:response:{user_id}:{get_user_version(user_id)}:{digest}'
+
+
+def increment_counter(key):
+    cache = get_response_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def response_cache_stats():
+    cache = get_response_cache()
+    return {'hits': cache.get(HIT_COUNTER_KEY, 0), 'misses': cache.get(MISS_COUNTER_KEY, 0)}
+
+
+class CachedResponseMixin:
+    """
+    Met en cache les réponses GET de la vue, par utilisateur et par URL
+    (pagination et filtres compris), sous la version courante des signalements
+    de l'utilisateur. Les signaux incrémentent cette version à chaque création,
+    modification, suppression ou changement de statut. Désactivé si le
+    cache n'est pas partagé entre les workers.
+    """
+
+    def get(self, request, *args, **kwargs):
+        if not response_cache_enabled():
+            return super().get(request, *args, **kwargs)
+        cache = get_response_cache()
+        key = response_cache_key(request.user.pk, request.get_full_path())
+        data = cache.get(key)
+        if data is not None:
+            increment_counter(HIT_COUNTER_KEY)
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        increment_counter(MISS_COUNTER_KEY)
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.SIGNALEMENT_RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
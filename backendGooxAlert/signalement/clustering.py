@@ -0,0 +1,106 @@
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, F, IntegerField, Value
+from django.db.models.functions import Cast, Cos, Floor, Ln, Radians, Tan
+
+from .geo import filter_bbox
+
+# Latitude maximale de la projection Web Mercator
+MAX_LATITUDE = 85.05112878
+# Chaque tuile est découpée en GRID_SIZE x GRID_SIZE cellules de regroupement
+GRID_SIZE = 8
+
+
+def tile_bbox(z, x, y):
+    n = 2 ** z
+    min_lng = x / n * 360.0 - 180.0
+    max_lng = (x + 1) / n * 360.0 - 180.0
+    max_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    min_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def tile_for_point(latitude, longitude, z):
+    n = 2 ** z
+    latitude = max(min(latitude, MAX_LATITUDE), -MAX_LATITUDE)
+    x = int((longitude + 180.0) / 360.0 * n)
+    lat_rad = math.radians(latitude)
+    y = int((1 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_cache_key(z, x, y):
+    return f'signalement:clusters:{z}:{x}:{y}'
+
+
+def get_tile_clusters(queryset, z, x, y):
+    key = tile_cache_key(z, x, y)
+    clusters = cache.get(key)
+    if clusters is None:
+        clusters = compute_tile_clusters(queryset, z, x, y)
+        cache.set(key, clusters, settings.SIGNALEMENT_CLUSTER_CACHE_TIMEOUT)
+    return clusters
+
+
+def compute_tile_clusters(queryset, z, x, y):
+    """
+    Regroupe les signalements de la tuile (z, x, y) sur une grille fixe.
+    L'agrégation est faite en base (GROUP BY cellule, catégorie, statut) : le
+    nombre de lignes renvoyées ne dépend pas du nombre de points de la tuile.
+    """
+    cells = GRID_SIZE * 2 ** z
+    # Mêmes formules que tile_for_point, à la résolution de la grille
+    mercator = Ln(Tan(Radians('latitude')) + Value(1.0) / Cos(Radians('latitude')))
+    queryset = filter_bbox(queryset, *tile_bbox(z, x, y)).annotate(
+        cell_x=Cast(Floor((F('longitude') + 180.0) / 360.0 * cells), IntegerField()),
+        cell_y=Cast(Floor((Value(1.0) - mercator / math.pi) / 2.0 * cells), IntegerField()),
+    )
+    rows = (
+        queryset.order_by()
+        .values('cell_x', 'cell_y', 'category', 'status')
+        .annotate(count=Count('id'), avg_latitude=Avg('latitude'), avg_longitude=Avg('longitude'))
+    )
+
+    groups = defaultdict(lambda: {'count': 0, 'latitude': 0.0, 'longitude': 0.0, 'categories': Counter(), 'status': Counter()})
+    for row in rows:
+        group = groups[(row['cell_x'], row['cell_y'])]
+        group['count'] += row['count']
+        # Moyennes pondérées par le nombre de signalements de chaque groupe
+        group['latitude'] += row['avg_latitude'] * row['count']
+        group['longitude'] += row['avg_longitude'] * row['count']
+        group['categories'][row['category']] += row['count']
+        group['status'][row['status']] += row['count']
+
+    clusters = []
+    for group in groups.values():
+        clusters.append({
+            'latitude': group['latitude'] / group['count'],
+            'longitude': group['longitude'] / group['count'],
+            'count': group['count'],
+            'dominant_category': group['categories'].most_common(1)[0][0],
+            'status': dict(group['status']),
+        })
+    clusters.sort(key=lambda cluster: -cluster['count'])
+    return clusters
+
+
+def invalidate_tiles(points):
+    """
+    Supprime du cache les tuiles (tous niveaux de zoom) contenant ces points
+    (latitude, longitude) : seules les tuiles touchées sont recalculées.
+    Comme pour bump_user_versions, elles sont aussi supprimées au commit :
+    une lecture concurrente a pu remettre en cache l'état précédent.
+    """
+    keys = set()
+    for latitude, longitude in points:
+        if latitude is None or longitude is None:
+            continue
+        for z in range(settings.SIGNALEMENT_CLUSTER_MAX_ZOOM + 1):
+            keys.add(tile_cache_key(z, *tile_for_point(latitude, longitude, z)))
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
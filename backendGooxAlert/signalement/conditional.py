@@ -0,0 +1,47 @@
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+
+from .models import Signalement
+
+
+def memoize_on_request(func):
+    # etag_func et last_modified_func de @condition partagent ainsi la même requête SQL
+    attribute = f'_conditional_{func.__name__}'
+
+    @wraps(func)
+    def wrapper(request, *args, **kwargs):
+        if not hasattr(request, attribute):
+            setattr(request, attribute, func(request, *args, **kwargs))
+        return getattr(request, attribute)
+    return wrapper
+
+
+def make_etag(*parts):
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def signalement_list_etag(request, *args, **kwargs):
+    """
+    Validateur de la liste sans la sérialiser : nombre de signalements et date
+    de dernière modification (index user, updated_at), plus l'URL (curseur, taille).
+    Une suppression change le nombre, une création ou modification la date.
+    """
+    state = Signalement.objects.filter(user=request.user).aggregate(count=Count('id'), last=Max('updated_at'))
+    return make_etag(request.get_full_path(), state['count'], state['last'] and state['last'].isoformat())
+
+
+@memoize_on_request
+def signalement_updated_at(request, pk, **kwargs):
+    return Signalement.objects.filter(user=request.user, pk=pk).values_list('updated_at', flat=True).first()
+
+
+def signalement_detail_etag(request, pk, **kwargs):
+    # L'URL en fait partie : ?fields= et ?compact= donnent des représentations différentes
+    updated_at = signalement_updated_at(request, pk)
+    return make_etag(request.get_full_path(), updated_at.isoformat()) if updated_at else None
+
+
+def signalement_detail_last_modified(request, pk, **kwargs):
+    return signalement_updated_at(request, pk)
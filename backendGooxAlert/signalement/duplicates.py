@@ -0,0 +1,161 @@
+import hashlib
+import random
+import re
+import unicodedata
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+
+from .caching import bump_user_versions
+from .geo import bbox_around, filter_bbox, haversine
+from .models import Signalement, SignalementBand
+
+# Signature MinHash de NUM_PERMUTATIONS valeurs, découpée en BANDS bandes de
+# ROWS valeurs : deux textes de similarité de Jaccard s partagent au moins une
+# bande avec une probabilité 1 - (1 - s^ROWS)^BANDS (≈ 0,99 pour s = 0,5)
+NUM_PERMUTATIONS = 32
+BANDS = 16
+ROWS = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 4
+OPEN_STATUSES = ('en_attente', 'en_cours')
+
+MERSENNE_PRIME = (1 << 61) - 1
+_random = random.Random(20240501)
+PERMUTATIONS = [
+    (_random.randrange(1, MERSENNE_PRIME), _random.randrange(0, MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+
+def normalize_text(text):
+    # Minuscules, sans accents ni ponctuation : « Éclairage  cassé ! » -> « eclairage casse »
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(re.findall(r'\w+', text))
+
+
+def shingles(text):
+    text = normalize_text(text)
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def signalement_shingles(signalement):
+    return shingles(f'{signalement.title} {signalement.description}')
+
+
+def minhash(shingle_set):
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), 'big') for s in shingle_set]
+    if not hashes:
+        return []
+    return [min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in PERMUTATIONS]
+
+
+def band_keys(signature):
+    keys = []
+    for band in range(BANDS if signature else 0):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        keys.append(f'{band}:' + hashlib.blake2b(repr(rows).encode(), digest_size=6).hexdigest())
+    return keys
+
+
+def jaccard(first, second):
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+def index_signalements(signalements):
+    # Remplace les bandes des signalements (création, modification du texte)
+    SignalementBand.objects.filter(signalement__in=[s.pk for s in signalements]).delete()
+    SignalementBand.objects.bulk_create([
+        SignalementBand(signalement_id=signalement.pk, band=band)
+        for signalement in signalements
+        for band in band_keys(minhash(signalement_shingles(signalement)))
+    ])
+
+
+def find_duplicate(signalement):
+    """
+    Meilleur doublon probable de ``signalement`` parmi les signalements ouverts
+    plus anciens de la même catégorie, dans la même zone et la fenêtre
+    SIGNALEMENT_DUPLICATE_WINDOW_DAYS. Seuls les SIGNALEMENT_DUPLICATE_MAX_CANDIDATES
+    signalements partageant le plus de bandes MinHash sont comparés : le coût
+    par insertion ne dépend pas de la taille de la table.
+
+    Retourne (signalement, score) ou None.
+    """
+    shingle_set = signalement_shingles(signalement)
+    bands = band_keys(minhash(shingle_set))
+    if not bands:
+        return None
+
+    since = signalement.created_at - timedelta(days=settings.SIGNALEMENT_DUPLICATE_WINDOW_DAYS)
+    candidates = Signalement.objects.filter(
+        duplicate_bands__band__in=bands,
+        category=signalement.category,
+        status__in=OPEN_STATUSES,
+        created_at__gte=since,
+        created_at__lte=signalement.created_at,
+    ).exclude(pk=signalement.pk)
+
+    radius = settings.SIGNALEMENT_DUPLICATE_RADIUS
+    if signalement.latitude is not None and signalement.longitude is not None:
+        candidates = filter_bbox(candidates, *bbox_around(signalement.latitude, signalement.longitude, radius))
+    elif signalement.commune:
+        candidates = candidates.filter(commune=signalement.commune)
+    else:
+        return None
+
+    candidates = (
+        candidates.annotate(shared_bands=Count('duplicate_bands'))
+        .order_by('-shared_bands', '-created_at')
+        .only('id', 'title', 'description', 'latitude', 'longitude', 'duplicate_of_id', 'created_at')
+        [:settings.SIGNALEMENT_DUPLICATE_MAX_CANDIDATES]
+    )
+
+    best = None
+    for candidate in candidates:
+        score = jaccard(shingle_set, signalement_shingles(candidate))
+        if score < settings.SIGNALEMENT_DUPLICATE_THRESHOLD:
+            continue
+        distance = 0
+        if signalement.latitude is not None and candidate.latitude is not None:
+            distance = haversine(signalement.latitude, signalement.longitude, candidate.latitude, candidate.longitude)
+            if distance > radius:
+                continue
+        if best is None or (score, -distance) > (best[1], -best[2]):
+            best = (candidate, score, distance)
+    return best and best[:2]
+
+
+def detect_duplicates(signalements):
+    """
+    Indexe les nouveaux signalements et les rattache à leur doublon probable
+    (au signalement d'origine si le doublon en est déjà un). Seuls les
+    signalements dont le rattachement change sont écrits.
+    """
+    index_signalements(signalements)
+    changed = []
+    for signalement in signalements:
+        match = find_duplicate(signalement)
+        duplicate_of_id, score = None, None
+        if match is not None:
+            candidate, score = match
+            duplicate_of_id, score = candidate.duplicate_of_id or candidate.pk, round(score, 3)
+        if (duplicate_of_id, score) == (signalement.duplicate_of_id, signalement.duplicate_score):
+            continue
+        signalement.duplicate_of_id = duplicate_of_id
+        signalement.duplicate_score = score
+        signalement.updated_at = timezone.now()
+        # UPDATE direct : pas de nouveau passage dans les signaux. updated_at est
+        # avancé à la main pour la synchronisation incrémentale et les ETag.
+        Signalement.objects.filter(pk=signalement.pk).update(
+            duplicate_of=duplicate_of_id, duplicate_score=score, updated_at=signalement.updated_at
+        )
+        changed.append(signalement)
+    if changed:
+        bump_user_versions(signalement.user_id for signalement in changed)
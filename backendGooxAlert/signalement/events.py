@@ -0,0 +1,163 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+_broadcasters = {}
+
+
+def get_broadcaster():
+    if settings.SIGNALEMENT_EVENTS_BACKEND not in _broadcasters:
+        _broadcasters[settings.SIGNALEMENT_EVENTS_BACKEND] = import_string(settings.SIGNALEMENT_EVENTS_BACKEND)()
+    return _broadcasters[settings.SIGNALEMENT_EVENTS_BACKEND]
+
+
+class Subscription:
+    # File d'événements d'une connexion, alimentée par le broadcaster
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=settings.SIGNALEMENT_EVENTS_QUEUE_SIZE)
+
+    def push(self, event):
+        # Appelé depuis n'importe quel thread : la file appartient à la boucle de la connexion.
+        # False si cette boucle est fermée (connexion terminée sans désinscription)
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            return False
+        return True
+
+    def _put(self, event):
+        if self.queue.full():
+            # Client trop lent : l'événement le plus ancien est abandonné
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class InMemoryBroadcaster:
+    """
+    Diffusion dans le processus courant : suffit pour les tests et un serveur
+    ASGI unique. Avec plusieurs processus, utiliser RedisBroadcaster.
+    """
+
+    def __init__(self):
+        self.subscriptions = {}
+        self.lock = threading.Lock()
+
+    async def subscribe(self, user_id):
+        subscription = Subscription(user_id)
+        with self.lock:
+            self.subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    async def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.subscriptions.pop(subscription.user_id, None)
+
+    def publish(self, user_id, event):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            if not subscription.push(event):
+                with self.lock:
+                    self.subscriptions.get(user_id, set()).discard(subscription)
+
+
+class RedisBroadcaster(InMemoryBroadcaster):
+    """
+    Diffusion entre processus via le pub/sub Redis (SIGNALEMENT_EVENTS_REDIS_URL) :
+    chaque processus relaie les messages reçus à ses propres connexions. Après
+    une coupure, l'écoute reprend avec un délai croissant (au plus
+    reconnect_max_delay secondes) ; les messages publiés entre-temps sont perdus.
+    """
+
+    channel = 'signalement:events'
+    reconnect_delay = 0.5
+    reconnect_max_delay = 30
+
+    def __init__(self):
+        import redis  # dépendance optionnelle
+
+        super().__init__()
+        self.client = redis.Redis.from_url(settings.SIGNALEMENT_EVENTS_REDIS_URL)
+        self.listener = None
+        self.listener_lock = threading.Lock()
+
+    async def subscribe(self, user_id):
+        subscription = await super().subscribe(user_id)
+        with self.listener_lock:
+            if self.listener is None:
+                self.listener = threading.Thread(target=self.listen, daemon=True)
+                self.listener.start()
+        return subscription
+
+    def listen(self):
+        delay = self.reconnect_delay
+        try:
+            while True:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                try:
+                    pubsub.subscribe(self.channel)
+                    delay = self.reconnect_delay
+                    for message in pubsub.listen():
+                        self.relay(message)
+                except Exception:
+                    logger.exception("Écoute Redis des événements interrompue, reconnexion dans %ss", delay)
+                finally:
+                    pubsub.close()
+                time.sleep(delay)
+                delay = min(delay * 2, self.reconnect_max_delay)
+        finally:
+            # Le prochain abonnement relance l'écoute
+            with self.listener_lock:
+                self.listener = None
+
+    def relay(self, message):
+        try:
+            payload = json.loads(message['data'])
+            user_id, event = payload['user_id'], payload['event']
+        except (TypeError, ValueError, KeyError):
+            logger.warning("Événement Redis ignoré : %r", message.get('data'))
+            return
+        super().publish(user_id, event)
+
+    def publish(self, user_id, event):
+        self.client.publish(self.channel, json.dumps({'user_id': user_id, 'event': event}))
+
+
+def publish_status_changes(signalements):
+    """
+    Annonce au propriétaire de chaque signalement son changement de statut,
+    une fois la transaction validée.
+    """
+    events = [
+        (signalement.user_id, {
+            'type': 'status',
+            'id': signalement.pk,
+            'status': signalement.status,
+            'previous_status': signalement.previous_value('status'),
+            'updated_at': signalement.updated_at.isoformat() if signalement.updated_at else None,
+        })
+        for signalement in signalements
+        if signalement.has_changed('status')
+    ]
+    if events:
+        transaction.on_commit(lambda: [get_broadcaster().publish(user_id, event) for user_id, event in events])
+
+
+def format_event(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
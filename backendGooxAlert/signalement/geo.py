@@ -0,0 +1,137 @@
+import math
+import re
+from functools import reduce
+from operator import or_
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+# Alphabet base32 des geohash
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+EARTH_RADIUS_M = 6371000
+
+COORDINATES_RE = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*[,;]\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+def encode_geohash(latitude, longitude, precision=12):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    value = 0
+    even = True  # les bits pairs portent la longitude
+
+    while len(geohash) < precision:
+        interval, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        if coordinate >= middle:
+            value = (value << 1) | 1
+            interval[0] = middle
+        else:
+            value <<= 1
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            geohash.append(BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(geohash)
+
+
+def cell_size(precision):
+    # Hauteur et largeur (en degrés) d'une cellule geohash de cette précision
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def geohash_prefixes(min_lat, min_lng, max_lat, max_lng, max_cells=16):
+    """
+    Préfixes geohash couvrant la boîte : la précision la plus fine pour laquelle
+    au plus ``max_cells`` cellules suffisent. Liste vide si la boîte est trop
+    grande pour qu'un préfixe soit utile.
+    """
+    for precision in range(12, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.floor(max_lat / height) - math.floor(min_lat / height) + 1
+        columns = math.floor(max_lng / width) - math.floor(min_lng / width) + 1
+        if rows * columns <= max_cells:
+            break
+    else:
+        return []
+
+    prefixes = set()
+    latitudes = _steps(min_lat, max_lat, height)
+    longitudes = _steps(min_lng, max_lng, width)
+    for latitude in latitudes:
+        for longitude in longitudes:
+            prefixes.add(encode_geohash(latitude, longitude, precision))
+    return sorted(prefixes)
+
+
+def filter_bbox(queryset, min_lat, min_lng, max_lat, max_lng):
+    # Préfiltre indexé par préfixes geohash, puis filtre exact sur les coordonnées
+    prefixes = geohash_prefixes(min_lat, min_lng, max_lat, max_lng)
+    if prefixes:
+        queryset = queryset.filter(reduce(or_, (Q(geohash__startswith=prefix) for prefix in prefixes)))
+    return queryset.filter(latitude__range=(min_lat, max_lat), longitude__range=(min_lng, max_lng))
+
+
+def _steps(start, end, step):
+    values = []
+    value = start
+    while value < end:
+        values.append(value)
+        value += step
+    values.append(end)
+    return values
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    # Distance en mètres entre deux points
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def distance_to(latitude, longitude):
+    """
+    Expression SQL de la distance haversine (m) entre (latitude, longitude)
+    et les coordonnées de la ligne, pour trier et filtrer en base.
+    """
+    phi1 = math.radians(latitude)
+    phi2 = Radians(F('latitude'))
+    d_phi = Radians(F('latitude') - Value(latitude))
+    d_lambda = Radians(F('longitude') - Value(longitude))
+    a = (
+        Power(Sin(d_phi / 2), 2)
+        + Value(math.cos(phi1)) * Cos(phi2) * Power(Sin(d_lambda / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_M) * ASin(Sqrt(a), output_field=FloatField())
+
+
+def bbox_around(latitude, longitude, radius_m):
+    d_lat = math.degrees(radius_m / EARTH_RADIUS_M)
+    d_lng = math.degrees(radius_m / (EARTH_RADIUS_M * max(math.cos(math.radians(latitude)), 1e-6)))
+    return (
+        max(latitude - d_lat, -90.0), max(longitude - d_lng, -180.0),
+        min(latitude + d_lat, 90.0), min(longitude + d_lng, 180.0),
+    )
+
+
+def parse_coordinates(location):
+    """
+    Extrait (latitude, longitude) d'une localisation texte « lat,lng » telle
+    qu'envoyée par l'application mobile, ou None.
+    """
+    match = COORDINATES_RE.match(location or '')
+    if not match:
+        return None
+    latitude, longitude = float(match.group(1)), float(match.group(2))
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
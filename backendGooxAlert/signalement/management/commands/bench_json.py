@@ -0,0 +1,56 @@
+import gzip
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from backendGooxAlert.middleware import brotli
+from backendGooxAlert.renderers import FastJSONRenderer, orjson
+from signalement.models import Signalement
+from signalement.serializers import SignalementSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare temps de rendu JSON (DRF / orjson) et octets transmis (brut / gzip / brotli) d\'une liste de signalements'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100, help='Nombre de signalements dans la liste')
+        parser.add_argument('--repeat', type=int, default=50, help='Nombre de rendus par renderer')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        signalements = [
+            Signalement(
+                id=i, user_id=1, title=f'Nid-de-poule n°{i} à Médina', description='Trou profond sur la chaussée, dangereux la nuit. ' * 4,
+                location='14.6928,-17.4467', latitude=14.6928 + i / 1000, longitude=-17.4467, geohash='edee7q4rkcqs',
+                category='voirie', status='en_attente', commune='Dakar',
+                created_at=now - timedelta(minutes=i), updated_at=now,
+            )
+            for i in range(options['count'])
+        ]
+        data = {'next': None, 'results': SignalementSerializer(signalements, many=True).data}
+
+        outputs = {}
+        self.stdout.write(f"{options['count']} signalements, {options['repeat']} rendus (orjson {'installé' if orjson else 'absent'})")
+        self.stdout.write(f"{'renderer':>10} {'médiane (ms)':>13}")
+        for name, renderer in (('drf', JSONRenderer()), ('fast', FastJSONRenderer())):
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                outputs[name] = renderer.render(data)
+                timings.append((time.perf_counter() - start) * 1000)
+            self.stdout.write(f'{name:>10} {statistics.median(timings):>13.3f}')
+
+        if outputs['drf'] != outputs['fast']:
+            self.stderr.write(self.style.ERROR('Les deux renderers ne produisent pas les mêmes octets'))
+
+        body = outputs['fast']
+        self.stdout.write(f"{'encodage':>10} {'octets':>10}")
+        self.stdout.write(f"{'brut':>10} {len(body):>10}")
+        self.stdout.write(f"{'gzip':>10} {len(gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL)):>10}")
+        if brotli is not None:
+            self.stdout.write(f"{'br':>10} {len(brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)):>10}")
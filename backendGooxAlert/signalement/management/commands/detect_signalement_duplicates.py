@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from signalement.duplicates import detect_duplicates
+from signalement.models import Signalement
+
+
+class Command(BaseCommand):
+    help = 'Indexe les signalements existants et rattache les doublons probables, par ordre chronologique'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        # Bandes et rattachements sont recalculés sur place, lot par lot : l'index reste
+        # complet pour les créations concurrentes, et detect_duplicates n'écrit
+        # (updated_at, versions du cache) que les rattachements qui changent
+        batch = []
+        signalements = Signalement.objects.order_by('created_at', 'id').only(
+            'id', 'user', 'title', 'description', 'category', 'status', 'latitude', 'longitude', 'commune',
+            'created_at', 'duplicate_of', 'duplicate_score',
+        )
+        for signalement in signalements.iterator(chunk_size=options['batch_size']):
+            batch.append(signalement)
+            if len(batch) >= options['batch_size']:
+                self.process(batch)
+                batch = []
+        self.process(batch)
+
+        count = Signalement.objects.exclude(duplicate_of=None).count()
+        self.stdout.write(self.style.SUCCESS(f'{count} doublons probables rattachés.'))
+
+    def process(self, batch):
+        # Les signalements d'un lot peuvent être doublons des lots précédents ou d'un plus ancien du même lot
+        with transaction.atomic():
+            detect_duplicates(batch)
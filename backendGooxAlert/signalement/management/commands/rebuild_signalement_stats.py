@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from signalement.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les compteurs journaliers des signalements (tableau de bord)'
+
+    def handle(self, *args, **options):
+        count = rebuild_stats()
+        self.stdout.write(self.style.SUCCESS(f'{count} compteurs journaliers recalculés.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from signalement.caching import response_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Affiche les succès et échecs du cache des réponses de signalements'
+
+    def handle(self, *args, **options):
+        stats = response_cache_stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total * 100 if total else 0
+        self.stdout.write(f"Succès : {stats['hits']}  échecs : {stats['misses']}  taux de succès : {ratio:.1f} %")
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("signalement", "0002_alter_signalement_status"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="signalement",
+            index=models.Index(
+                fields=["user", "created_at", "id"], name="signalement_user_created_idx"
+            ),
+        ),
+    ]
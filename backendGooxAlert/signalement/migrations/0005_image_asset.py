@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentification", "0003_image_asset"),
+        ("signalement", "0004_signalement_sync"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="signalement",
+            name="image_asset",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="authentification.imageasset",
+            ),
+        ),
+    ]
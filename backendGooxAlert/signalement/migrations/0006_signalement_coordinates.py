@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:40
+
+import django.core.validators
+from django.conf import settings
+from django.db import migrations, models
+
+from signalement.geo import encode_geohash, parse_coordinates
+
+
+def backfill_coordinates(apps, schema_editor):
+    # Les localisations « lat,lng » envoyées par l'application mobile sont reprises
+    Signalement = apps.get_model("signalement", "Signalement")
+    batch = []
+    for signalement in Signalement.objects.only("id", "location").iterator(chunk_size=2000):
+        coordinates = parse_coordinates(signalement.location)
+        if coordinates is None:
+            continue
+        signalement.latitude, signalement.longitude = coordinates
+        signalement.geohash = encode_geohash(*coordinates)
+        batch.append(signalement)
+        if len(batch) >= 2000:
+            Signalement.objects.bulk_update(batch, ["latitude", "longitude", "geohash"])
+            batch = []
+    Signalement.objects.bulk_update(batch, ["latitude", "longitude", "geohash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentification", "0003_image_asset"),
+        ("signalement", "0005_image_asset"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="signalement",
+            name="geohash",
+            field=models.CharField(blank=True, default="", max_length=12),
+        ),
+        migrations.AddField(
+            model_name="signalement",
+            name="latitude",
+            field=models.FloatField(
+                blank=True,
+                null=True,
+                validators=[
+                    django.core.validators.MinValueValidator(-90),
+                    django.core.validators.MaxValueValidator(90),
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name="signalement",
+            name="longitude",
+            field=models.FloatField(
+                blank=True,
+                null=True,
+                validators=[
+                    django.core.validators.MinValueValidator(-180),
+                    django.core.validators.MaxValueValidator(180),
+                ],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="signalement",
+            index=models.Index(
+                fields=["geohash"],
+                name="signalement_geohash_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+        migrations.RunPython(backfill_coordinates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:43
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import TruncDate
+
+
+def backfill_commune_and_stats(apps, schema_editor):
+    Signalement = apps.get_model("signalement", "Signalement")
+    SignalementDailyStat = apps.get_model("signalement", "SignalementDailyStat")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    Signalement.objects.update(
+        commune=Subquery(User.objects.filter(pk=OuterRef("user_id")).values("commune")[:1])
+    )
+    rows = (
+        Signalement.objects.annotate(day=TruncDate("created_at"))
+        .values("day", "category", "status", "commune")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    SignalementDailyStat.objects.bulk_create(
+        [SignalementDailyStat(**row) for row in rows], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("signalement", "0006_signalement_coordinates"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="signalement",
+            name="commune",
+            field=models.CharField(blank=True, default="", max_length=100),
+        ),
+        migrations.CreateModel(
+            name="SignalementDailyStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "category",
+                    models.CharField(
+                        choices=[
+                            ("voirie", "Voirie (nids-de-poule, routes abîmées)"),
+                            ("infrastructure", "Infrastructure publique"),
+                            ("eclairage", "Éclairage public"),
+                            ("ordures", "Gestion des ordures"),
+                            ("eau", "Problèmes d'eau"),
+                            ("assainissement", "Assainissement"),
+                            ("pollution", "Pollution"),
+                            ("espaces_verts", "Espaces verts"),
+                            ("securite", "Sécurité publique"),
+                            ("signalisation", "Signalisation"),
+                            ("transport", "Transports publics"),
+                            ("animaux_errants", "Animaux errants"),
+                            ("urbanisme", "Urbanisme"),
+                            ("autre", "Autre"),
+                        ],
+                        max_length=50,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("en_attente", "En attente"),
+                            ("en_cours", "En cours"),
+                            ("resolu", "Résolu"),
+                            ("rejected", "Rejeté"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("commune", models.CharField(max_length=100)),
+                ("count", models.IntegerField(default=0)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("day", "category", "status", "commune"),
+                        name="unique_signalement_daily_stat",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_commune_and_stats, migrations.RunPython.noop),
+    ]
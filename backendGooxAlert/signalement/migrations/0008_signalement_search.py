@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:48
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # tsvector et index GIN : uniquement sous PostgreSQL
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Signalement = apps.get_model("signalement", "Signalement")
+    Signalement.objects.update(
+        search_vector=SearchVector("title", weight="A", config="french")
+        + SearchVector("description", weight="B", config="french")
+    )
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS "signalement_search_idx" ON "{Signalement._meta.db_table}" '
+        'USING gin ("search_vector")'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS "signalement_search_idx"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("signalement", "0007_signalement_daily_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="signalement",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
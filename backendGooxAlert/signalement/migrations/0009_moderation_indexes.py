@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentification", "0004_user_directory_indexes"),
+        ("signalement", "0008_signalement_search"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="signalement",
+            index=models.Index(
+                fields=["status", "created_at", "id"],
+                name="signalement_status_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="signalement",
+            index=models.Index(
+                fields=["category", "status", "created_at", "id"],
+                name="signalement_category_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="signalement",
+            index=models.Index(
+                fields=["commune", "status", "created_at", "id"],
+                name="signalement_commune_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("signalement", "0009_moderation_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="signalement",
+            name="duplicate_of",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="duplicates",
+                to="signalement.signalement",
+            ),
+        ),
+        migrations.AddField(
+            model_name="signalement",
+            name="duplicate_score",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="SignalementBand",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("band", models.CharField(max_length=20)),
+                (
+                    "signalement",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="duplicate_bands",
+                        to="signalement.signalement",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [models.Index(fields=["band"], name="signalement_band_idx")],
+            },
+        ),
+    ]
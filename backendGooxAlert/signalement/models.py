@@ -1,6 +1,10 @@
 # models.py
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
+from django.core.validators import MaxValueValidator, MinValueValidator
+
+from .geo import encode_geohash, parse_coordinates
 
 User = get_user_model()
 
@@ -33,10 +37,145 @@ class Signalement(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
     image_url = models.URLField(blank=True, null=True)
+    image_asset = models.ForeignKey('authentification.ImageAsset', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     location = models.CharField(max_length=255)
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    # Geohash de (latitude, longitude) : index des recherches par zone
+    geohash = models.CharField(max_length=12, blank=True, default='')
     category = models.CharField(max_length=50, choices=CATEGORIE_CHOICES)
     status = models.CharField(max_length=20, choices=STATUT_CHOICES, default='en_attente')
+    # Commune de l'auteur au moment du signalement (statistiques, filtres)
+    commune = models.CharField(max_length=100, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Vecteur de recherche plein texte (titre + description), tenu à jour par les signaux ;
+    # l'index GIN est créé par la migration sous PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Doublon probable détecté à la création (voir duplicates.py), et sa similarité
+    duplicate_of = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='duplicates')
+    duplicate_score = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Sert la pagination keyset de la liste d'un utilisateur
+            models.Index(fields=['user', 'created_at', 'id'], name='signalement_user_created_idx'),
+            # Sert la synchronisation incrémentale (modifications depuis un jeton)
+            models.Index(fields=['user', 'updated_at', 'id'], name='signalement_user_updated_idx'),
+            # Recherches par préfixe de geohash (LIKE 'abc%')
+            models.Index(fields=['geohash'], name='signalement_geohash_idx', opclasses=['varchar_pattern_ops']),
+            # File de modération : filtre (statut, catégorie ou commune) puis pagination keyset
+            models.Index(fields=['status', 'created_at', 'id'], name='signalement_status_created_idx'),
+            models.Index(fields=['category', 'status', 'created_at', 'id'], name='signalement_category_idx'),
+            models.Index(fields=['commune', 'status', 'created_at', 'id'], name='signalement_commune_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.category}"
+
+    # Valeurs dont les changements sont suivis par les signaux (cache des tuiles, recherche...)
+    tracked_fields = ('status', 'category', 'location', 'latitude', 'longitude', 'title', 'description')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_tracked_values()
+        return instance
+
+    def remember_tracked_values(self):
+        self._tracked_values = {
+            name: getattr(self, name) for name in self.tracked_fields
+            if name in self.__dict__
+        }
+
+    def previous_value(self, name):
+        # Valeur lue en base (ou au dernier enregistrement), None si inconnue
+        return getattr(self, '_tracked_values', {}).get(name)
+
+    def has_changed(self, name):
+        return name in getattr(self, '_tracked_values', {}) and self.previous_value(name) != getattr(self, name)
+
+    def save(self, *args, **kwargs):
+        if not self.commune and self.user_id:
+            self.commune = self.user.commune
+        self.update_geohash()
+        # Les signaux post_save (statistiques...) s'exécutent dans la même transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    def update_geohash(self):
+        # Les coordonnées peuvent n'être fournies que dans location (« lat,lng ») ;
+        # une location modifiée est relue, sauf si les coordonnées changent avec elle
+        location_changed = self.has_changed('location') and not (
+            self.has_changed('latitude') or self.has_changed('longitude')
+        )
+        if self.latitude is None or self.longitude is None or location_changed:
+            coordinates = parse_coordinates(self.location)
+            if coordinates:
+                self.latitude, self.longitude = coordinates
+            elif location_changed and parse_coordinates(self.previous_value('location')) == (self.latitude, self.longitude):
+                # Les coordonnées venaient de l'ancienne location
+                self.latitude = self.longitude = None
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+
+
+class SignalementTombstone(models.Model):
+    """
+    Trace d'un signalement supprimé, pour que la synchronisation incrémentale
+    puisse annoncer les suppressions aux clients.
+    """
+    # Pas de contrainte en base : la suppression d'un utilisateur supprime ses
+    # signalements (donc crée des tombstones) dans la même transaction ; elles
+    # sont supprimées ensuite par signals.user_deleted
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='signalement_tombstones', db_constraint=False)
+    signalement_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at', 'id'], name='tombstone_user_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"Signalement {self.signalement_id} supprimé"
+
+
+class SignalementDailyStat(models.Model):
+    """
+    Compteurs pré-agrégés par jour, catégorie, statut et commune, tenus à jour
+    à chaque création, changement de statut et suppression de signalement.
+    """
+    day = models.DateField()
+    category = models.CharField(max_length=50, choices=CATEGORIE_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUT_CHOICES)
+    commune = models.CharField(max_length=100)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category', 'status', 'commune'], name='unique_signalement_daily_stat'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.category} {self.status} {self.commune} : {self.count}"
+
+
+class SignalementBand(models.Model):
+    """
+    Bande de la signature MinHash (titre + description) d'un signalement :
+    deux signalements au texte proche partagent au moins une bande avec une
+    forte probabilité. Index de recherche des doublons.
+    """
+    signalement = models.ForeignKey(Signalement, on_delete=models.CASCADE, related_name='duplicate_bands')
+    band = models.CharField(max_length=20)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['band'], name='signalement_band_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.signalement_id} {self.band}"
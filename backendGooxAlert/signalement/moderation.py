@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Signalement
+from .signals import on_signalements_updated
+
+
+def transition_status(ids, new_status):
+    """
+    Passe les signalements ``ids`` au statut ``new_status`` en un seul UPDATE.
+
+    ``QuerySet.update()`` ne déclenche ni les signaux ni ``auto_now`` : les
+    lignes sont verrouillées et lues avant la mise à jour pour que les
+    compteurs journaliers et le cache des tuiles soient mis à jour par
+    ``on_signalements_updated``, et ``updated_at`` est renseigné explicitement
+    pour la synchronisation incrémentale.
+    """
+    with transaction.atomic():
+        signalements = list(
+            Signalement.objects.select_for_update()
+            .filter(pk__in=ids)
+            .exclude(status=new_status)
+            .only('id', 'user_id', 'status', 'category', 'latitude', 'longitude', 'commune', 'created_at')
+        )
+        if not signalements:
+            return []
+
+        now = timezone.now()
+        Signalement.objects.filter(pk__in=[s.pk for s in signalements]).update(status=new_status, updated_at=now)
+        for signalement in signalements:
+            signalement.status = new_status
+            signalement.updated_at = now
+        on_signalements_updated(signalements)
+        for signalement in signalements:
+            signalement.remember_tracked_values()
+    return signalements
@@ -0,0 +1,134 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination par curseur (keyset) sur un ordre strict.
+
+    Le curseur encode les valeurs des champs de tri du dernier élément de la
+    page. La page suivante est obtenue avec un filtre ``WHERE (created_at, id) < (...)``
+    appuyé sur un index composite : le coût d'une page reste constant, quelle
+    que soit la profondeur du défilement (pas d'OFFSET).
+    """
+    # Le dernier champ doit être unique pour que l'ordre soit total
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size_setting = 'SIGNALEMENT_PAGE_SIZE'
+    max_page_size_setting = 'SIGNALEMENT_MAX_PAGE_SIZE'
+    invalid_cursor_message = 'Curseur invalide'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request)
+        return self.finish_page(list(queryset[:self.page_size + 1]))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        # Variante pour les vues asynchrones (ORM asynchrone)
+        queryset = self.get_page_queryset(queryset, request)
+        return self.finish_page([instance async for instance in queryset[:self.page_size + 1]])
+
+    def get_page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.next_cursor = None
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.get_cursor_filter(queryset.model, self.decode_cursor(cursor)))
+        return queryset
+
+    def finish_page(self, page):
+        # Un élément de plus a été chargé pour savoir s'il existe une page suivante
+        if len(page) > self.page_size:
+            page = page[:self.page_size]
+            self.next_cursor = self.encode_cursor(page[-1])
+        return page
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, self.page_size_setting, 20)
+        max_page_size = getattr(settings, self.max_page_size_setting, 100)
+        try:
+            requested = int(request.query_params.get(self.page_size_query_param, page_size))
+        except (TypeError, ValueError):
+            requested = page_size
+        if requested <= 0:
+            requested = page_size
+        return min(requested, max_page_size)
+
+    def get_cursor_filter(self, model, values):
+        """
+        Construit ``(a < va) OR (a = va AND b < vb) OR ...`` selon le sens de
+        chaque champ. La borne redondante sur le premier champ permet au
+        planificateur de faire un simple parcours d'intervalle sur l'index.
+        """
+        fields = [name.lstrip('-') for name in self.ordering]
+        if len(values) != len(fields):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            values = [model._meta.get_field(name).to_python(value) for name, value in zip(fields, values)]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None for value in values):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            equal = {field: value for field, value in zip(fields[:index], values[:index])}
+            condition |= Q(**equal, **{f'{fields[index]}__{lookup}': values[index]})
+
+        first_lookup = 'lte' if self.ordering[0].startswith('-') else 'gte'
+        return Q(**{f'{fields[0]}__{first_lookup}': values[0]}) & condition
+
+    def encode_cursor(self, instance):
+        values = []
+        for name in self.ordering:
+            value = getattr(instance, name.lstrip('-'))
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        # encode_cursor n'écrit que des chaînes (dates ISO) et des entiers
+        if not isinstance(values, list) or not all(
+            isinstance(value, (str, int)) and not isinstance(value, bool) for value in values
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
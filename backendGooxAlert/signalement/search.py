@@ -0,0 +1,83 @@
+import re
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When
+
+from .models import Signalement
+
+# Configuration PostgreSQL : racinisation et mots vides français
+SEARCH_CONFIG = 'french'
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+SNIPPET_LENGTH = 160
+
+
+def full_text_supported(using='default'):
+    return connections[using].vendor == 'postgresql'
+
+
+def search_vector():
+    # Le titre pèse plus que la description dans le classement
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(signalements):
+    """
+    Recalcule le vecteur de recherche des signalements (un seul UPDATE),
+    appelé après leur création ou la modification du titre ou de la description.
+    """
+    ids = [signalement.pk for signalement in signalements]
+    if ids and full_text_supported():
+        Signalement.objects.filter(pk__in=ids).update(search_vector=search_vector())
+
+
+def search_terms(query):
+    return [term for term in re.split(r'\W+', query.lower()) if term]
+
+
+def search_signalements(queryset, query):
+    """
+    Signalements correspondant à ``query``, annotés de ``rank`` et ``snippet``
+    et triés par pertinence.
+
+    Sous PostgreSQL la recherche passe par l'index GIN du vecteur ; ailleurs
+    (tests SQLite) chaque mot doit apparaître dans le titre ou la description.
+    """
+    if full_text_supported(queryset.db):
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        return (
+            queryset.filter(search_vector=search_query)
+            .annotate(
+                rank=SearchRank(F('search_vector'), search_query),
+                snippet=SearchHeadline(
+                    'description', search_query, config=SEARCH_CONFIG,
+                    start_sel=HIGHLIGHT_START, stop_sel=HIGHLIGHT_STOP, max_words=30, min_words=10,
+                ),
+            )
+            .order_by('-rank', '-id')
+        )
+
+    terms = search_terms(query)
+    rank = Value(0.0)
+    for term in terms:
+        queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term))
+        rank = rank + Case(When(title__icontains=term, then=Value(1.0)), default=Value(0.0), output_field=FloatField())
+        rank = rank + Case(When(description__icontains=term, then=Value(0.4)), default=Value(0.0), output_field=FloatField())
+    return queryset.annotate(rank=rank).order_by('-rank', '-id')
+
+
+def make_snippet(text, query):
+    # Extrait mis en évidence, calculé côté Python quand SearchHeadline n'est pas disponible
+    terms = search_terms(query)
+    lowered = text.lower()
+    positions = [lowered.find(term) for term in terms if term in lowered]
+    start = max(min(positions, default=0) - SNIPPET_LENGTH // 4, 0)
+    snippet = text[start:start + SNIPPET_LENGTH]
+    if terms:
+        pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+        snippet = pattern.sub(lambda match: HIGHLIGHT_START + match.group(0) + HIGHLIGHT_STOP, snippet)
+    return ('…' if start else '') + snippet + ('…' if start + SNIPPET_LENGTH < len(text) else '')
@@ -1,9 +1,47 @@
 # serializers.py
+from django.conf import settings
 from rest_framework import serializers
 from signalement.models import Signalement
+from authentification.serializers import ImageAssetSerializer
+from backendGooxAlert.serializers import DynamicFieldsMixin
+
+
+class ExcerptField(serializers.CharField):
+    # Texte tronqué à SIGNALEMENT_COMPACT_DESCRIPTION_LENGTH caractères
+    def to_representation(self, value):
+        length = settings.SIGNALEMENT_COMPACT_DESCRIPTION_LENGTH
+        if value and len(value) > length:
+            return value[:length].rstrip() + '…'
+        return value
+
+
+class SignalementSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    image_variants = ImageAssetSerializer(source='image_asset', read_only=True)
 
-class SignalementSerializer(serializers.ModelSerializer):
     class Meta:
         model = Signalement
-        fields = '__all__'
-        read_only_fields = ['id', 'user', 'created_at', 'status']
+        exclude = ['search_vector']
+        read_only_fields = ['id', 'user', 'created_at', 'updated_at', 'status', 'commune', 'geohash', 'duplicate_of', 'duplicate_score']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Mode compact : la description est lue tronquée en base (annotation
+        # description_excerpt de la vue), la colonne complète n'est pas chargée
+        if self.context.get('compact') and 'description' in self.fields:
+            self.fields['description'] = ExcerptField(source='description_excerpt', read_only=True)
+
+    def validate_image_asset(self, asset):
+        # Uniquement une image envoyée par l'utilisateur (ou celle déjà attachée)
+        if asset is None or (self.instance is not None and self.instance.image_asset_id == asset.pk):
+            return asset
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated or not asset.uploaders.filter(pk=user.pk).exists():
+            raise serializers.ValidationError('Image inconnue : envoyez-la d\'abord via /api/images/.')
+        return asset
+
+    def validate(self, attrs):
+        # Image envoyée via /api/images/ : son URL devient l'image du signalement
+        if attrs.get('image_asset') and not attrs.get('image_url'):
+            attrs['image_url'] = attrs['image_asset'].url
+        return attrs
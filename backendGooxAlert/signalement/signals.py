@@ -0,0 +1,78 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from authentification.models import User
+
+from .caching import bump_user_versions
+from .clustering import invalidate_tiles
+from .duplicates import detect_duplicates, index_signalements
+from .events import publish_status_changes
+from .models import Signalement, SignalementTombstone
+from .search import update_search_vectors
+from .stats import apply_stat_deltas, created_deltas, deleted_deltas, updated_deltas
+
+
+@receiver(post_save, sender=Signalement)
+def signalement_saved(sender, instance, created, **kwargs):
+    if created:
+        on_signalements_created([instance])
+    else:
+        on_signalements_updated([instance])
+    instance.remember_tracked_values()
+
+
+@receiver(post_delete, sender=Signalement)
+def signalement_deleted(sender, instance, **kwargs):
+    on_signalements_deleted([instance])
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    # Les tombstones créées pendant la suppression de ses signalements n'ont plus
+    # de lecteur ; sans contrainte en base, rien d'autre ne les supprimerait
+    SignalementTombstone.objects.filter(user_id=instance.pk).delete()
+
+
+# Champs dont le changement déplace un signalement sur la carte
+CLUSTER_FIELDS = ('status', 'category', 'latitude', 'longitude')
+
+
+def on_signalements_created(signalements):
+    bump_user_versions(s.user_id for s in signalements)
+    update_search_vectors(signalements)
+    detect_duplicates(signalements)
+    apply_stat_deltas(created_deltas(signalements))
+    invalidate_tiles((s.latitude, s.longitude) for s in signalements)
+
+
+def on_signalements_updated(signalements):
+    """
+    Appelé après la modification de signalements déjà existants ; les valeurs
+    précédentes sont disponibles via ``previous_value()``.
+    """
+    bump_user_versions(s.user_id for s in signalements)
+    edited = [
+        signalement for signalement in signalements
+        if signalement.has_changed('title') or signalement.has_changed('description')
+    ]
+    update_search_vectors(edited)
+    index_signalements(edited)
+    apply_stat_deltas(updated_deltas(signalements))
+    publish_status_changes(signalements)
+    points = []
+    for signalement in signalements:
+        if any(signalement.has_changed(name) for name in CLUSTER_FIELDS):
+            points.append((signalement.previous_value('latitude'), signalement.previous_value('longitude')))
+            points.append((signalement.latitude, signalement.longitude))
+    invalidate_tiles(points)
+
+
+def on_signalements_deleted(signalements):
+    bump_user_versions(s.user_id for s in signalements)
+    # Tombstones lues par la synchronisation incrémentale
+    SignalementTombstone.objects.bulk_create([
+        SignalementTombstone(user_id=signalement.user_id, signalement_id=signalement.pk)
+        for signalement in signalements
+    ])
+    apply_stat_deltas(deleted_deltas(signalements))
+    invalidate_tiles((s.latitude, s.longitude) for s in signalements)
@@ -0,0 +1,101 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Signalement, SignalementDailyStat
+
+STAT_DIMENSIONS = ('day', 'category', 'status', 'commune')
+
+
+def stat_key(signalement, status=None, category=None):
+    return (
+        timezone.localdate(signalement.created_at),
+        category or signalement.category,
+        status or signalement.status,
+        signalement.commune,
+    )
+
+
+def created_deltas(signalements):
+    return Counter(stat_key(signalement) for signalement in signalements)
+
+
+def updated_deltas(signalements):
+    # Un changement de statut (ou de catégorie) déplace le signalement d'un compteur à l'autre
+    deltas = Counter()
+    for signalement in signalements:
+        if signalement.has_changed('status') or signalement.has_changed('category'):
+            deltas[stat_key(
+                signalement,
+                status=signalement.previous_value('status'),
+                category=signalement.previous_value('category'),
+            )] -= 1
+            deltas[stat_key(signalement)] += 1
+    return deltas
+
+
+def deleted_deltas(signalements):
+    deltas = Counter()
+    for signalement in signalements:
+        deltas[stat_key(signalement)] -= 1
+    return deltas
+
+
+def apply_stat_deltas(deltas):
+    """
+    Applique les variations aux compteurs journaliers (UPDATE count = count + n),
+    dans la transaction de la modification qui les a produites.
+    """
+    with transaction.atomic():
+        for (day, category, status, commune), delta in sorted(deltas.items()):
+            if not delta:
+                continue
+            counters = SignalementDailyStat.objects.filter(day=day, category=category, status=status, commune=commune)
+            if counters.update(count=F('count') + delta):
+                continue
+            try:
+                with transaction.atomic():
+                    SignalementDailyStat.objects.create(
+                        day=day, category=category, status=status, commune=commune, count=delta
+                    )
+            except IntegrityError:
+                # Compteur créé entre-temps par une autre transaction
+                counters.update(count=F('count') + delta)
+
+
+def rebuild_stats():
+    # Recalcule entièrement les compteurs à partir de la table des signalements
+    rows = (
+        Signalement.objects.annotate(day=TruncDate('created_at'))
+        .values(*STAT_DIMENSIONS)
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        SignalementDailyStat.objects.all().delete()
+        stats = SignalementDailyStat.objects.bulk_create(
+            [SignalementDailyStat(**row) for row in rows], batch_size=1000
+        )
+    return len(stats)
+
+
+def aggregate_stats(start=None, end=None, group_by=(), **filters):
+    """
+    Somme des compteurs pré-agrégés sur [start, end], regroupés selon
+    ``group_by`` (parmi STAT_DIMENSIONS) : le coût dépend du nombre de jours
+    et de combinaisons, pas du nombre de signalements.
+    """
+    queryset = SignalementDailyStat.objects.filter(**filters)
+    if start:
+        queryset = queryset.filter(day__gte=start)
+    if end:
+        queryset = queryset.filter(day__lte=end)
+    if not group_by:
+        return queryset.aggregate(count=Sum('count'))['count'] or 0, []
+
+    rows = queryset.values(*group_by).annotate(count=Sum('count')).filter(count__gt=0).order_by(*group_by)
+    rows = list(rows)
+    return sum(row['count'] for row in rows), rows
@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.core import signing
+from django.utils.dateparse import parse_datetime
+
+SYNC_TOKEN_SALT = 'signalement.sync'
+
+
+class InvalidSyncToken(Exception):
+    pass
+
+
+def make_sync_token(user, positions):
+    """
+    Jeton opaque et signé : position (horodatage, lignes déjà vues) atteinte dans chaque flux
+    de modifications ('signalements' et 'deleted') pour cet utilisateur.
+    """
+    return signing.dumps({'user': user.pk, 'positions': positions}, salt=SYNC_TOKEN_SALT, compress=True)
+
+
+def read_sync_token(user, token):
+    try:
+        data = signing.loads(token, salt=SYNC_TOKEN_SALT)
+    except signing.BadSignature:
+        raise InvalidSyncToken
+    if not isinstance(data, dict) or data.get('user') != user.pk or not isinstance(data.get('positions'), dict):
+        raise InvalidSyncToken
+    return data['positions']
+
+
+def read_changes(queryset, timestamp_field, position, limit):
+    """
+    Lit au plus ``limit`` lignes modifiées depuis ``position`` dans l'ordre
+    (timestamp_field, id), en s'appuyant sur l'index composite correspondant.
+
+    L'horodatage est pris à l'écriture mais la ligne n'est visible qu'au
+    commit : une transaction lente peut publier une ligne plus ancienne que la
+    position déjà atteinte. La lecture reprend donc SIGNALEMENT_SYNC_OVERLAP
+    avant la position, et la position garde les lignes déjà renvoyées dans
+    cette fenêtre ({id: horodatage}) pour ne pas les renvoyer deux fois.
+
+    Retourne les lignes, la nouvelle position et un booléen indiquant s'il
+    reste des modifications à lire.
+    """
+    overlap = settings.SIGNALEMENT_SYNC_OVERLAP
+    seen = {}
+    if position:
+        if not isinstance(position, list) or len(position) != 2 or not isinstance(position[1], dict):
+            raise InvalidSyncToken
+        timestamp = parse_datetime(position[0]) if isinstance(position[0], str) else None
+        if timestamp is None:
+            raise InvalidSyncToken
+        seen = position[1]
+        queryset = queryset.filter(**{f'{timestamp_field}__gte': timestamp - overlap})
+
+    # Les lignes déjà vues de la fenêtre sont écartées ici plutôt qu'en SQL
+    rows, has_more = [], False
+    for row in queryset.order_by(timestamp_field, 'id')[:limit + 1 + len(seen)]:
+        if seen.get(str(row.id)) == getattr(row, timestamp_field).isoformat():
+            continue
+        if len(rows) == limit:
+            has_more = True
+            break
+        rows.append(row)
+
+    if rows:
+        timestamp = getattr(rows[-1], timestamp_field)
+        if position:
+            timestamp = max(timestamp, parse_datetime(position[0]))
+        seen.update((str(row.id), getattr(row, timestamp_field).isoformat()) for row in rows)
+        # Seules les lignes encore dans la fenêtre de recouvrement restent utiles
+        position = [timestamp.isoformat(), {
+            key: value for key, value in seen.items() if parse_datetime(value) >= timestamp - overlap
+        }]
+    return rows, position, has_more
+
+
+def latest_position(queryset, timestamp_field):
+    """
+    Position atteinte par un client qui n'a rien à lire de ce flux : les
+    lignes de la fenêtre de recouvrement sont considérées comme déjà vues.
+    """
+    last = queryset.order_by(timestamp_field, 'id').values_list(timestamp_field, flat=True).last()
+    if last is None:
+        return None
+    recent = queryset.filter(**{f'{timestamp_field}__gte': last - settings.SIGNALEMENT_SYNC_OVERLAP})
+    seen = {str(pk): value.isoformat() for pk, value in recent.values_list('id', timestamp_field)}
+    return [last.isoformat(), seen]
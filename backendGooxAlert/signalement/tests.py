@@ -1,3 +1,1110 @@
-from django.test import TestCase
+import asyncio
+import base64
+import gzip
+import hashlib
+import io
+import json
+import sys
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentification.authentication import StreamToken, invalidate_cached_user
+from authentification.models import User, ImageAsset
+from authentification.testing import SHARED_CACHES
+from backendGooxAlert.checks import check_events_backend, check_shared_cache
+from backendGooxAlert.idempotency import get_idempotency_store
+from backendGooxAlert.renderers import FastJSONParser, FastJSONRenderer, orjson
+from backendGooxAlert.routers import ReplicaRouter, recently_wrote, replica_reads
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from .caching import get_user_version, response_cache_stats
+from .clustering import tile_cache_key, tile_for_point
+from .duplicates import detect_duplicates
+from .events import RedisBroadcaster, get_broadcaster
+from .geo import encode_geohash, geohash_prefixes
+from .models import Signalement, SignalementBand, SignalementDailyStat, SignalementTombstone
+from .search import search_signalements
+from .stats import rebuild_stats
+
+
+def create_user(telephone='00221771234567', **extra):
+    data = {'full_name': 'Awa Diop', 'commune': 'Dakar'}
+    data.update(extra)
+    user = User(username=telephone, telephone=telephone, **data)
+    user.set_password('secret123')
+    user.save()
+    return user
+
+
+def create_signalement(user, **extra):
+    data = {
+        'title': 'Nid-de-poule',
+        'description': 'Trou profond sur la chaussée',
+        'location': 'Dakar Plateau',
+        'category': 'voirie',
+    }
+    data.update(extra)
+    return Signalement.objects.create(user=user, **data)
+
+
+@override_settings(SIGNALEMENT_PAGE_SIZE=3, SIGNALEMENT_MAX_PAGE_SIZE=5)
+class SignalementPaginationTests(TestCase):
+    url = '/signalement/api/signalement/'
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_pages_follow_cursor_without_duplicates(self):
+        created = [create_signalement(self.user, title=f'Signalement {i}') for i in range(7)]
+        create_signalement(create_user('00221779999999'))
+
+        seen = []
+        url = self.url
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 3)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+
+        # Même created_at possible : l'id départage, du plus récent au plus ancien
+        expected = [s.id for s in sorted(created, key=lambda s: (s.created_at, s.id), reverse=True)]
+        self.assertEqual(seen, expected)
+
+    def test_page_size_is_capped(self):
+        for i in range(8):
+            create_signalement(self.user)
+        response = self.client.get(self.url, {'page_size': 50})
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'pas-un-curseur'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_malformed_cursor_values(self):
+        for values in ([None, None], [{}, 1], ['2024-01-01T00:00:00+00:00', 'x'], [True, 1], ['pas-une-date', 1]):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, values)
+
+
+@override_settings(SIGNALEMENT_SYNC_BATCH_SIZE=2)
+class SignalementSyncTests(TestCase):
+    url = '/signalement/api/signalement/sync/'
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, token=None):
+        changed, deleted = [], []
+        while True:
+            response = self.client.get(self.url, {'token': token} if token else {})
+            self.assertEqual(response.status_code, 200)
+            changed.extend(item['id'] for item in response.data['signalements'])
+            deleted.extend(response.data['deleted'])
+            token = response.data['sync_token']
+            if not response.data['has_more']:
+                return changed, deleted, token
+
+    def test_only_changes_since_token_are_returned(self):
+        old = create_signalement(self.user)
+        kept = create_signalement(self.user)
+        removed = create_signalement(self.user)
+        changed, deleted, token = self.sync()
+        self.assertEqual(sorted(changed), sorted([old.id, kept.id, removed.id]))
+        self.assertEqual(deleted, [])
+
+        changed, deleted, token = self.sync(token)
+        self.assertEqual((changed, deleted), ([], []))
+
+        kept.title = 'Titre corrigé'
+        kept.save()
+        new = create_signalement(self.user)
+        self.client.delete(f'/signalement/api/signalements/{removed.id}/')
+
+        changed, deleted, token = self.sync(token)
+        self.assertEqual(sorted(changed), sorted([kept.id, new.id]))
+        self.assertEqual(deleted, [removed.id])
+
+    def test_late_commit_inside_overlap_window_is_returned_once(self):
+        first = create_signalement(self.user)
+        _, _, token = self.sync()
+        # Écriture horodatée avant la position du client mais publiée après
+        late = create_signalement(self.user)
+        Signalement.objects.filter(pk=late.pk).update(updated_at=first.updated_at - timedelta(seconds=1))
+        newer = create_signalement(self.user)
+
+        changed, _, token = self.sync(token)
+        self.assertEqual(sorted(changed), sorted([late.id, newer.id]))
+        changed, _, token = self.sync(token)
+        self.assertEqual(changed, [])
+
+        # Une nouvelle modification d'une ligne déjà vue est renvoyée
+        first.title = 'Titre corrigé'
+        first.save()
+        changed, _, _ = self.sync(token)
+        self.assertEqual(changed, [first.id])
+
+    @override_settings(SIGNALEMENT_SYNC_BATCH_SIZE=2)
+    def test_pages_inside_overlap_window(self):
+        created = [create_signalement(self.user).id for _ in range(5)]
+        Signalement.objects.update(updated_at=Signalement.objects.get(pk=created[0]).updated_at)
+        changed, _, token = self.sync()
+        self.assertEqual(sorted(changed), created)
+        changed, _, _ = self.sync(token)
+        self.assertEqual(changed, [])
+
+    def test_tombstones_are_removed_with_user(self):
+        create_signalement(self.user)
+        other = create_user('00221779999999')
+        create_signalement(other)
+        Signalement.objects.filter(user=other).delete()
+        self.user.delete()
+        self.assertEqual(list(SignalementTombstone.objects.values_list('user_id', flat=True)), [other.id])
+
+    def test_token_of_another_user_is_rejected(self):
+        _, _, token = self.sync()
+        self.client.force_authenticate(create_user('00221779999999'))
+        response = self.client.get(self.url, {'token': token})
+        self.assertEqual(response.status_code, 400)
+
+
+class SignalementImageTests(TestCase):
+    def test_image_asset_sets_image_url_and_variants(self):
+        asset = ImageAsset.objects.create(
+            content_hash='a' * 64, url='https://i.ibb.co/a.jpg',
+            medium_url='https://i.ibb.co/a-medium.webp', medium_fallback_url='https://i.ibb.co/a-medium.jpg',
+            thumbnail_url='https://i.ibb.co/a-thumbnail.webp', thumbnail_fallback_url='https://i.ibb.co/a-thumbnail.jpg',
+            width=2048, height=1536,
+        )
+        user = create_user()
+        asset.uploaders.add(user)
+        client = APIClient()
+        client.force_authenticate(user)
+        data = {
+            'title': 'Lampadaire cassé', 'description': '...', 'location': 'Thiès',
+            'category': 'eclairage', 'image_asset': asset.id,
+        }
+        response = client.post('/signalement/api/signalement/', data, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['image_url'], asset.url)
+        self.assertEqual(response.data['image_variants']['thumbnail_url'], asset.thumbnail_url)
+
+        # L'image d'un autre utilisateur ne peut pas être attachée
+        client.force_authenticate(create_user('00221779999999'))
+        response = client.post('/signalement/api/signalement/', data, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image_asset', response.data)
+
+
+class SignalementGeoTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Place de l'Indépendance, Médina, Thiès
+        self.plateau = create_signalement(self.user, location='14.6680,-17.4320')
+        self.medina = create_signalement(self.user, location='14.6850,-17.4500', status='resolu')
+        self.thies = create_signalement(self.user, location='14.7910,-16.9260')
+        create_signalement(self.user, location='Marché Sandaga')
+
+    def test_geohash(self):
+        self.assertEqual(encode_geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(self.plateau.latitude, 14.668)
+        self.assertEqual(self.plateau.geohash, 'edee7q4rkcqs')
+        prefixes = geohash_prefixes(14.6, -17.5, 14.7, -17.4)
+        self.assertLessEqual(len(prefixes), 16)
+        self.assertTrue(any(self.medina.geohash.startswith(prefix) for prefix in prefixes))
+
+    def test_bbox(self):
+        response = self.client.get('/signalement/api/signalements/bbox/', {
+            'min_lat': 14.6, 'min_lng': -17.5, 'max_lat': 14.7, 'max_lng': -17.4,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({s['id'] for s in response.data['signalements']}, {self.plateau.id, self.medina.id})
+
+        response = self.client.get('/signalement/api/signalements/bbox/', {'min_lat': 14.6})
+        self.assertEqual(response.status_code, 400)
+
+    def test_nearby_is_sorted_and_filtered(self):
+        response = self.client.get('/signalement/api/signalements/nearby/', {
+            'lat': 14.6700, 'lng': -17.4330, 'radius': 5000,
+        })
+        self.assertEqual([s['id'] for s in response.data['signalements']], [self.plateau.id, self.medina.id])
+        self.assertLess(response.data['signalements'][0]['distance'], 300)
+
+        response = self.client.get('/signalement/api/signalements/nearby/', {
+            'lat': 14.6700, 'lng': -17.4330, 'radius': 5000, 'status': 'en_attente',
+        })
+        self.assertEqual([s['id'] for s in response.data['signalements']], [self.plateau.id])
+
+    def test_citizens_only_see_their_own_signalements(self):
+        bbox = {'min_lat': 14.6, 'min_lng': -17.5, 'max_lat': 14.7, 'max_lng': -17.4}
+        nearby = {'lat': 14.6700, 'lng': -17.4330, 'radius': 5000}
+        other = APIClient()
+        other.force_authenticate(create_user('00221779999999'))
+        self.assertEqual(other.get('/signalement/api/signalements/bbox/', bbox).data['signalements'], [])
+        self.assertEqual(other.get('/signalement/api/signalements/nearby/', nearby).data['signalements'], [])
+
+        other.force_authenticate(create_user('00221778888888', role='moderator'))
+        response = other.get('/signalement/api/signalements/bbox/', bbox)
+        self.assertEqual({s['id'] for s in response.data['signalements']}, {self.plateau.id, self.medina.id})
+
+    @override_settings(SIGNALEMENT_GEO_MAX_RESULTS=1)
+    def test_nearby_limit_keeps_closest(self):
+        # Le plus récent (Médina) est plus loin que Plateau : la limite s'applique après le tri par distance
+        response = self.client.get('/signalement/api/signalements/nearby/', {
+            'lat': 14.6700, 'lng': -17.4330, 'radius': 5000,
+        })
+        self.assertEqual([s['id'] for s in response.data['signalements']], [self.plateau.id])
+
+    def test_location_change_updates_coordinates(self):
+        signalement = Signalement.objects.get(pk=self.thies.pk)
+        signalement.location = '14.6850,-17.4500'
+        signalement.save()
+        self.assertEqual((signalement.latitude, signalement.longitude), (14.685, -17.45))
+        self.assertEqual(signalement.geohash, self.medina.geohash)
+
+        signalement.location = 'Marché Sandaga'
+        signalement.save()
+        self.assertEqual((signalement.latitude, signalement.longitude, signalement.geohash), (None, None, ''))
+
+
+class SignalementClusterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        create_signalement(self.user, location='14.6680,-17.4320', category='eclairage')
+        create_signalement(self.user, location='14.6681,-17.4321', category='eclairage')
+        create_signalement(self.user, location='14.6682,-17.4322', status='resolu')
+        self.thies = create_signalement(self.user, location='14.7910,-16.9260')
+
+    def get_clusters(self, z):
+        x, y = tile_for_point(14.668, -17.432, z)
+        response = self.client.get(f'/signalement/api/clusters/{z}/{x}/{y}/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['clusters']
+
+    def test_clusters_aggregate_per_cell(self):
+        clusters = self.get_clusters(10)
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual(clusters[0]['count'], 3)
+        self.assertEqual(clusters[0]['dominant_category'], 'eclairage')
+        self.assertEqual(clusters[0]['status'], {'en_attente': 2, 'resolu': 1})
+
+        # A faible zoom, Dakar et Thiès tombent dans la même tuile mais pas la même cellule
+        self.assertEqual(sorted(c['count'] for c in self.get_clusters(8)), [1, 3])
+
+    def test_tiles_are_invalidated_again_at_commit(self):
+        key = tile_cache_key(10, *tile_for_point(14.668, -17.432, 10))
+        with self.captureOnCommitCallbacks(execute=True):
+            create_signalement(self.user, location='14.6683,-17.4323')
+            # Lecture concurrente avant le commit : elle voit encore 3 signalements
+            cache.set(key, [{'count': 3}])
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(self.get_clusters(10)[0]['count'], 4)
+
+    def test_touched_tiles_are_invalidated(self):
+        self.assertEqual(self.get_clusters(10)[0]['count'], 3)
+        thies_tile = tile_cache_key(10, *tile_for_point(14.791, -16.926, 10))
+        cache.set(thies_tile, ['en cache'])
+
+        create_signalement(self.user, location='14.6683,-17.4323')
+        self.assertEqual(self.get_clusters(10)[0]['count'], 4)
+
+        signalement = Signalement.objects.get(pk=self.thies.pk)
+        signalement.title = 'Sans effet sur les tuiles'
+        signalement.save()
+        self.assertEqual(cache.get(thies_tile), ['en cache'])
+        signalement.status = 'resolu'
+        signalement.save()
+        self.assertIsNone(cache.get(thies_tile))
+
+
+class SignalementStatsTests(TestCase):
+    url = '/signalement/api/stats/'
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(create_user('00221779999999', role='admin'))
+
+    def counters(self):
+        return sorted(SignalementDailyStat.objects.filter(count__gt=0).values_list('category', 'status', 'commune', 'count'))
+
+    def test_counters_follow_create_status_change_and_delete(self):
+        first = create_signalement(self.user)
+        second = create_signalement(self.user, category='eau')
+        create_signalement(create_user('00221775555555', commune='Thiès'))
+        second.status = 'resolu'
+        second.save()
+        Signalement.objects.get(pk=first.pk).delete()
+
+        expected = [('eau', 'resolu', 'Dakar', 1), ('voirie', 'en_attente', 'Thiès', 1)]
+        self.assertEqual(self.counters(), expected)
+        rebuild_stats()
+        self.assertEqual(self.counters(), expected)
+
+    def test_api_sums_pre_aggregated_rows(self):
+        create_signalement(self.user)
+        create_signalement(self.user)
+        create_signalement(self.user, category='eau', status='resolu')
+
+        response = self.client.get(self.url, {'group_by': 'category'})
+        self.assertEqual(response.data['total'], 3)
+        self.assertEqual([(r['category'], r['count']) for r in response.data['results']], [('eau', 1), ('voirie', 2)])
+
+        response = self.client.get(self.url, {'status': 'resolu', 'start': '2000-01-01'})
+        self.assertEqual(response.data['total'], 1)
+        self.assertEqual(self.client.get(self.url, {'group_by': 'user'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'end': '2000-01-01'}).data['total'], 0)
+        self.assertEqual(self.client.get(self.url, {'start': '2024-02-30'}).status_code, 400)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class SignalementSearchTests(TestCase):
+    url = '/signalement/api/signalements/search/'
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(create_user('00221779999999', role='moderator'))
+        self.leak = create_signalement(self.user, title='Fuite de canalisation', description='La canalisation fuit devant le marché', category='eau')
+        self.other = create_signalement(self.user, title='Route inondée', description='Une fuite inonde la route', category='eau', status='resolu')
+        create_signalement(self.user)
+
+    def test_results_are_ranked_and_highlighted(self):
+        response = self.client.get(self.url, {'q': 'fuite canalisation'})
+        self.assertEqual([item['id'] for item in response.data['results']], [self.leak.id])
+        self.assertIn('<mark>canalisation</mark>', response.data['results'][0]['snippet'])
+        self.assertNotIn('search_vector', response.data['results'][0])
+
+        response = self.client.get(self.url, {'q': 'fuite'})
+        self.assertEqual([item['id'] for item in response.data['results']], [self.leak.id, self.other.id])
+
+    def test_filters(self):
+        response = self.client.get(self.url, {'q': 'fuite', 'status': 'resolu'})
+        self.assertEqual([item['id'] for item in response.data['results']], [self.other.id])
+        self.assertEqual(self.client.get(self.url, {'q': 'fuite', 'end': '2000-01-01'}).data['count'], 0)
+        self.assertEqual(self.client.get(self.url, {'q': 'fuite', 'start': 'hier'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'q': 'fuite', 'end': '2024-02-30'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+
+    def test_postgresql_query_uses_search_vector(self):
+        # Expressions de la branche PostgreSQL, vérifiées sans base PostgreSQL
+        with mock.patch('signalement.search.full_text_supported', return_value=True):
+            queryset = search_signalements(Signalement.objects.all(), 'fuite canalisation')
+        lookup = queryset.query.where.children[0]
+        self.assertEqual(lookup.lhs.target.name, 'search_vector')
+        self.assertIsInstance(lookup.rhs, SearchQuery)
+        self.assertIsInstance(queryset.query.annotations['rank'], SearchRank)
+        self.assertIsInstance(queryset.query.annotations['snippet'], SearchHeadline)
+        self.assertEqual(queryset.query.order_by, ('-rank', '-id'))
+
+    @skipUnless(connection.vendor == 'postgresql', 'recherche plein texte propre à PostgreSQL')
+    def test_postgresql_full_text_search(self):
+        results = list(search_signalements(Signalement.objects.all(), 'canalisations'))
+        self.assertEqual([signalement.id for signalement in results], [self.leak.id])
+        self.assertIn('<mark>canalisation</mark>', results[0].snippet)
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = Signalement.objects.filter(search_vector=SearchQuery('fuite', config='french')).explain()
+        self.assertIn('signalement_search_idx', plan)
+
+    def test_edited_text_is_searchable(self):
+        self.leak.title = 'Lampadaire éteint'
+        self.leak.description = 'Plus aucun éclairage'
+        self.leak.save()
+        self.assertEqual(self.client.get(self.url, {'q': 'canalisation'}).data['count'], 0)
+        self.assertEqual(self.client.get(self.url, {'q': 'lampadaire'}).data['count'], 1)
+
+
+@override_settings(SIGNALEMENT_PAGE_SIZE=2)
+class ModerationTests(TestCase):
+    queue_url = '/signalement/api/moderation/'
+    transition_url = '/signalement/api/moderation/transition/'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(create_user('00221779999999', role='moderator'))
+        self.signalements = [
+            create_signalement(create_user(f'0022177000000{i}'), location='14.6928,-17.4467')
+            for i in range(4)
+        ]
+        create_signalement(self.signalements[0].user, category='eau', status='resolu')
+
+    def test_queue_spans_users_with_filters_and_cursor(self):
+        response = self.client.get(self.queue_url, {'status': 'en_attente', 'category': 'voirie'})
+        seen = [item['id'] for item in response.data['results']]
+        seen += [item['id'] for item in self.client.get(response.data['next']).data['results']]
+        self.assertEqual(seen, [s.id for s in reversed(self.signalements)])
+
+    def test_bulk_transition_updates_counters_and_tiles(self):
+        ids = [s.id for s in self.signalements[:3]]
+        key = tile_cache_key(10, *tile_for_point(14.6928, -17.4467, 10))
+        cache.set(key, [])
+
+        response = self.client.post(self.transition_url, {'ids': ids + [999999], 'status': 'en_cours'}, format='json')
+        self.assertEqual(response.data['updated'], ids)
+        self.assertEqual(Signalement.objects.filter(status='en_cours').count(), 3)
+        self.assertIsNone(cache.get(key))
+        counters = dict(SignalementDailyStat.objects.filter(category='voirie').values_list('status', 'count'))
+        self.assertEqual(counters, {'en_attente': 1, 'en_cours': 3})
+        self.assertGreater(Signalement.objects.get(pk=ids[0]).updated_at, self.signalements[0].updated_at)
+
+        # Déjà dans ce statut : rien n'est modifié
+        response = self.client.post(self.transition_url, {'ids': ids, 'status': 'en_cours'}, format='json')
+        self.assertEqual(response.data['updated'], [])
+
+    def test_rejects_invalid_input_and_plain_users(self):
+        self.assertEqual(self.client.post(self.transition_url, {'ids': [1], 'status': 'ferme'}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(self.transition_url, {'ids': 'tout', 'status': 'resolu'}, format='json').status_code, 400)
+        self.client.force_authenticate(self.signalements[0].user)
+        self.assertEqual(self.client.get(self.queue_url).status_code, 403)
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class SignalementResponseCacheTests(TestCase):
+    url = '/signalement/api/signalement/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.signalement = create_signalement(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_and_detail_are_served_from_cache(self):
+        detail_url = f'/signalement/api/signalements/{self.signalement.id}/'
+        for url in (self.url, detail_url):
+            self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+            # Seule reste la requête du validateur (ETag)
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['id'], self.signalement.id)
+        self.assertEqual(response_cache_stats(), {'hits': 2, 'misses': 2})
+
+    def test_writes_and_status_changes_bump_the_version(self):
+        self.client.get(self.url)
+        self.client.post(self.url, {'title': 'Lampadaire', 'description': '...', 'location': 'Dakar', 'category': 'eclairage'}, format='json')
+        self.assertEqual(len(self.client.get(self.url).data['results']), 2)
+
+        moderator = APIClient()
+        moderator.force_authenticate(create_user('00221779999999', role='moderator'))
+        moderator.post('/signalement/api/moderation/transition/', {'ids': [self.signalement.id], 'status': 'resolu'}, format='json')
+        statuses = {item['id']: item['status'] for item in self.client.get(self.url).data['results']}
+        self.assertEqual(statuses[self.signalement.id], 'resolu')
+
+        self.client.delete(f'/signalement/api/signalements/{self.signalement.id}/')
+        self.assertEqual(len(self.client.get(self.url).data['results']), 1)
+
+    def test_cache_is_per_user(self):
+        self.client.get(self.url)
+        self.client.force_authenticate(create_user('00221775555555'))
+        self.assertEqual(self.client.get(self.url).data['results'], [])
+
+    def test_process_local_cache_is_not_used(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.client.get(self.url)
+            response = self.client.get(self.url)
+            self.assertNotIn('X-Cache', response)
+            self.assertEqual(response_cache_stats(), {'hits': 0, 'misses': 0})
+        with override_settings(SIGNALEMENT_RESPONSE_CACHE='local', CACHES={
+            **SHARED_CACHES, 'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        }):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['backendGooxAlert.E003'])
+
+
+class SignalementConditionalTests(TestCase):
+    url = '/signalement/api/signalement/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.signalement = create_signalement(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_validators_are_usable_cross_origin(self):
+        origin = 'http://localhost:3000'
+        response = self.client.get(self.url, HTTP_ORIGIN=origin)
+        self.assertIn('etag', response['Access-Control-Expose-Headers'].lower())
+        preflight = self.client.options(
+            self.url, HTTP_ORIGIN=origin,
+            HTTP_ACCESS_CONTROL_REQUEST_METHOD='GET', HTTP_ACCESS_CONTROL_REQUEST_HEADERS='if-none-match',
+        )
+        self.assertIn('if-none-match', preflight['Access-Control-Allow-Headers'])
+
+    def test_unchanged_list_answers_304_with_one_query(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        create_signalement(self.user)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        Signalement.objects.filter(pk=self.signalement.pk).delete()
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url + '?page_size=1', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_supports_etag_and_last_modified(self):
+        url = f'/signalement/api/signalements/{self.signalement.id}/'
+        response = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        self.client.patch(url, {'title': 'Nid-de-poule agrandi'}, format='json')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        self.assertEqual(self.client.get('/signalement/api/signalements/999999/').status_code, 404)
+
+    def test_sparse_detail_etag_does_not_validate_full_representation(self):
+        url = f'/signalement/api/signalements/{self.signalement.id}/'
+        sparse = self.client.get(url, {'fields': 'id'})
+        self.assertEqual(sparse.data, {'id': self.signalement.id})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=sparse['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('title', response.data)
+
+
+class JSONAndCompressionTests(TestCase):
+    def test_fast_renderer_matches_drf_bytes(self):
+        data = {
+            'results': [{'id': 1, 'title': 'Fuite à Médina\u2028', 'latitude': 14.6928, 'ok': True, 'vide': None}],
+            'created_at': datetime(2024, 5, 1, 8, 30, 0, 123456, tzinfo=dt_timezone.utc),
+            'day': date(2024, 5, 1),
+            'uuid': uuid.UUID(int=1),
+            'montant': Decimal('1.5'),
+            'compteurs': {1: 2},
+            'grand': 2 ** 70,
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(data, 'application/json; indent=2'), JSONRenderer().render(data, 'application/json; indent=2'))
+
+    def test_fast_renderer_float_formatting(self):
+        # Exposants écrits différemment mais mêmes valeurs une fois décodées
+        data = {'valeurs': [1e16, 1e-7, 2.5e-12, 0.1, 14.6928]}
+        self.assertEqual(json.loads(FastJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+
+    @skipUnless(orjson, 'orjson non installé')
+    def test_fast_renderer_non_finite_floats(self):
+        self.assertEqual(FastJSONRenderer().render({'a': 1e16, 'b': 1e-7}), b'{"a":1e16,"b":1e-7}')
+        self.assertEqual(JSONRenderer().render({'a': 1e16, 'b': 1e-7}), b'{"a":1e+16,"b":1e-07}')
+        for value in (float('nan'), float('inf'), float('-inf')):
+            self.assertEqual(FastJSONRenderer().render({'score': value}), b'{"score":null}')
+            with self.assertRaises(ValueError):
+                JSONRenderer().render({'score': value})
+
+    def test_fast_parser_rejects_invalid_json(self):
+        self.assertEqual(FastJSONParser().parse(io.BytesIO('{"titre": "Fuite"}'.encode())), {'titre': 'Fuite'})
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"a": NaN}'))
+
+    def test_large_lists_are_compressed(self):
+        user = create_user()
+        for i in range(20):
+            create_signalement(user, description='Trou profond sur la chaussée. ' * 10)
+        client = APIClient()
+        client.force_authenticate(user)
+        url = '/signalement/api/signalement/'
+
+        response = client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['results']), 20)
+
+        self.assertFalse(client.get(url).has_header('Content-Encoding'))
+        self.assertFalse(client.get(url + '?page_size=1', HTTP_ACCEPT_ENCODING='gzip').has_header('Content-Encoding'))
+
+        # Réponse de connexion (jetons) non compressée, même avec ses signalements embarqués
+        response = APIClient().post(
+            '/auth/api/login/?include=signalements', {'telephone': user.telephone, 'password': 'secret123'},
+            format='json', HTTP_ACCEPT_ENCODING='gzip',
+        )
+        self.assertEqual(len(response.data['signalements']), 20)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class SignalementSparseFieldsTests(TestCase):
+    url = '/signalement/api/signalement/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.signalement = create_signalement(self.user, description='Trou très profond. ' * 20)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_fields_and_exclude(self):
+        response = self.client.get(self.url, {'fields': 'id,title,status'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title', 'status'})
+        response = self.client.get(self.url, {'exclude': 'description,image_variants'})
+        self.assertNotIn('description', response.data['results'][0])
+        self.assertIn('title', response.data['results'][0])
+
+        detail = self.client.get(f'/signalement/api/signalements/{self.signalement.id}/', {'fields': 'id,title'})
+        self.assertEqual(set(detail.data), {'id', 'title'})
+        profile = self.client.get('/auth/api/profile/', {'fields': 'full_name'})
+        self.assertEqual(profile.data['profile'], {'full_name': 'Awa Diop'})
+
+    def test_unrequested_columns_are_not_fetched(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'id,title', 'page_size': 1})
+        select = [q['sql'] for q in queries.captured_queries if 'FROM "signalement_signalement"' in q['sql'] and 'LIMIT' in q['sql']][0]
+        self.assertNotIn('"description"', select)
+        self.assertNotIn('authentification_imageasset', select)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+
+    def test_compact_mode_truncates_descriptions_in_database(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'compact': '1'})
+        description = response.data['results'][0]['description']
+        self.assertEqual(len(description), len(description.rstrip('…')) + 1)
+        self.assertLessEqual(len(description), 121)
+        self.assertTrue(self.signalement.description.startswith(description[:-1]))
+        select = [q['sql'] for q in queries.captured_queries if 'LIMIT' in q['sql']][0]
+        self.assertIn('SUBSTR("signalement_signalement"."description", 1, 121)', select)
+        self.assertNotIn('"description"', select.replace('SUBSTR("signalement_signalement"."description"', ''))
+
+
+class SignalementBatchCreateTests(TestCase):
+    url = '/signalement/api/signalement/batch/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user(commune='Pikine')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def item(self, **extra):
+        data = {'title': 'Nid-de-poule', 'description': '...', 'location': '14.6928,-17.4467', 'category': 'voirie'}
+        data.update(extra)
+        return data
+
+    def test_valid_items_are_inserted_together_and_errors_reported(self):
+        items = [self.item(client_id='a'), self.item(category='inconnue', client_id='b'), self.item(title='Lampadaire', category='eclairage')]
+        self.client.get('/signalement/api/signalement/')
+        response = self.client.post(self.url, {'signalements': items}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        results = response.data['results']
+        self.assertEqual([r['status'] for r in results], ['created', 'error', 'created'])
+        self.assertEqual(results[0]['client_id'], 'a')
+        self.assertIn('category', results[1]['errors'])
+
+        signalement = Signalement.objects.get(pk=results[0]['signalement']['id'])
+        self.assertEqual((signalement.user, signalement.commune, signalement.geohash[:5]), (self.user, 'Pikine', encode_geohash(14.6928, -17.4467)[:5]))
+        self.assertEqual(SignalementDailyStat.objects.get(category='voirie').count, 1)
+        # Les hooks de création invalident aussi le cache des réponses
+        self.assertEqual(len(self.client.get('/signalement/api/signalement/').data['results']), 2)
+
+    def test_rejects_invalid_batches(self):
+        self.assertEqual(self.client.post(self.url, {'signalements': []}, format='json').status_code, 400)
+        response = self.client.post(self.url, [self.item(category='inconnue')], format='json')
+        self.assertEqual((response.status_code, response.data['created']), (400, 0))
+        with override_settings(SIGNALEMENT_BATCH_MAX_ITEMS=1):
+            self.assertEqual(self.client.post(self.url, [self.item(), self.item()], format='json').status_code, 400)
+
+
+
+@override_settings(IDEMPOTENCY_STORE='backendGooxAlert.idempotency.LocalIdempotencyStore')
+class IdempotencyTests(TestCase):
+    url = '/signalement/api/signalement/'
+    data = {'title': 'Nid-de-poule', 'description': '...', 'location': 'Dakar', 'category': 'voirie'}
+
+    def setUp(self):
+        get_idempotency_store().clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, data=None, key='cle-1'):
+        return self.client.post(self.url, data or self.data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_stored_response(self):
+        first = self.post()
+        self.assertEqual(first.status_code, 201)
+        with self.assertNumQueries(0):
+            retry = self.post()
+        self.assertEqual((retry.status_code, retry.data, retry['Idempotent-Replayed']), (201, first.data, 'true'))
+        self.assertEqual(Signalement.objects.count(), 1)
+
+        self.assertEqual(self.post(key='cle-2').status_code, 201)
+        self.assertEqual(self.post({**self.data, 'title': 'Autre'}).status_code, 422)
+        self.assertEqual(Signalement.objects.count(), 2)
+
+    def store_key(self, key):
+        return f'idempotency:{self.user.pk}:POST:{self.url}:{hashlib.sha256(key.encode()).hexdigest()}'
+
+    def test_concurrent_duplicate_waits_for_the_first_request(self):
+        store = get_idempotency_store()
+        token = store.acquire(self.store_key('cle-1'), 60)
+        body = JSONRenderer().render(self.data)
+
+        def finish_first_request():
+            time.sleep(0.1)
+            store.set(self.store_key('cle-1'), {'fingerprint': hashlib.sha256(body).hexdigest(), 'status': 201, 'data': {'id': 42}}, 60)
+            store.release(self.store_key('cle-1'), token)
+
+        thread = threading.Thread(target=finish_first_request)
+        thread.start()
+        response = self.post()
+        thread.join()
+        self.assertEqual((response.status_code, response.data), (201, {'id': 42}))
+        self.assertFalse(Signalement.objects.exists())
+
+    def test_gives_up_when_first_request_is_still_running(self):
+        get_idempotency_store().acquire(self.store_key('cle-1'), 60)
+        started = time.monotonic()
+        self.assertEqual(self.post().status_code, 409)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_browser_preflight_allows_the_header(self):
+        response = self.client.options(
+            self.url, HTTP_ORIGIN='http://localhost:3000',
+            HTTP_ACCESS_CONTROL_REQUEST_METHOD='POST', HTTP_ACCESS_CONTROL_REQUEST_HEADERS='idempotency-key',
+        )
+        self.assertIn('idempotency-key', response['Access-Control-Allow-Headers'])
+
+    def test_response_stored_while_taking_the_lock_is_checked(self):
+        store = get_idempotency_store()
+        stored = {'fingerprint': 'autre requête', 'status': 201, 'data': {'id': 42}}
+        # Première lecture : rien ; relecture sous verrou : réponse d'une autre requête
+        with mock.patch.object(store, 'get', side_effect=[None, stored]):
+            response = self.post()
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(Signalement.objects.exists())
+
+
+class SignalementDuplicateTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.original = create_signalement(
+            self.user, title='Dépotoir qui déborde', description='Les ordures débordent du dépotoir au marché de Colobane',
+            category='ordures', location='14.6900,-17.4500',
+        )
+
+    def report(self, **extra):
+        data = {
+            'title': 'Depotoir qui deborde !', 'description': 'Les ordures débordent du dépotoir près du marché de Colobane',
+            'category': 'ordures', 'location': '14.6905,-17.4502',
+        }
+        data.update(extra)
+        return create_signalement(create_user(f'0022177{Signalement.objects.count():07d}'), **data)
+
+    def test_similar_nearby_report_is_linked(self):
+        duplicate = self.report()
+        duplicate.refresh_from_db()
+        self.assertEqual(duplicate.duplicate_of, self.original)
+        self.assertGreater(duplicate.duplicate_score, 0.5)
+
+        # Un troisième signalement est rattaché au signalement d'origine
+        third = self.report(location='14.6901,-17.4499')
+        third.refresh_from_db()
+        self.assertEqual(third.duplicate_of, self.original)
+
+    def test_other_category_distance_or_text_is_not_linked(self):
+        for extra in (
+            {'category': 'assainissement'},
+            {'location': '14.7500,-17.3500'},
+            {'title': 'Lampadaire cassé', 'description': 'La rue est dans le noir depuis une semaine'},
+        ):
+            signalement = self.report(**extra)
+            signalement.refresh_from_db()
+            self.assertIsNone(signalement.duplicate_of)
+
+    def test_closed_reports_are_not_candidates(self):
+        self.original.status = 'resolu'
+        self.original.save()
+        duplicate = self.report()
+        duplicate.refresh_from_db()
+        self.assertIsNone(duplicate.duplicate_of)
+
+    def test_backfill_command_clusters_existing_reports(self):
+        duplicate = self.report()
+        Signalement.objects.update(duplicate_of=None, duplicate_score=None)
+        call_command('detect_signalement_duplicates', stdout=io.StringIO())
+        duplicate.refresh_from_db()
+        self.assertEqual(duplicate.duplicate_of, self.original)
+        self.assertIsNone(Signalement.objects.get(pk=self.original.pk).duplicate_of)
+
+    def test_backfill_command_keeps_the_index_complete(self):
+        self.report()
+        indexed = SignalementBand.objects.count()
+        band_counts = []
+
+        def detect(batch):
+            band_counts.append(SignalementBand.objects.count())
+            detect_duplicates(batch)
+
+        with mock.patch('signalement.management.commands.detect_signalement_duplicates.detect_duplicates', side_effect=detect):
+            call_command('detect_signalement_duplicates', '--batch-size', '1', stdout=io.StringIO())
+        self.assertEqual(band_counts[:2], [indexed, indexed])
+        self.assertEqual(SignalementBand.objects.count(), indexed)
+
+        client = APIClient()
+        client.force_authenticate(create_user('00221779999999', role='moderator'))
+        response = client.get('/signalement/api/moderation/', {'duplicates': '0'})
+        self.assertEqual([item['id'] for item in response.data['results']], [self.original.id])
+        self.assertEqual(client.get('/signalement/api/moderation/', {'duplicate_of': 'abc'}).status_code, 400)
+
+    def test_linking_advances_updated_at_and_cache_version(self):
+        duplicate = self.report()
+        created = Signalement.objects.get(pk=duplicate.pk)
+        Signalement.objects.filter(pk=duplicate.pk).update(duplicate_of=None, duplicate_score=None)
+        version = get_user_version(duplicate.user_id)
+
+        call_command('detect_signalement_duplicates', stdout=io.StringIO())
+        linked = Signalement.objects.get(pk=duplicate.pk)
+        self.assertEqual(linked.duplicate_of, self.original)
+        self.assertGreater(linked.updated_at, created.updated_at)
+        self.assertGreater(get_user_version(duplicate.user_id), version)
+
+        # Rattachements inchangés : rien n'est réécrit
+        with mock.patch('signalement.duplicates.bump_user_versions') as bump:
+            call_command('detect_signalement_duplicates', stdout=io.StringIO())
+        bump.assert_not_called()
+        self.assertEqual(Signalement.objects.get(pk=duplicate.pk).updated_at, linked.updated_at)
+
+
+class SignalementEventsTests(TestCase):
+    url = '/signalement/api/signalement/events/'
+
+    def setUp(self):
+        self.user = create_user()
+        self.signalement = create_signalement(self.user)
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def change_status(self, new_status):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.signalement.status = new_status
+            self.signalement.save()
+
+    async def next_chunk(self, stream):
+        chunk = await asyncio.wait_for(stream.__anext__(), 2)
+        return chunk.decode() if isinstance(chunk, bytes) else chunk
+
+    def stream_token(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.post(f'{self.url}token/').data['token']
+
+    async def test_owner_receives_status_changes(self):
+        stream_token = await sync_to_async(self.stream_token)()
+        response = await self.async_client.get(self.url, {'token': stream_token})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await self.next_chunk(stream)).startswith('retry:'))
+
+        await sync_to_async(self.change_status)('resolu')
+        chunk = await self.next_chunk(stream)
+        self.assertTrue(chunk.startswith('event: status\n'))
+        event = json.loads(chunk.split('data: ', 1)[1])
+        self.assertEqual((event['id'], event['status'], event['previous_status']), (self.signalement.id, 'resolu', 'en_attente'))
+        await stream.aclose()
+
+    async def test_requires_valid_token(self):
+        self.assertEqual((await self.async_client.get(self.url)).status_code, 401)
+        self.assertEqual((await self.async_client.get(self.url, {'token': 'invalide'})).status_code, 401)
+        # Jeton d'accès refusé dans l'URL, jeton de flux refusé dans l'en-tête
+        self.assertEqual((await self.async_client.get(self.url, {'token': self.token})).status_code, 401)
+        stream_token = await sync_to_async(self.stream_token)()
+        response = await self.async_client.get(self.url, headers={'Authorization': f'Bearer {stream_token}'})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual((await self.async_client.get(self.url, headers={'Authorization': 'Bearer a b'})).status_code, 401)
+        response = await self.async_client.get(self.url, headers={'Authorization': f'Bearer {self.token}'})
+        self.assertEqual(response.status_code, 200)
+        await aiter(response.streaming_content).aclose()
+
+    @override_settings(SIGNALEMENT_EVENTS_KEEPALIVE=0.05)
+    async def test_stream_closes_when_user_is_deactivated(self):
+        response = await self.async_client.get(self.url, headers={'Authorization': f'Bearer {self.token}'})
+        stream = aiter(response.streaming_content)
+        await self.next_chunk(stream)
+        self.assertEqual(await self.next_chunk(stream), ': keepalive\n\n')
+        await User.objects.filter(pk=self.user.pk).aupdate(is_active=False)
+        await sync_to_async(invalidate_cached_user)(self.user.pk)
+        with self.assertRaises(StopAsyncIteration):
+            while True:
+                await self.next_chunk(stream)
+
+    async def test_stream_closes_at_token_expiry(self):
+        token = StreamToken.for_user(self.user)
+        token.set_exp(lifetime=timedelta(seconds=2))
+        response = await self.async_client.get(self.url, {'token': str(token)})
+        stream = aiter(response.streaming_content)
+        await self.next_chunk(stream)
+        chunk = await asyncio.wait_for(stream.__anext__(), 5)
+        self.assertTrue(chunk.decode().startswith('event: expired\n'))
+        with self.assertRaises(StopAsyncIteration):
+            await self.next_chunk(stream)
+
+    async def test_redis_listener_survives_bad_messages_and_disconnects(self):
+        def pubsub(*items):
+            def listen():
+                for item in items:
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+                threading.Event().wait()  # connexion ouverte, plus aucun message
+            return mock.Mock(listen=listen)
+
+        def message(event):
+            return {'data': json.dumps({'user_id': self.user.id, 'event': event})}
+
+        fake_redis = mock.Mock()
+        fake_redis.Redis.from_url.return_value.pubsub.side_effect = [
+            pubsub({'data': b'pas du json'}, {'data': '{}'}, message({'n': 1}), ConnectionError('coupure')),
+            pubsub(message({'n': 2})),
+        ]
+        with mock.patch.dict(sys.modules, {'redis': fake_redis}):
+            broadcaster = RedisBroadcaster()
+        broadcaster.reconnect_delay = 0.01
+        with self.assertLogs('signalement.events', 'WARNING'):
+            subscription = await broadcaster.subscribe(self.user.id)
+            self.assertEqual(await subscription.get(2), {'n': 1})
+            self.assertEqual(await subscription.get(2), {'n': 2})
+        self.assertTrue(broadcaster.listener.is_alive())
+
+    def test_in_memory_backend_is_reported_by_deploy_check(self):
+        self.assertEqual([warning.id for warning in check_events_backend(None)], ['backendGooxAlert.W001'])
+        with override_settings(SIGNALEMENT_EVENTS_BACKEND='signalement.events.RedisBroadcaster'):
+            self.assertEqual(check_events_backend(None), [])
+
+    def test_other_users_are_not_notified(self):
+        received = []
+        broadcaster = get_broadcaster()
+        broadcaster.publish = lambda user_id, event: received.append(user_id)
+        try:
+            self.change_status('en_cours')
+            self.signalement.title = 'Nouveau titre'
+            with self.captureOnCommitCallbacks(execute=True):
+                self.signalement.save()
+        finally:
+            del broadcaster.publish
+        self.assertEqual(received, [self.user.id])
+
+
+@override_settings(SIGNALEMENT_PAGE_SIZE=2)
+class AsyncSignalementListTests(TestCase):
+    url = '/signalement/api/async/signalement/'
+
+    def setUp(self):
+        self.user = create_user()
+        self.signalements = [create_signalement(self.user, title=f'Signalement {i}') for i in range(3)]
+        create_signalement(create_user('00221770000000'))
+        self.headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+    async def test_pages_match_sync_view(self):
+        first = await self.async_client.get(self.url, headers=self.headers)
+        self.assertEqual(first.status_code, 200)
+        data = first.json()
+        self.assertEqual([item['id'] for item in data['results']], [self.signalements[2].id, self.signalements[1].id])
+
+        second = (await self.async_client.get(data['next'], headers=self.headers)).json()
+        self.assertEqual([item['id'] for item in second['results']], [self.signalements[0].id])
+        self.assertIsNone(second['next'])
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=self.headers['Authorization'])
+        sync = await sync_to_async(client.get)('/signalement/api/signalement/')
+        self.assertEqual(json.loads(sync.content)['results'], data['results'])
+
+    async def test_sparse_fields_and_authentication(self):
+        response = await self.async_client.get(self.url, {'fields': 'id,title'}, headers=self.headers)
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'title'})
+        self.assertEqual((await self.async_client.get(self.url)).status_code, 401)
+        self.assertEqual((await self.async_client.get(self.url, {'cursor': 'x'}, headers=self.headers)).status_code, 404)
+        malformed = {'Authorization': 'Bearer a b'}
+        self.assertEqual((await self.async_client.get(self.url, headers=malformed)).status_code, 401)
+
+
+# Le réplica est simulé par la base de test : seul l'alias choisi par le routeur change
+@override_settings(DATABASE_REPLICA='default', CACHES=SHARED_CACHES)
+class ReplicaRoutingTests(TestCase):
+    url = '/signalement/api/signalement/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def read_aliases(self, client, method, url, data=None):
+        aliases = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            aliases.append(db_for_read(router, model, **hints))
+            return aliases[-1]
+
+        with mock.patch.object(ReplicaRouter, 'db_for_read', record):
+            response = getattr(client, method)(url, data, format='json')
+        return response, aliases
+
+    def test_reads_stick_to_primary_after_user_write(self):
+        _, aliases = self.read_aliases(self.client, 'get', self.url)
+        self.assertIn('default', aliases)
+
+        response, _ = self.read_aliases(self.client, 'post', self.url, {
+            'title': 'Lampadaire', 'description': 'En panne', 'location': 'Dakar', 'category': 'eclairage',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(recently_wrote(self.user.pk))
+
+        response, aliases = self.read_aliases(self.client, 'get', self.url)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(set(aliases), {None})
+
+        other = APIClient()
+        other.force_authenticate(create_user('00221770000000'))
+        _, aliases = self.read_aliases(other, 'get', self.url)
+        self.assertIn('default', aliases)
+
+    def test_router_rules(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Signalement))
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Signalement), 'default')
+        self.assertEqual(router.db_for_write(Signalement), 'default')
+        with override_settings(DATABASE_REPLICA='replica'):
+            self.assertFalse(router.allow_migrate('replica', 'signalement'))
+            self.assertIsNone(router.allow_migrate('default', 'signalement'))
+            with replica_reads():
+                # Pas d'alias « replica » configuré : base principale
+                self.assertIsNone(router.db_for_read(Signalement))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_keeps_reads_on_primary(self):
+        with replica_reads() as alias:
+            self.assertIsNone(alias)
+        errors = check_shared_cache(None)
+        self.assertEqual([error.id for error in errors], ['backendGooxAlert.E001', 'backendGooxAlert.E002'])
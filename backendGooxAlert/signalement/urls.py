@@ -1,7 +1,25 @@
 from django.urls import path
-from .views import SignalementListCreateView, SignalementDetailView
+from .views import (
+    SignalementListCreateView, SignalementDetailView, SignalementSyncView, SignalementImageUploadView,
+    SignalementBBoxView, SignalementNearbyView, SignalementClusterView, SignalementStatsView, SignalementSearchView,
+    ModerationQueueView, ModerationTransitionView, SignalementBatchCreateView, SignalementEventsTokenView,
+    signalement_events, async_signalement_list,
+)
 
 urlpatterns = [
     path('api/signalement/', SignalementListCreateView.as_view(), name='signalement-list-create'),
+    path('api/signalement/batch/', SignalementBatchCreateView.as_view(), name='signalement-batch-create'),
+    path('api/signalement/events/', signalement_events, name='signalement-events'),
+    path('api/signalement/events/token/', SignalementEventsTokenView.as_view(), name='signalement-events-token'),
+    path('api/async/signalement/', async_signalement_list, name='async-signalement-list'),
+    path('api/signalement/sync/', SignalementSyncView.as_view(), name='signalement-sync'),
+    path('api/images/', SignalementImageUploadView.as_view(), name='signalement-image-upload'),
+    path('api/signalements/bbox/', SignalementBBoxView.as_view(), name='signalement-bbox'),
+    path('api/signalements/nearby/', SignalementNearbyView.as_view(), name='signalement-nearby'),
+    path('api/clusters/<int:z>/<int:x>/<int:y>/', SignalementClusterView.as_view(), name='signalement-clusters'),
+    path('api/signalements/search/', SignalementSearchView.as_view(), name='signalement-search'),
+    path('api/moderation/', ModerationQueueView.as_view(), name='moderation-queue'),
+    path('api/moderation/transition/', ModerationTransitionView.as_view(), name='moderation-transition'),
+    path('api/stats/', SignalementStatsView.as_view(), name='signalement-stats'),
     path('api/signalements/<int:pk>/', SignalementDetailView.as_view(), name='signalement-detail'),
 ]
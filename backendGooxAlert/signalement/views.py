@@ -1,22 +1,620 @@
-from rest_framework import generics, permissions
-from .models import Signalement
+import asyncio
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db.models.functions import Substr
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition, require_GET
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .models import STATUT_CHOICES, Signalement, SignalementTombstone
 from .serializers import SignalementSerializer
+from .pagination import KeysetPagination
+from .caching import CachedResponseMixin
+from .events import format_event, get_broadcaster
+from .signals import on_signalements_created
+from .conditional import signalement_detail_etag, signalement_detail_last_modified, signalement_list_etag
+from .clustering import get_tile_clusters
+from .stats import STAT_DIMENSIONS, aggregate_stats
+from .search import full_text_supported, make_snippet, search_signalements
+from .moderation import transition_status
+from .geo import bbox_around, distance_to, filter_bbox
+from .sync import InvalidSyncToken, latest_position, make_sync_token, read_changes, read_sync_token
+from django.utils.dateparse import parse_date
+from backendGooxAlert.idempotency import idempotent
+from backendGooxAlert.renderers import json_response
+from backendGooxAlert.routers import ReplicaReadsMixin, replica_reads
+from authentification.authentication import StreamToken, aauthenticate_jwt, arecheck_user
+from authentification.images import InvalidImage, process_image
+from authentification.permissions import IsAdminUser, IsModerator
+from authentification.serializers import ImageAssetSerializer
+
+
+def is_compact(request):
+    return request.method == 'GET' and request.query_params.get('compact') in ('1', 'true')
+
+
+def parse_day(value):
+    # parse_date lève ValueError pour une date bien formée mais impossible (2024-02-30)
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
 
-class SignalementListCreateView(generics.ListCreateAPIView):
+def sparse_queryset(queryset, serializer, compact):
+    """
+    Ne charge que les colonnes des champs sérialisés (?fields=, ?exclude=,
+    ?compact=1) : only() sur le modèle, jointure sur l'image seulement si
+    ses déclinaisons sont demandées.
+    """
+    model_fields = {field.name for field in Signalement._meta.concrete_fields}
+    # Colonnes de l'ordre de pagination, lues pour construire le curseur
+    columns = {'id', 'created_at'}
+    for field in serializer.fields.values():
+        if field.source in model_fields:
+            columns.add(field.source)
+
+    if compact:
+        length = settings.SIGNALEMENT_COMPACT_DESCRIPTION_LENGTH
+        queryset = queryset.annotate(description_excerpt=Substr('description', 1, length + 1))
+    if 'image_asset' not in columns:
+        queryset = queryset.select_related(None)
+    return queryset.only(*columns)
+
+
+# GET conditionnel (If-None-Match) : 304 sans sérialiser ni lire le cache de réponses
+@method_decorator(condition(etag_func=signalement_list_etag), name='get')
+class SignalementListCreateView(ReplicaReadsMixin, CachedResponseMixin, generics.ListCreateAPIView):
     serializer_class = SignalementSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         # Retourne uniquement les signalements de l'utilisateur connecté
-        return Signalement.objects.filter(user=self.request.user).order_by('-created_at')
+        # (l'ordre -created_at, -id est imposé par la pagination)
+        queryset = Signalement.objects.filter(user=self.request.user).select_related('image_asset')
+        if self.request.method == 'GET':
+            queryset = self.get_sparse_queryset(queryset)
+        return queryset
+
+    def is_compact(self):
+        return is_compact(self.request)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['compact'] = self.is_compact()
+        return context
+
+    def get_sparse_queryset(self, queryset):
+        return sparse_queryset(queryset, self.get_serializer(), self.is_compact())
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class SignalementDetailView(generics.RetrieveUpdateDestroyAPIView):
+@method_decorator(condition(etag_func=signalement_detail_etag, last_modified_func=signalement_detail_last_modified), name='get')
+class SignalementDetailView(ReplicaReadsMixin, CachedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = SignalementSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         # Retourne uniquement les signalements de l'utilisateur connecté
         return Signalement.objects.filter(user=self.request.user)
+
+
+class SignalementBatchCreateView(APIView):
+    """
+    Création groupée des signalements mis en file hors connexion :
+    {"signalements": [{...}, {...}]}. Chaque élément est validé par
+    SignalementSerializer ; les éléments valides sont insérés en un seul
+    bulk_create, et le résultat est renvoyé élément par élément.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @idempotent
+    def post(self, request):
+        items = request.data.get('signalements') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({
+                'status': 'error',
+                'message': 'signalements doit être une liste non vide'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.SIGNALEMENT_BATCH_MAX_ITEMS:
+            return Response({
+                'status': 'error',
+                'message': f'Au plus {settings.SIGNALEMENT_BATCH_MAX_ITEMS} signalements par envoi'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        results = []
+        pending = []
+        for index, item in enumerate(items):
+            result = {'index': index}
+            if isinstance(item, dict) and 'client_id' in item:
+                # Identifiant local de l'application, renvoyé pour rapprocher les résultats
+                result['client_id'] = item['client_id']
+            serializer = SignalementSerializer(data=item, context={'request': request})
+            if serializer.is_valid():
+                pending.append((result, Signalement(user=request.user, **serializer.validated_data)))
+            else:
+                result.update(status='error', errors=serializer.errors)
+            results.append(result)
+
+        try:
+            created = create_signalements(request.user, [signalement for _, signalement in pending])
+        except Exception as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        for (result, _), signalement in zip(pending, created):
+            result.update(status='created', signalement=SignalementSerializer(signalement).data)
+        return Response({
+            'status': 'success' if created else 'error',
+            'created': len(created),
+            'results': results,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+
+
+def create_signalements(user, signalements):
+    """
+    Insère les signalements en un seul INSERT. bulk_create ne passe ni par
+    save() ni par post_save : la commune, le geohash et les hooks des signaux
+    (statistiques, tuiles, recherche, caches) sont appliqués ici.
+    """
+    if not signalements:
+        return []
+    for signalement in signalements:
+        if not signalement.commune:
+            signalement.commune = user.commune
+        signalement.update_geohash()
+    with transaction.atomic():
+        created = Signalement.objects.bulk_create(signalements)
+        on_signalements_created(created)
+    for signalement in created:
+        signalement.remember_tracked_values()
+    return created
+
+
+class SignalementSyncView(APIView):
+    """
+    Synchronisation incrémentale : renvoie uniquement les signalements créés ou
+    modifiés, et les identifiants supprimés, depuis le jeton ``?token=``.
+    Sans jeton, renvoie l'état complet et un premier jeton.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        signalements = Signalement.objects.filter(user=user).select_related('image_asset')
+        tombstones = SignalementTombstone.objects.filter(user=user)
+        limit = settings.SIGNALEMENT_SYNC_BATCH_SIZE
+
+        token = request.query_params.get('token')
+        try:
+            if token:
+                positions = read_sync_token(user, token)
+            else:
+                # Le client n'a encore rien : les suppressions passées ne le concernent pas
+                positions = {'signalements': None, 'deleted': latest_position(tombstones, 'deleted_at')}
+
+            changed, positions['signalements'], more_changed = read_changes(
+                signalements, 'updated_at', positions.get('signalements'), limit
+            )
+            deleted, positions['deleted'], more_deleted = read_changes(
+                tombstones, 'deleted_at', positions.get('deleted'), limit
+            )
+        except InvalidSyncToken:
+            return Response({
+                'status': 'error',
+                'message': 'Jeton de synchronisation invalide'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'status': 'success',
+            'signalements': SignalementSerializer(changed, many=True).data,
+            'deleted': [tombstone.signalement_id for tombstone in deleted],
+            'sync_token': make_sync_token(user, positions),
+            'has_more': more_changed or more_deleted,
+        })
+
+
+class SignalementImageUploadView(APIView):
+    """
+    Upload de la photo d'un signalement : l'image est traitée (déclinaisons,
+    EXIF retiré) puis son id est à passer dans ``image_asset`` à la création.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        if 'image' not in request.FILES:
+            return Response({
+                'status': 'error',
+                'message': 'Aucune image n\'a été fournie'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            asset = process_image(request.FILES['image'])
+            asset.uploaders.add(request.user)
+        except InvalidImage as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response({
+            'status': 'success',
+            'image': ImageAssetSerializer(asset).data
+        }, status=status.HTTP_201_CREATED)
+
+
+class GeoQueryMixin:
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_float(self, request, name, minimum, maximum, default=None):
+        value = request.query_params.get(name)
+        if value is None and default is not None:
+            return default
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Paramètre '{name}' manquant ou invalide")
+        if not minimum <= value <= maximum:
+            raise ValueError(f"Paramètre '{name}' hors limites ({minimum} à {maximum})")
+        return value
+
+    def get_queryset(self, request):
+        # Signalements géolocalisés de l'utilisateur (de tous pour les modérateurs et
+        # administrateurs), filtrables par ?status=a,b&category=c
+        queryset = Signalement.objects.exclude(geohash='').select_related('image_asset')
+        if not IsModerator().has_permission(request, self):
+            queryset = queryset.filter(user=request.user)
+        for name in ('status', 'category'):
+            values = [v for v in request.query_params.get(name, '').split(',') if v]
+            if values:
+                queryset = queryset.filter(**{f'{name}__in': values})
+        return queryset
+
+    def error_response(self, message):
+        return Response({
+            'status': 'error',
+            'message': message
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+class SignalementBBoxView(GeoQueryMixin, APIView):
+    """
+    Signalements situés dans la boîte ?min_lat=&min_lng=&max_lat=&max_lng=
+    (les plus récents d'abord, au plus SIGNALEMENT_GEO_MAX_RESULTS).
+    """
+    def get(self, request):
+        try:
+            min_lat = self.get_float(request, 'min_lat', -90, 90)
+            min_lng = self.get_float(request, 'min_lng', -180, 180)
+            max_lat = self.get_float(request, 'max_lat', -90, 90)
+            max_lng = self.get_float(request, 'max_lng', -180, 180)
+        except ValueError as e:
+            return self.error_response(str(e))
+        if min_lat > max_lat or min_lng > max_lng:
+            return self.error_response('Boîte invalide : min doit être inférieur à max')
+
+        queryset = filter_bbox(self.get_queryset(request), min_lat, min_lng, max_lat, max_lng)
+        signalements = queryset.order_by('-created_at', '-id')[:settings.SIGNALEMENT_GEO_MAX_RESULTS]
+        return Response({
+            'status': 'success',
+            'signalements': SignalementSerializer(signalements, many=True).data
+        })
+
+
+class SignalementNearbyView(GeoQueryMixin, APIView):
+    """
+    Signalements à moins de ?radius= mètres de (?lat=, ?lng=), du plus proche
+    au plus éloigné, avec leur distance.
+    """
+    def get(self, request):
+        try:
+            latitude = self.get_float(request, 'lat', -90, 90)
+            longitude = self.get_float(request, 'lng', -180, 180)
+            radius = self.get_float(request, 'radius', 1, settings.SIGNALEMENT_NEARBY_MAX_RADIUS, default=1000)
+        except ValueError as e:
+            return self.error_response(str(e))
+
+        # La boîte englobante (indexée) est affinée en cercle, et triée par distance
+        # en base avant la limite : les plus proches ne sont jamais écartés
+        queryset = filter_bbox(self.get_queryset(request), *bbox_around(latitude, longitude, radius))
+        nearby = list(
+            queryset.annotate(distance=distance_to(latitude, longitude))
+            .filter(distance__lte=radius)
+            .order_by('distance', 'id')[:settings.SIGNALEMENT_GEO_MAX_RESULTS]
+        )
+
+        data = SignalementSerializer(nearby, many=True).data
+        for item, signalement in zip(data, nearby):
+            item['distance'] = round(signalement.distance)
+        return Response({
+            'status': 'success',
+            'signalements': data
+        })
+
+
+class SignalementClusterView(APIView):
+    """
+    Regroupements des signalements d'une tuile de carte (z/x/y) : nombre,
+    catégorie dominante et répartition par statut. Mis en cache par tuile.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, z, x, y):
+        if z > settings.SIGNALEMENT_CLUSTER_MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+            return Response({
+                'status': 'error',
+                'message': 'Tuile invalide'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'status': 'success',
+            'tile': {'z': z, 'x': x, 'y': y},
+            'clusters': get_tile_clusters(Signalement.objects.exclude(geohash=''), z, x, y),
+        })
+
+
+class SignalementStatsView(APIView):
+    """
+    Statistiques du tableau de bord, calculées à partir des compteurs journaliers :
+    ?start=AAAA-MM-JJ&end=AAAA-MM-JJ&group_by=category,status&commune=...
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        params = request.query_params
+        group_by = [name for name in params.get('group_by', '').split(',') if name]
+        if any(name not in STAT_DIMENSIONS for name in group_by):
+            return Response({
+                'status': 'error',
+                'message': f"group_by doit être parmi : {', '.join(STAT_DIMENSIONS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        dates = {}
+        for name in ('start', 'end'):
+            if params.get(name):
+                dates[name] = parse_day(params[name])
+                if dates[name] is None:
+                    return Response({
+                        'status': 'error',
+                        'message': f"Date '{name}' invalide (format AAAA-MM-JJ)"
+                    }, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {name: params[name] for name in ('category', 'status', 'commune') if params.get(name)}
+        total, rows = aggregate_stats(group_by=group_by, **dates, **filters)
+        return Response({
+            'status': 'success',
+            'total': total,
+            'results': rows,
+        })
+
+
+class SignalementSearchView(APIView):
+    """
+    Recherche plein texte sur le titre et la description :
+    ?q=fuite canalisation&category=...&status=...&start=AAAA-MM-JJ&end=AAAA-MM-JJ&limit=20
+    Résultats triés par pertinence, avec un extrait mis en évidence.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsModerator]
+
+    def get(self, request):
+        params = request.query_params
+        query = params.get('q', '').strip()
+        if not query:
+            return Response({
+                'status': 'error',
+                'message': 'Le paramètre q est requis'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        signalements = Signalement.objects.select_related('image_asset')
+        filters = {name: params[name] for name in ('category', 'status', 'commune') if params.get(name)}
+        for name, lookup in (('start', 'created_at__date__gte'), ('end', 'created_at__date__lte')):
+            if params.get(name):
+                day = parse_day(params[name])
+                if day is None:
+                    return Response({
+                        'status': 'error',
+                        'message': f"Date '{name}' invalide (format AAAA-MM-JJ)"
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                filters[lookup] = day
+        try:
+            limit = min(int(params.get('limit', settings.SIGNALEMENT_SEARCH_MAX_RESULTS)), settings.SIGNALEMENT_SEARCH_MAX_RESULTS)
+        except ValueError:
+            limit = settings.SIGNALEMENT_SEARCH_MAX_RESULTS
+
+        results = list(search_signalements(signalements.filter(**filters), query)[:max(limit, 1)])
+        data = SignalementSerializer(results, many=True).data
+        for item, signalement in zip(data, results):
+            item['rank'] = signalement.rank
+            if full_text_supported():
+                item['snippet'] = signalement.snippet
+            else:
+                item['snippet'] = make_snippet(signalement.description, query)
+        return Response({
+            'status': 'success',
+            'count': len(data),
+            'results': data,
+        })
+
+
+class ModerationQueueView(generics.ListAPIView):
+    """
+    File de modération sur les signalements de tous les utilisateurs :
+    ?status=en_attente&category=...&commune=..., paginée par curseur.
+    ?duplicates=0 masque les doublons probables, ?duplicate_of=<id> liste ceux d'un signalement.
+    """
+    serializer_class = SignalementSerializer
+    permission_classes = [permissions.IsAuthenticated, IsModerator]
+    pagination_class = KeysetPagination
+
+    def list(self, request, *args, **kwargs):
+        duplicate_of = request.query_params.get('duplicate_of')
+        if duplicate_of:
+            try:
+                int(duplicate_of)
+            except ValueError:
+                return Response({
+                    'status': 'error',
+                    'message': 'duplicate_of doit être un identifiant de signalement'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        return super().list(request, *args, **kwargs)
+
+    def get_queryset(self):
+        params = self.request.query_params
+        filters = {name: params[name] for name in ('status', 'category', 'commune', 'duplicate_of') if params.get(name)}
+        if params.get('duplicates') in ('0', 'false'):
+            filters['duplicate_of'] = None
+        return Signalement.objects.filter(**filters).select_related('image_asset')
+
+
+class ModerationTransitionView(APIView):
+    """
+    Change le statut de plusieurs signalements en une seule transaction :
+    {"ids": [1, 2, 3], "status": "en_cours"}
+    """
+    permission_classes = [permissions.IsAuthenticated, IsModerator]
+
+    def post(self, request):
+        ids = request.data.get('ids')
+        new_status = request.data.get('status')
+        if new_status not in dict(STATUT_CHOICES):
+            return Response({
+                'status': 'error',
+                'message': f"status doit être parmi : {', '.join(dict(STATUT_CHOICES))}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(ids, list) or not ids or not all(isinstance(pk, int) for pk in ids):
+            return Response({
+                'status': 'error',
+                'message': 'ids doit être une liste non vide d\'identifiants'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > settings.SIGNALEMENT_BULK_MAX_IDS:
+            return Response({
+                'status': 'error',
+                'message': f'Au plus {settings.SIGNALEMENT_BULK_MAX_IDS} signalements par requête'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            updated = transition_status(ids, new_status)
+            return Response({
+                'status': 'success',
+                'updated': sorted(signalement.pk for signalement in updated),
+            })
+        except Exception as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class SignalementEventsTokenView(APIView):
+    """
+    Délivre un jeton de flux (StreamToken) pour ouvrir /events/?token=... :
+    courte durée, refusé partout ailleurs.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        token = StreamToken.for_user(request.user)
+        return Response({
+            'status': 'success',
+            'token': str(token),
+            'expires_in': int(token.lifetime.total_seconds()),
+        })
+
+
+async def signalement_events(request):
+    """
+    Flux Server-Sent Events des changements de statut des signalements de
+    l'utilisateur (servi par asgi.py : une connexion ne bloque aucun worker).
+    Authentification par le jeton d'accès (en-tête Authorization) ou par un
+    jeton de flux (?token=, voir SignalementEventsTokenView). Le flux se ferme
+    à l'expiration du jeton, après un événement « expired », ou dès que
+    l'utilisateur n'est plus valide (vérifié à chaque keepalive).
+    """
+    user = await aauthenticate_jwt(request, query_token_class=StreamToken)
+    if user is None:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Jeton d\'authentification manquant ou invalide'
+        }, status=401)
+
+    validated_token = request.auth
+    expires_at = validated_token['exp']
+    broadcaster = get_broadcaster()
+    subscription = await broadcaster.subscribe(user.pk)
+
+    async def stream():
+        try:
+            yield f'retry: {settings.SIGNALEMENT_EVENTS_RETRY_MS}\n\n'
+            while True:
+                remaining = expires_at - time.time()
+                if remaining <= 0:
+                    yield 'event: expired\ndata: {}\n\n'
+                    return
+                try:
+                    event = await subscription.get(min(settings.SIGNALEMENT_EVENTS_KEEPALIVE, remaining))
+                except asyncio.TimeoutError:
+                    if time.time() >= expires_at:
+                        continue
+                    # Utilisateur supprimé, désactivé ou mot de passe changé : fin du flux
+                    if await arecheck_user(validated_token) is None:
+                        return
+                    # Commentaire SSE : garde la connexion ouverte à travers les proxys
+                    yield ': keepalive\n\n'
+                    continue
+                yield format_event(event)
+        finally:
+            await broadcaster.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_GET
+async def async_signalement_list(request):
+    """
+    Variante asynchrone de la liste des signalements de l'utilisateur (servie
+    par asgi.py) : même pagination par curseur, mêmes ?fields=, ?exclude= et
+    ?compact=1, lecture par l'ORM asynchrone.
+    """
+    user = await aauthenticate_jwt(request)
+    if user is None:
+        return json_response({
+            'status': 'error',
+            'message': 'Jeton d\'authentification manquant ou invalide'
+        }, status=401)
+
+    # Request de DRF pour query_params, utilisés par la pagination et les serializers
+    api_request = Request(request)
+    context = {'request': api_request, 'compact': is_compact(api_request)}
+    paginator = KeysetPagination()
+    queryset = Signalement.objects.filter(user=user).select_related('image_asset')
+    queryset = sparse_queryset(queryset, SignalementSerializer(context=context), context['compact'])
+    try:
+        with replica_reads(user):
+            page = await paginator.apaginate_queryset(queryset, api_request)
+    except NotFound as e:
+        return json_response({'detail': e.detail}, status=404)
+
+    serializer = SignalementSerializer(page, many=True, context=context)
+    return json_response({'next': paginator.get_next_link(), 'results': serializer.data})
@@ -103,9 +103,10 @@ class AuthService {
   }
 
   // Méthode de connexion (authentification JWT via /api/token/)
+  // La première page des signalements est embarquée dans la réponse
   static Future<UserModel> login(LoginData data) async {
     final response = await _client.post(
-      Uri.parse('$baseUrl/auth/api/login/'),
+      Uri.parse('$baseUrl/auth/api/login/?include=signalements'),
       headers: _defaultHeaders(),
       body: jsonEncode(data.toJson()),
     );
@@ -15,6 +15,11 @@ interface Signalement {
   user: number;
 }
 
+interface PaginatedResponse<T> {
+  next: string | null;
+  results: T[];
+}
+
 interface IssueContextType {
   issues: Signalement[];
   userIssues: Signalement[];
@@ -95,12 +100,17 @@ export const IssueProvider: React.FC<{ children: React.ReactNode }> = ({ childre
         return;
       }
 
-      const response = await axios.get(`${API_URL}/api/signalement/`, getAuthHeader());
-      
-      if (response.data) {
-        setIssues(response.data);
-        lastFetchRef.current = now;
+      // La liste est paginée par curseur : suivre `next` jusqu'à la dernière page
+      const allIssues: Signalement[] = [];
+      let url: string | null = `${API_URL}/api/signalement/`;
+      while (url) {
+        const response: { data: PaginatedResponse<Signalement> } = await axios.get(url, getAuthHeader());
+        allIssues.push(...response.data.results);
+        url = response.data.next;
       }
+
+      setIssues(allIssues);
+      lastFetchRef.current = now;
     } catch (err: any) {
       console.error('Error fetching issues:', err);
       if (err.response) {